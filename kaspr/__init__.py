@@ -1,13 +1,41 @@
 __version__ = "0.11.7"
 
-from .core.app import KasprApp
-from .scheduler.manager import MessageScheduler
-from .scheduler.dispatcher import Dispatcher
-from .scheduler.checkpoint import Checkpoint
+import typing
+
+if typing.TYPE_CHECKING:
+    from .core.app import KasprApp
+    from .scheduler.manager import MessageScheduler
+    from .scheduler.dispatcher import Dispatcher
+    from .scheduler.checkpoint import Checkpoint
 
 __all__ = [
     "KasprApp",
     "MessageScheduler",
     "Dispatcher",
     "Checkpoint"
-]
\ No newline at end of file
+]
+
+# Exports are imported on first access, so importing a submodule (e.g. in
+# a processor worker process) does not load faust's app and the scheduler.
+_EXPORTS = {
+    "KasprApp": "kaspr.core.app",
+    "MessageScheduler": "kaspr.scheduler.manager",
+    "Dispatcher": "kaspr.scheduler.dispatcher",
+    "Checkpoint": "kaspr.scheduler.checkpoint",
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> typing.List[str]:
+    return sorted(list(globals()) + __all__)
@@ -1,13 +1,14 @@
+import asyncio
 import faust
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime
 from kaspr.utils.functional import utc_now
 from typing import Optional, Iterable
 from faust.app import BootStrategy
-from faust.types import ServiceT
+from faust.types import ServiceT, TopicT
 from mode.utils.objects import cached_property
 from mode import SyncSignal
 from kaspr.types import CustomSettings, KasprAppT, MessageSchedulerT, AppBuilderT
-from kaspr.scheduler import MessageScheduler
 
 
 class CustomBootStrategy(BootStrategy):
@@ -76,12 +77,26 @@ class KasprApp(KasprAppT, faust.App):
         """Call first time app starts in this process."""
         await super().on_first_start()
 
+        # Topics of the scheduler and of built components are declared
+        # in a single gather.
+        topics = []
         if self.conf.scheduler_enabled:
-            await self.scheduler.maybe_create_topics()
+            topics.extend(self.scheduler.topics_to_declare())
 
         if self.conf.app_builder_enabled:
             self.builder.build()
-            await self.builder.maybe_create_topics()
+            topics.extend(self.builder.topics_to_declare())
+
+        await self.declare_topics(topics)
+        if self.conf.scheduler_enabled:
+            self.scheduler.topics_created.set()
+        if self.conf.app_builder_enabled:
+            await self.builder.warm_up_metadata()
+
+    async def declare_topics(self, topics: Iterable[TopicT]) -> None:
+        """Declare ``topics`` concurrently, once the producer started."""
+        await self.producer.maybe_start()
+        await asyncio.gather(*(topic.maybe_declare() for topic in topics))
 
     async def on_start(self) -> None:
         """Call every time app start/restarts."""
@@ -94,6 +109,8 @@ class KasprApp(KasprAppT, faust.App):
     async def on_stop(self) -> None:
         """Call when application stops."""
         await super().on_stop()
+        if type(self).processor_thread_pool.is_set(self):
+            self.processor_thread_pool.shutdown(wait=False)
 
     def on_rebalance_start(self) -> None:
         """Call when rebalancing starts"""
@@ -123,12 +140,24 @@ class KasprApp(KasprAppT, faust.App):
     @cached_property
     def scheduler(self) -> MessageSchedulerT:
         """Kafka message scheduler service."""
+        # Imported here: the scheduler and cron support are only loaded
+        # when the scheduler is enabled.
+        from kaspr.scheduler import MessageScheduler
+
         return MessageScheduler(
             app=self,
             loop=self.loop,
             beacon=self.beacon,
         )
 
+    @cached_property
+    def processor_thread_pool(self) -> Executor:
+        """Thread pool for processor operations with ``executor: thread``."""
+        return ThreadPoolExecutor(
+            max_workers=self.conf.processor_thread_pool_size,
+            thread_name_prefix=f"{self.conf.name}-processor",
+        )
+
     @cached_property
     def builder(self) -> AppBuilderT:
         """App builder."""
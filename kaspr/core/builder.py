@@ -1,14 +1,54 @@
 """Build stream processors from external definition files."""
 
+import asyncio
 import yaml
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from time import monotonic
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from faust.types import TopicT
 from pathlib import Path
 from kaspr.types import KasprAppT, AppBuilderT
+from kaspr.utils import codecache, speccache
+from kaspr.utils.speccache import SpecCache
+from kaspr.utils.logging import get_logger
 from kaspr.types.models import AppSpec, AgentSpec, WebViewSpec, TableSpec, TaskSpec
 from kaspr.types.models.join import JoinSpec
 from kaspr.types.schemas import AppSpecSchema
 from mode.utils.objects import cached_property
 
+logger = get_logger(__name__)
+
+#: Directory under the table directory holding compiled PyCode.
+CODE_CACHE_DIRNAME = "pycode-cache"
+
+#: Directory under the table directory holding validated definitions.
+SPEC_CACHE_DIRNAME = "definitions-cache"
+
+#: Maximum number of definition files read and parsed at once.
+DEFINITIONS_READ_WORKERS = 8
+
+#: Components whose processors can be replaced while the worker runs.
+RELOADABLE_COMPONENTS = ("agents_spec", "webviews_spec", "tasks_spec")
+
+# (path, cache key, recorded models, parsed content) of a definition file.
+Document = Tuple[Path, Optional[str], Optional[speccache.Node], Any]
+
+# (path, recorded models, app spec) of a loaded definition file.
+Loaded = Tuple[Path, Optional[speccache.Node], AppSpec]
+
+
+def _topology(node: speccache.Node) -> speccache.Node:
+    """Return a recorded app spec without the processors of its components."""
+    path, arguments = node
+    arguments = dict(arguments)
+    for kind in RELOADABLE_COMPONENTS:
+        arguments[kind] = [
+            (component, {k: v for k, v in spec.items() if k != "processors"})
+            for component, spec in arguments.get(kind) or []
+        ]
+    return path, arguments
+
 
 class AppBuilder(AppBuilderT):
     """Build stream processors from definition files."""
@@ -22,27 +62,99 @@ class AppBuilder(AppBuilderT):
     _joins: List[JoinSpec] = None
     _tasks: List[TaskSpec] = None
 
+    #: Validated definition files by content hash, if enabled.
+    spec_cache: Optional[SpecCache] = None
+
+    #: Seconds spent in each startup phase, see :meth:`report_timings`.
+    timings: Dict[str, float] = None
+
+    _loaded: Dict[Path, Tuple[Optional[speccache.Node], AppSpec]] = None
+    _snapshot: Dict[Path, Tuple[int, int]] = None
+
     def __init__(self, app: KasprAppT) -> None:
         self.app = app
+        self.timings = {}
+
+    @contextmanager
+    def _timed(self, phase: str) -> Iterator[None]:
+        started = monotonic()
+        try:
+            yield
+        finally:
+            self.timings[phase] = self.timings.get(phase, 0.0) + monotonic() - started
 
     def _files(self, directory: Path) -> List[str]:
         """Find all JSON files in the given directory and its subdirectories."""
         return list(directory.rglob("*.yml")) + list(directory.rglob("*.yaml"))
 
+    def _read(self, path: Path) -> Optional[Document]:
+        """Read a definition file.
+
+        Returns its recorded models if the file is cached, else its parsed
+        content, or None if it is not valid YAML.
+        """
+        content = path.read_bytes()
+        key = None
+        if self.spec_cache is not None:
+            key = self.spec_cache.key(content)
+            node = self.spec_cache.get(key)
+            if node is not None:
+                return path, key, node, None
+        try:
+            return path, key, None, speccache.load_yaml(content)
+        except yaml.YAMLError as exc:
+            print(f"Error loading file `{path}`: {exc}")
+            return None
+
+    def _read_all(self, files: List[Path]) -> List[Optional[Document]]:
+        """Read definition files concurrently, keeping their order."""
+        if len(files) < 2:
+            return [self._read(file) for file in files]
+        workers = min(len(files), DEFINITIONS_READ_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self._read, files))
+
+    def _load_documents(self, files: List[Path]) -> List[Loaded]:
+        """Load definition files, with the recorded models of each."""
+        with self._timed("parse"):
+            documents = self._read_all(files)
+        loaded = []
+        for document in documents:
+            if document is None:
+                continue
+            path, key, node, data = document
+            if node is not None:
+                with self._timed("cached"):
+                    app = speccache.rebuild(node, {"app": self.app})
+                loaded.append((path, node, app))
+                continue
+            with self._timed("schema"), speccache.recording() as nodes:
+                app = AppSpecSchema(context={"app": self.app}).load(data)
+            node = speccache.node_for(nodes, app)
+            if key is not None and node is not None:
+                self.spec_cache.put(key, node)
+            loaded.append((path, node, app))
+        return loaded
+
     def _load(self, files: List[Path]) -> List[AppSpec]:
         """Load the content of definition files and convert them to dictionaries."""
-        apps = []
-        for file in files:
-            with file.open("r") as file:
-                try:
-                    apps.append(AppSpecSchema.from_file(file, app=self.app))
-                except yaml.YAMLError as exc:
-                    print(f"Error loading file `{file}`: {exc}")
-        return apps
+        loaded = self._load_documents(files)
+        self._loaded = {path: (node, app) for path, node, app in loaded}
+        return [app for _, _, app in loaded]
 
     def _load_apps(self) -> List[AppSpec]:
         """Load app component definitions."""
-        return self._load(self._files(self.app.conf.definitionssdir))
+        tabledir = Path(self.app.conf.tabledir)
+        if self.app.conf.code_cache_enabled:
+            codecache.set_code_cache_dir(tabledir / CODE_CACHE_DIRNAME)
+        if self.app.conf.definitions_cache_enabled:
+            try:
+                self.spec_cache = SpecCache(tabledir / SPEC_CACHE_DIRNAME)
+            except OSError:
+                self.spec_cache = None
+        files = self._files(self.app.conf.definitionssdir)
+        self._snapshot = self._stat(files)
+        return self._load(files)
 
     def _prepare_agents(self) -> List[AgentSpec]:
         """Prepare agents from loaded definitions."""
@@ -81,21 +193,231 @@ class AppBuilder(AppBuilderT):
 
     def build(self) -> None:
         """Build agents, tasks, etc. from definition files."""
+        started = monotonic()
         for app in self.apps:
-            app.tables
-            app.joins
-            app.tasks            
-            app.agents
-            app.webviews
+            with self._timed("tables"):
+                app.tables
+            with self._timed("joins"):
+                app.joins
+            if self.app.conf.channel_fusion_enabled:
+                with self._timed("fusion"):
+                    self.fuse_channels(app)
+            with self._timed("tasks"):
+                app.tasks
+            with self._timed("agents"):
+                app.agents
+            with self._timed("webviews"):
+                app.webviews
+        self.timings["total"] = monotonic() - started
+        self.report_timings()
+        interval = self.app.conf.definitions_reload_interval
+        if interval:
+            self.app.timer(interval, name=f"{type(self).__name__}.watch")(self.watch)
+
+    @cached_property
+    def channel_readers(self) -> Dict[str, List[AgentSpec]]:
+        """Return the agents reading each in-memory channel, by channel name."""
+        readers: Dict[str, List[AgentSpec]] = {}
+        for app in self.apps:
+            for agent in app.agents_spec or []:
+                name = agent.input_channel_name
+                if name is not None:
+                    readers.setdefault(name, []).append(agent)
+        return readers
+
+    def fuse_channels(self, app: AppSpec) -> None:
+        """Fuse the output channels of ``app``'s joins with their reader.
+
+        When a single agent reads a join's output channel, joined values
+        are handed to the agent's processors by a
+        :class:`~kaspr.types.models.agent.processor.FusedChannel`
+        rather than through the channel and the agent's stream, which is
+        then not started. Called before the agents are built.
+        """
+        for join in app.joins_spec or []:
+            readers = self.channel_readers.get(join.channel_name, [])
+            if len(readers) != 1 or not readers[0].fusable:
+                continue
+            agent = readers[0]
+            join.fuse(agent.fuse())
+            self.app.monitor.on_channel_fused(join.channel_name, agent.name)
+            logger.info(
+                "Fused channel %s of join %s with agent %s",
+                join.channel_name,
+                join.name,
+                agent.name,
+            )
+
+    def report_timings(self) -> None:
+        """Log how long each startup phase took."""
+        stats = codecache.stats
+        phases = ", ".join(
+            f"{phase} {seconds:.3f}s"
+            for phase, seconds in self.timings.items()
+            if phase != "total"
+        )
+        logger.info(
+            "Built %d definition file(s) in %.3fs (%s; compile %.3fs: "
+            "%d compiled, %d from disk cache, %d shared)",
+            len(self.apps),
+            self.timings.get("total", 0.0),
+            phases,
+            stats.seconds,
+            stats.misses,
+            stats.disk_hits,
+            stats.hits,
+        )
+
+    def _stat(self, files: List[Path]) -> Dict[Path, Tuple[int, int]]:
+        """Return the modification time and size of definition files."""
+        snapshot = {}
+        for file in files:
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            snapshot[file] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    async def watch(self) -> None:
+        """Reload definition files if any changed since they were loaded."""
+        files = self._files(self.app.conf.definitionssdir)
+        snapshot = self._stat(files)
+        if snapshot != self._snapshot:
+            self._snapshot = snapshot
+            await self.reload(files)
+
+    async def reload(self, files: Optional[List[Path]] = None) -> bool:
+        """Load definition files again and apply processor changes.
+
+        Agents, webviews and tasks whose processors changed get the new
+        processors in place, while they keep running. Any other change
+        (files, topics, tables, joins, components added or removed) alters
+        the topology of the app, and is only applied when the worker is
+        restarted.
+
+        Files are parsed and validated in a thread, off the event loop.
+        Every changed processor is then prepared before any is replaced,
+        so either all changes are applied or none.
+
+        Returns:
+            True if the loaded definitions are now in effect.
+        """
+        if files is None:
+            files = self._files(self.app.conf.definitionssdir)
+        loop = asyncio.get_running_loop()
+        try:
+            loaded = await loop.run_in_executor(None, self._load_documents, files)
+        except Exception as exc:
+            logger.error("Cannot reload definitions: %r", exc)
+            return False
+        previous = self._loaded or {}
+        if set(previous) != {path for path, _, _ in loaded}:
+            return self._on_topology_changed("definition files were added or removed")
+        changes = []
+        for path, node, app in loaded:
+            old_node, old_app = previous[path]
+            if node == old_node and node is not None:
+                continue
+            if node is None or old_node is None:
+                return self._on_topology_changed(f"`{path}` cannot be compared")
+            if _topology(node) != _topology(old_node):
+                return self._on_topology_changed(f"`{path}` changed topology")
+            for kind in RELOADABLE_COMPONENTS:
+                for old_spec, spec, old_component, component in zip(
+                    getattr(old_app, kind) or [],
+                    getattr(app, kind) or [],
+                    old_node[1].get(kind) or [],
+                    node[1].get(kind) or [],
+                ):
+                    if old_component != component:
+                        changes.append((old_spec, spec))
+        reloaded = True
+        for old_spec, spec in changes:
+            try:
+                old_spec.processors.prepare_reload(spec.processors)
+            except Exception as exc:
+                logger.error("Cannot reload %s: %r", old_spec.shortlabel, exc)
+                reloaded = False
+        if not reloaded:
+            logger.error("Definitions not reloaded; the running ones are kept.")
+            return False
+        for old_spec, spec in changes:
+            old_spec.processors.apply_reload(spec.processors)
+            logger.info("Reloaded processors of %s", old_spec.shortlabel)
+        # Running components keep their specs; only what they were loaded
+        # from is updated, to compare with the next change.
+        self._loaded = {path: (node, previous[path][1]) for path, node, _ in loaded}
+        return True
+
+    def _on_topology_changed(self, reason: str) -> bool:
+        logger.warning(
+            "Definitions changed but cannot be reloaded (%s); "
+            "restart the worker to apply them.",
+            reason,
+        )
+        return False
 
     async def maybe_create_topics(self) -> None:
-        """Maybe declare agent input topics."""
-        # Ensure producer has starter before creating topics.
-        await self.app.producer.maybe_start()
+        """Maybe declare agent input and output topics.
+
+        See :meth:`topics_to_declare`; the app declares these together
+        with the scheduler topics when it first starts.
+        """
+        await self.app.declare_topics(self.topics_to_declare())
+        await self.warm_up_metadata()
+
+    def topics_to_declare(self) -> List[TopicT]:
+        """Return topics to declare before agents start.
+
+        These are agent input topics marked ``declare`` and output topics
+        with a static name; topics chosen by a name selector are only known
+        once values are sent. Table changelog topics are declared by
+        faust's table manager when it starts.
+        """
+        inputs, outputs = [], {}
         for app in self.apps:
             for agent in app.agents_spec:
                 if agent.input.declare:
-                    await agent.input.channel.maybe_declare()
+                    inputs.append(agent.input.channel)
+                for spec in self._static_outputs(agent):
+                    outputs.setdefault(spec.name, spec.get_topic(None))
+        return inputs + list(outputs.values())
+
+    def _static_outputs(self, agent: AgentSpec) -> List[Any]:
+        """Return output topic specs of ``agent`` not chosen by a selector."""
+        if agent.output is None:
+            return []
+        return [
+            spec
+            for spec in agent.output.topics_spec or []
+            if spec.name and not spec.name_selector
+        ]
+
+    async def warm_up_metadata(self) -> None:
+        """Fetch partition metadata of the static output topics.
+
+        The first values sent to these topics then do not wait for a
+        metadata request. Only done with the aiokafka producer driver.
+        """
+        from aiokafka import AIOKafkaProducer
+
+        names = [
+            spec.name
+            for app in self.apps
+            for agent in app.agents_spec
+            for spec in self._static_outputs(agent)
+        ]
+        producer = getattr(self.app.producer, "_producer", None)
+        if not names or not isinstance(producer, AIOKafkaProducer):
+            return
+        try:
+            await asyncio.gather(
+                *(producer.partitions_for(name) for name in dict.fromkeys(names))
+            )
+        except Exception as exc:
+            # Sends fetch metadata themselves if this failed.
+            logger.warning("Cannot fetch metadata of output topics: %r", exc)
 
     @cached_property
     def apps(self) -> List[AppSpec]:
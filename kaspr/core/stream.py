@@ -99,8 +99,11 @@ class KasprStream(faust.Stream):
                         yield list((buffer, events))
                     finally:
                         buffer.clear()
-                        for event in events:
-                            await self.ack(event)
+                        if stream_enable_acks:
+                            # Streams with manual acks (see `noack`) leave
+                            # acking the buffered events to the consumer.
+                            for event in events:
+                                await self.ack(event)
                         events.clear()
                         # allow writing to buffer again
                         notify(buffer_consuming)
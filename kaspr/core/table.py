@@ -2,7 +2,7 @@ import faust
 from datetime import datetime
 from kaspr.utils.functional import utc_now
 from faust.types.tuples import TP, MessageSentCallback
-from typing import Set, Any
+from typing import Set, Any, Iterator, List
 from mode import Signal
 
 
@@ -73,6 +73,31 @@ class KasprTable(faust.Table):
         self.on_key_get(key, partition)
         return self.data.get_for_partition(key, partition)
 
+    def get_many_for_partition(self, keys: List[Any], partition: int) -> List[Any]:
+        """Get keys in specific partition of table, in one store call.
+
+        Returns the values in the order of ``keys``, None for missing keys.
+        RocksDB stores read all keys with a single multi-get; other stores
+        look them up one by one.
+        """
+        for key in keys:
+            self.on_key_get(key, partition)
+        store = self.data
+        if not self.can_seek:
+            # Not a RocksDB store.
+            return [store.get_for_partition(key, partition) for key in keys]
+        encoded = [store._encode_key(key) for key in keys]
+        db = store._db_for_partition(partition)
+        if store.use_rocksdict:
+            values = db.get(encoded)
+        else:
+            found = db.multi_get(encoded)
+            values = [found.get(key) for key in encoded]
+        return [
+            store._decode_value(value) if value is not None else None
+            for value in values
+        ]
+
     def del_for_partition(
         self, key, partition: int, callback: MessageSentCallback = None # type: ignore
     ):
@@ -84,6 +109,50 @@ class KasprTable(faust.Table):
         """Iterate all (key, value) pairs in a specific partition."""
         return self.data.items_for_partition(partition)
 
+    @property
+    def can_seek(self) -> bool:
+        """Return True if the store iterates keys in order from any key."""
+        # Already imported when the table uses it.
+        from faust.stores import rocksdb
+
+        return isinstance(self.data, rocksdb.Store)
+
+    def keys_from_partition(self, start: Any, partition: int) -> Iterator[Any]:
+        """Iterate keys of a partition in store order, from ``start`` on.
+
+        Keys are ordered by their serialized bytes, so only keys whose
+        serialized form sorts like the key itself (e.g. equal length
+        digit strings, or big-endian binary keys) come out in key order.
+        Requires a RocksDB store, see :attr:`can_seek`.
+        """
+        store = self.data
+        seek = store._encode_key(start)
+        if isinstance(start, str) and seek[:1] == b'"':
+            # A JSON string: drop the closing quote, so keys starting with
+            # ``start`` follow.
+            seek = seek[:-1]
+        db = store._db_for_partition(partition)
+        if store.use_rocksdict:
+            import rocksdict
+
+            # Iterate past the seek key's prefix when the store has a
+            # prefix extractor.
+            options = rocksdict.ReadOptions()
+            options.set_total_order_seek(True)
+            it = db.iter(options)
+            it.seek(seek)
+            while it.valid():
+                key = it.key()
+                if key != store.offset_key:
+                    yield store._decode_key(key)
+                it.next()
+        else:
+            it = db.iterkeys()  # noqa: B301
+            it.seek(seek)
+            for key in it:
+                if key != store.offset_key:
+                    yield store._decode_key(key)
+
 
 class KasprGlobalTable(faust.GlobalTable):
     """Implements custom behavior for faust table"""
@@ -1,9 +1,12 @@
+import typing
 from .utils import SchedulerPart
-from .checkpoint import Checkpoint
-from .dispatcher import Dispatcher
-from .janitor import Janitor
-from .ticker import CronTicker
-from .manager import MessageScheduler
+
+if typing.TYPE_CHECKING:
+    from .checkpoint import Checkpoint
+    from .dispatcher import Dispatcher
+    from .janitor import Janitor
+    from .ticker import CronTicker
+    from .manager import MessageScheduler
 
 __all__ = [
     "SchedulerPart",
@@ -12,4 +15,30 @@ __all__ = [
     "Janitor",
     "CronTicker",
     "MessageScheduler",    
-]
\ No newline at end of file
+]
+
+# Services are imported on first access, so modules only needing the
+# scheduler utilities (e.g. the monitor) do not load the whole scheduler.
+_EXPORTS = {
+    "Checkpoint": "kaspr.scheduler.checkpoint",
+    "Dispatcher": "kaspr.scheduler.dispatcher",
+    "Janitor": "kaspr.scheduler.janitor",
+    "CronTicker": "kaspr.scheduler.ticker",
+    "MessageScheduler": "kaspr.scheduler.manager",
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> typing.List[str]:
+    return sorted(list(globals()) + __all__)
@@ -1,7 +1,7 @@
 from mode import Service
 from typing import Any, Mapping, Optional
 from kaspr.types import KasprAppT, TTLocation, CheckpointT, PT
-from faust.serializers.codecs import get_codec
+from faust.serializers import codecs
 from faust.types import FutureMessage, RecordMetadata
 from mode.utils.locks import Event
 from kaspr.sensors.kaspr import KasprMonitor
@@ -23,7 +23,9 @@ class Checkpoint(CheckpointT, Service):
     #: Ensures janitor starts after dispatcher has made the first checkpoint
     dispatcher_checkpointed: Event
 
-    _json_codec = get_codec("json")
+    # Not looked up with get_codec, which loads codec extensions (and
+    # pkg_resources) when this module is imported.
+    _json_codec = codecs.json()
 
     def __init__(self, app: KasprAppT, monitor: KasprMonitor, **kwargs: Any) -> None:
         super().__init__(**kwargs)
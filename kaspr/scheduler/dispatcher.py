@@ -1,17 +1,38 @@
 import asyncio
 import gc
+from collections import deque
 from mode import Service
 from mode.utils.objects import cached_property
 from mode.utils.futures import notify
-from typing import Any, Mapping, MutableSet, Optional, Set
-from faust.types import ChannelT, StreamT, TopicT, FutureMessage, RecordMetadata
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    MutableSet,
+    Optional,
+    Set,
+    Tuple,
+)
+from faust.types import ChannelT, TopicT, FutureMessage, RecordMetadata
 from kaspr.types import KasprAppT, CheckpointT, TTLocation, TTMessage, PT
 from kaspr.sensors.kaspr import KasprMonitor
 from mode.utils.locks import Event
-from .utils import create_message_key, current_timekey, SchedulerPart
+from .utils import current_timekey, seek_timekey, SchedulerPart
 
 SECONDS_PER_DAY = 86400
 
+#: Encoded headers of recent messages kept for reuse, see
+#: :meth:`Dispatcher.encode_headers`.
+HEADER_CACHE_SIZE = 1024
+
+#: Scan modes, see :attr:`Dispatcher.scan_mode`.
+SCAN_INDEX = "index"
+SCAN_RANGE = "range"
+SCAN_PROBE = "probe"
+
 
 class Dispatcher(Service):
     """Finds messages due for delivery.
@@ -39,6 +60,17 @@ class Dispatcher(Service):
     1707171901-0  | {...}     <--- MessageKey
     ...
 
+    In ``index`` scan mode (see :attr:`scan_mode`), seconds without a
+    TimeKey are not looked up one by one: the next occupied second is read
+    from the partition's :class:`~kaspr.scheduler.occupancy.OccupancyIndex`,
+    at the cost of one lookup per empty hour. In ``range`` scan mode a
+    store iterator is seeked to the next TimeKey instead, so catching up
+    costs one seek per scheduled second. The keys above are
+    the ``string`` layout, whose TimeKeys are digit strings of equal length
+    and so sort in time order. In the ``binary`` layout (see
+    :class:`~kaspr.scheduler.utils.TimetableKeys`) TimeKeys sort apart
+    from other keys, so the seek lands on the next TimeKey directly.
+
     """
 
     #: Records all statistics about dispatching
@@ -66,6 +98,18 @@ class Dispatcher(Service):
     #: shutting down or resuming a rebalance.
     _unacked_deliveries: MutableSet[TTLocation]
 
+    #: Deliveries in the order they were dispatched, up to the first one
+    #: not acked yet. The checkpoint only advances over acked deliveries
+    #: at its front.
+    _delivery_order: Deque[TTLocation]
+
+    #: Acked deliveries still behind an unacked one in ``_delivery_order``.
+    _acked_deliveries: Set[TTLocation]
+
+    #: ``deliver_messages`` sets this to be notified when a send is acked
+    #: while the in-flight window is full.
+    _waiting_for_window: Optional[asyncio.Future] = None
+
     def __init__(
         self, app: KasprAppT, partition: int, monitor: KasprMonitor, **kwargs: Any
     ) -> None:
@@ -79,6 +123,10 @@ class Dispatcher(Service):
         self._waiting_for_ack = None
         self._unacked_deliveries = set()
         self._pending_delivery_count = 0
+        self._delivery_order = deque()
+        self._acked_deliveries = set()
+        self._in_flight = 0
+        self._encoded_headers: Dict[Tuple, Tuple] = {}
 
     def on_init_dependencies(self):
         return []
@@ -109,6 +157,23 @@ class Dispatcher(Service):
         # add to set of pending deliveries that must be acked for graceful
         # shutdown.
         self._unacked_deliveries.add(location)
+        self._delivery_order.append(location)
+
+    def ack_delivery(self, location: TTLocation) -> Optional[TTLocation]:
+        """Mark a delivery as acked.
+
+        Returns the last of the deliveries acked without gaps since the
+        previous call, i.e. the location the checkpoint may advance to, or
+        None if an earlier delivery is still unacked.
+        """
+        self._unacked_deliveries.discard(location)
+        self._acked_deliveries.add(location)
+        order, acked = self._delivery_order, self._acked_deliveries
+        contiguous = None
+        while order and order[0] in acked:
+            contiguous = order.popleft()
+            acked.discard(contiguous)
+        return contiguous
 
     @property
     def default_checkpoint(self) -> TTLocation:
@@ -185,6 +250,8 @@ class Dispatcher(Service):
         partition = self.partition
         checkpoints = self.checkpoints
         timetable = self.app.scheduler.timetable
+        keys = self.app.scheduler.timetable_keys
+        prefetch = max(self.app.conf.scheduler_dispatcher_prefetch_slots, 1)
         pending_deliveries = self.pending_deliveries
 
         await self.wait(self.app.scheduler.topics_created)
@@ -193,6 +260,7 @@ class Dispatcher(Service):
         if self.should_stop:
             return
 
+        skip_empty = self.scan_mode != SCAN_PROBE
         cp = checkpoints.get(self.pt, default=self.default_checkpoint)
         # starting timekey and sequence number
         time_key, seq = (
@@ -213,13 +281,27 @@ class Dispatcher(Service):
                 if self.last_location and time_key == self.last_location.time_key:
                     time_key += 1
                     continue
+                if skip_empty and seq == 0:
+                    occupied = self.next_timekey(time_key, highwater.time_key)
+                    if occupied != time_key:
+                        # Nothing is scheduled until ``occupied``.
+                        time_key = (
+                            highwater.time_key + 1 if occupied is None else occupied
+                        )
+                        location = TTLocation(partition, time_key - 1, seq)
+                        self.last_location = location
+                        await asyncio.sleep(0)
+                        continue
 
                 location = TTLocation(partition, time_key, seq)
                 await self._maybe_wait()
                 if self.should_stop:
                     break
                 allocated_slots = (
-                    timetable.get_for_partition(str(time_key), partition=partition) or 0
+                    timetable.get_for_partition(
+                        keys.timekey(time_key), partition=partition
+                    )
+                    or 0
                 )
                 if seq < allocated_slots:
                     self.log.info(
@@ -232,20 +314,32 @@ class Dispatcher(Service):
                 # lookups for canceled slots to keep CANCEL simple and append-only
                 # sequence assignment intact. Use timetable key `timekey:live` for the
                 # actual count of still-scheduled messages at this second.
+                # Slots are read in batches of up to ``prefetch`` with one
+                # multi-get each, rather than one lookup per slot.
                 while seq < allocated_slots:
-                    location = TTLocation(partition, time_key, seq)
                     await self._maybe_wait()
                     if self.should_stop:
                         break
-                    message_key = create_message_key(location)
-                    message = timetable.get_for_partition(
-                        message_key, partition=partition
+                    locations = [
+                        TTLocation(partition, time_key, slot)
+                        for slot in range(seq, min(seq + prefetch, allocated_slots))
+                    ]
+                    messages = timetable.get_many_for_partition(
+                        [keys.message(slot) for slot in locations],
+                        partition=partition,
                     )
-                    if message:
-                        self._pending_delivery_count += 1
-                        await pending_deliveries.put(TTMessage(message, location))
-                    self.last_location = location
-                    seq += 1
+                    evaluated = None
+                    for slot, message in zip(locations, messages):
+                        if not self.flow_active or self.should_stop:
+                            # Paused: the rest of the batch is read again.
+                            break
+                        if message:
+                            self._pending_delivery_count += 1
+                            await pending_deliveries.put(TTMessage(message, slot))
+                        evaluated = location = slot
+                        seq += 1
+                    if evaluated is not None:
+                        self.last_location = evaluated
                     await asyncio.sleep(0)
 
                 # reset sequence
@@ -257,59 +351,186 @@ class Dispatcher(Service):
             gc.collect()
             await self.sleep(0.25)
 
+    @cached_property
+    def scan_mode(self) -> str:
+        """How due seconds are found: ``index``, ``range`` or ``probe``.
+
+        ``index`` is used whenever the occupancy index is enabled.
+        """
+        if self.app.scheduler.occupancy is not None:
+            return SCAN_INDEX
+        mode = self.app.conf.scheduler_dispatcher_scan_mode
+        if mode not in (SCAN_RANGE, SCAN_PROBE):
+            raise ValueError(f"Unknown dispatcher scan mode `{mode}`")
+        if mode == SCAN_RANGE and not self.app.scheduler.timetable.can_seek:
+            self.log.warning(
+                "Timetable store cannot seek; looking up every second instead."
+            )
+            return SCAN_PROBE
+        return mode
+
+    def next_timekey(self, time_key: int, until: int) -> Optional[int]:
+        """Return the first TimeKey from ``time_key`` to ``until`` holding
+        messages, or None.
+
+        In ``index`` scan mode, the ``range`` scan is used instead while the
+        partition's index is not built, or ``probe`` if the store cannot
+        seek.
+        """
+        scheduler = self.app.scheduler
+        timetable = scheduler.timetable
+        if self.scan_mode == SCAN_INDEX:
+            if scheduler.occupancy.is_built(self.partition):
+                return scheduler.occupancy.next_occupied(
+                    time_key, until, self.partition
+                )
+            if not timetable.can_seek:
+                return time_key
+        return seek_timekey(
+            timetable, scheduler.timetable_keys, time_key, until, self.partition
+        )
+
     def on_message_sent(self, delivery: TTMessage) -> None:
         """Called after a scheduled message is sent to a destination topic."""
 
         def _did_send(fut: FutureMessage):
-            res: RecordMetadata = fut.result()
-
-            # update checkpoint
-            if res.offset is not None:
+            try:
+                res: RecordMetadata = fut.result()
+
+                if res.offset is None:
+                    # Not confirmed: it holds back the checkpoint until the
+                    # periodic checkpoint passes it once all sends settle.
+                    self._unacked_deliveries.discard(delivery.location)
+                    return
                 self.monitor.on_message_delivered(self)
-                prev, new = (
-                    self.checkpoints.get(self.pt),
-                    delivery.location,
-                )
-                if prev is None or new > prev:
-                    self.checkpoints.update(self.pt, new)
-                    self.log.dev(f"Delivered {new}!")
-            notify(self._waiting_for_ack)
-            self._unacked_deliveries.discard(delivery.location)
-            self._pending_delivery_count -= 1
+                # Sends to different topics are acked out of order: the
+                # checkpoint only advances once all earlier deliveries are acked.
+                new = self.ack_delivery(delivery.location)
+                if new is not None:
+                    prev = self.checkpoints.get(self.pt)
+                    if prev is None or new > prev:
+                        self.checkpoints.update(self.pt, new)
+                        self.log.dev(f"Delivered {new}!")
+            except BaseException as exc:
+                self.on_delivery_failed([delivery.location], exc)
+            finally:
+                self._in_flight -= 1
+                self._pending_delivery_count -= 1
+                notify(self._waiting_for_window)
+                notify(self._waiting_for_ack)
 
         return _did_send
 
+    def on_delivery_failed(
+        self, locations: Iterable[TTLocation], exc: BaseException
+    ) -> None:
+        """Called when scheduled messages could not be sent.
+
+        Failed deliveries are never acked, so the checkpoint cannot advance
+        past them, and they are dispatched again when the dispatcher next
+        starts from its checkpoint. The dispatcher crashes rather than keep
+        going with a gap it can never close.
+        """
+        self.log.error("Failed to deliver %r: %r", sorted(locations), exc)
+        if not self.should_stop:
+            self.add_future(self.crash(exc))
+
+    def encode_headers(self, headers: Optional[Mapping[str, Any]]) -> Optional[Tuple]:
+        """Return the headers of a scheduled message, encoded for sending.
+
+        Messages scheduled together often share their headers, so encoded
+        headers are reused. They are returned as a tuple of pairs, which
+        the producer copies into a list of its own.
+        """
+        if headers is None:
+            return None
+        items = tuple(headers.items())
+        encoded = self._encoded_headers.get(items)
+        if encoded is None:
+            if len(self._encoded_headers) >= HEADER_CACHE_SIZE:
+                self._encoded_headers.clear()
+            encoded = self._encoded_headers[items] = tuple(
+                (k, v if isinstance(v, bytes) else v.encode()) for k, v in items
+            )
+        return encoded
+
+    async def _wait_for_window(self) -> None:
+        # arm future so that an ack can wake us up
+        self._waiting_for_window = asyncio.Future(loop=self.loop)
+        try:
+            await asyncio.wait_for(self._waiting_for_window, timeout=1)
+        except (asyncio.TimeoutError, asyncio.CancelledError):  # pragma: no cover
+            pass
+        finally:
+            self._waiting_for_window = None
+
     @Service.task
     async def deliver_messages(self):
-        """Stream processor sending messages to destination topic(s)"""
+        """Stream processor sending messages to destination topic(s)
 
-        stream: StreamT[TTMessage] = self.app.stream(
-            self.pending_deliveries, beacon=self.beacon
-        )
+        Due messages are taken in batches of what is queued, without waiting
+        for more, and sent grouped by destination topic. Sends are not
+        awaited one by one: up to ``scheduler_dispatcher_max_in_flight`` may
+        be waiting for their ack.
+        """
+
+        conf = self.app.conf
+        # Subscribes to the channel; its queue pauses with flow control.
+        channel: ChannelT[TTMessage] = self.pending_deliveries.__aiter__()
         topics: Mapping[str, TopicT] = {}
+        batch_size = max(conf.scheduler_dispatcher_delivery_batch_size, 1)
+        max_in_flight = max(conf.scheduler_dispatcher_max_in_flight, 1)
 
         await self.app.tables.wait_until_recovery_completed()
 
-        async for delivery in stream:
+        # Deliveries tracked by a previous run (before a crash) are never
+        # acked now; they would hold back the checkpoint for good.
+        self._delivery_order.clear()
+        self._acked_deliveries.clear()
+
+        while not self.should_stop:
+            batch = [await channel.get()]
+            # get() returns at once while the queue is not empty.
+            while len(batch) < batch_size and not channel.empty():
+                batch.append(await channel.get())
+            # Puts to the channel wait while flow control is suspended for a
+            # rebalance, and the queue is cleared on resume; a batch taken
+            # before the pause is held here until the dispatcher resumes.
             await self._maybe_wait()
-            # TODO: Confirm stream is "paused" during rebalance and recovery
-            message = delivery.message
-            tpname = message["__kms"]["d"]
-            if not topics.get(tpname):
-                topics[tpname] = self.app.topic(tpname)
-            self.track_delivery(delivery.location)
-
-            await topics.get(tpname).send(
-                key=message["k"],
-                value=message["v"],
-                headers={
-                    k: (v if isinstance(v, bytes) else v.encode())
-                    for k, v in message["h"].items()
-                }
-                if message["h"] is not None
-                else None,
-                callback=self.on_message_sent(delivery),
-            )
+            by_topic: Dict[str, List[TTMessage]] = {}
+            for delivery in batch:
+                # Tracked in dispatch order, before sends are reordered.
+                self.track_delivery(delivery.location)
+                tpname = delivery.message["__kms"]["d"]
+                by_topic.setdefault(tpname, []).append(delivery)
+
+            unsent = {delivery.location for delivery in batch}
+            for tpname, deliveries in by_topic.items():
+                topic = topics.get(tpname)
+                if topic is None:
+                    topic = topics[tpname] = self.app.topic(tpname)
+                for delivery in deliveries:
+                    while self._in_flight >= max_in_flight:
+                        await self._wait_for_window()
+                    message = delivery.message
+                    self._in_flight += 1
+                    try:
+                        await topic.send(
+                            key=message["k"],
+                            value=message["v"],
+                            headers=self.encode_headers(message["h"]),
+                            callback=self.on_message_sent(delivery),
+                        )
+                    except Exception as exc:
+                        self._in_flight -= 1
+                        # The rest of the batch stays tracked but unacked,
+                        # which keeps the checkpoint before all of it.
+                        self.on_delivery_failed(unsent, exc)
+                        return
+                    except BaseException:
+                        self._in_flight -= 1
+                        raise
+                    unsent.discard(delivery.location)
 
     @Service.task
     async def _periodic_checkpoint(self):
@@ -331,6 +552,10 @@ class Dispatcher(Service):
                 and self._pending_delivery_count == 0
             ):
                 self.checkpoints.update(self.pt, self.last_location)
+                # Everything sent has settled; only unconfirmed deliveries
+                # can be left in the dispatch order.
+                self._delivery_order.clear()
+                self._acked_deliveries.clear()
             await self.sleep(interval)
 
     @property
@@ -9,7 +9,7 @@ from kaspr.types import KasprAppT, CheckpointT, TTLocation, TTMessage, PT
 from kaspr.sensors.kaspr import KasprMonitor
 from mode.utils.locks import Event
 
-from .utils import create_message_key, current_timekey, SchedulerPart, TK_LIVE_SUFFIX
+from .utils import current_timekey, seek_timekey, SchedulerPart
 
 SECONDS_PER_DAY = 86400
 
@@ -196,6 +196,8 @@ class Janitor(Service):
         partition = self.partition
         checkpoints = self.checkpoints
         timetable = self.app.scheduler.timetable
+        keys = self.app.scheduler.timetable_keys
+        occupancy = self.app.scheduler.occupancy
         pending_removals = self.pending_removals
 
         # Ensure topics are created
@@ -232,13 +234,36 @@ class Janitor(Service):
                 if self.last_location and time_key == self.last_location:
                     time_key += 1
                     continue
+                if occupancy is not None and seq == 0:
+                    if occupancy.is_built(partition):
+                        occupied = occupancy.next_occupied(
+                            time_key, highwater.time_key, partition
+                        )
+                    elif timetable.can_seek:
+                        occupied = seek_timekey(
+                            timetable, keys, time_key, highwater.time_key, partition
+                        )
+                    else:
+                        occupied = time_key
+                    if occupied != time_key:
+                        # Nothing to remove until ``occupied``.
+                        time_key = (
+                            highwater.time_key + 1 if occupied is None else occupied
+                        )
+                        location = TTLocation(partition, time_key - 1, seq)
+                        self.last_location = location
+                        await asyncio.sleep(0)
+                        continue
 
                 location = TTLocation(partition, time_key, seq)
                 await self._maybe_wait()
                 if self.should_stop:
                     break
                 allocated_slots = (
-                    timetable.get_for_partition(str(time_key), partition=partition) or 0
+                    timetable.get_for_partition(
+                        keys.timekey(time_key), partition=partition
+                    )
+                    or 0
                 )
                 if seq < allocated_slots:
                     self.log.info(
@@ -252,7 +277,7 @@ class Janitor(Service):
                         await self._maybe_wait()
                         if self.should_stop:
                             break
-                        message_key = create_message_key(location)
+                        message_key = keys.message(location)
                         message = timetable.get_for_partition(
                             message_key, partition=partition
                         )
@@ -318,6 +343,7 @@ class Janitor(Service):
             await self._maybe_wait()
             # TODO: Confirm stream is "paused" during rebalance and recovery
             timetable = self.app.scheduler.timetable
+            keys = self.app.scheduler.timetable_keys
             schedule_index = self.app.scheduler.schedule_index
             partition, timekey, sequence = (
                 location.partition,
@@ -326,7 +352,7 @@ class Janitor(Service):
             )
 
             if sequence >= 0:
-                message_key = create_message_key(location)
+                message_key = keys.message(location)
                 message = timetable.get_for_partition(message_key, partition=partition)
                 self.track_removal(location)
                 timetable.del_for_partition(
@@ -354,12 +380,15 @@ class Janitor(Service):
             elif sequence < 0:
                 self.track_removal(location)
                 timetable.del_for_partition(
-                    str(timekey),
+                    keys.timekey(timekey),
                     partition=partition,
                     callback=self.on_changelog_sent(location),
                 )
+                occupancy = self.app.scheduler.occupancy
+                if occupancy is not None:
+                    occupancy.discard(timekey, partition)
                 # Remove the companion live-count key for this timekey, if present
-                live_key = f"{timekey}{TK_LIVE_SUFFIX}"
+                live_key = keys.live(timekey)
                 if timetable.get_for_partition(live_key, partition=partition) is not None:
                     timetable.del_for_partition(live_key, partition=partition)
 
@@ -4,7 +4,17 @@ import json
 from collections import defaultdict
 from math import floor
 from mode import Service
-from typing import Any, Set, MutableMapping, Mapping, List, Sequence, Iterator, Optional
+from typing import (
+    Any,
+    Callable,
+    Set,
+    MutableMapping,
+    Mapping,
+    List,
+    Sequence,
+    Iterator,
+    Optional,
+)
 from mode.utils.objects import cached_property
 from mode.utils.locks import Event
 from faust.types import TP, StreamT, EventT, TopicT
@@ -24,14 +34,22 @@ from kaspr.utils.functional import iso_datestr_to_datetime
 from .checkpoint import Checkpoint
 from .dispatcher import Dispatcher
 from .janitor import Janitor
+from .occupancy import OccupancyIndex
 from .ticker import CronTicker
 from .utils import (
-    create_message_key,
     current_timekey,
     prettydate,
     locdiff,
     SchedulerPart,
-    TK_LIVE_SUFFIX,
+    TAG_LIVE,
+    TAG_MESSAGE,
+    TAG_TIMEKEY,
+    BINARY_KEY_PREFIX_LENGTH,
+    OCCUPANCY_PREFIX,
+    SCAN_BATCH_SIZE,
+    TimetableKeyCodec,
+    TimetableKeys,
+    parse_string_key,
     validate_cron_expr,
     compute_next_fire,
     compute_fires_in_window,
@@ -98,6 +116,10 @@ class MessageScheduler(MessageSchedulerT, Service):
     #: cached topics of delivery destinations
     _out_topics: Mapping[str, TopicT]
 
+    #: Number of rebalances started, so work done when a rebalance
+    #: completes can tell that another one started meanwhile.
+    _rebalances: int
+
     def __init__(self, app: KasprAppT, **kwargs: Any) -> None:
         self.app = app
         self.monitor = self.app.monitor
@@ -113,6 +135,7 @@ class MessageScheduler(MessageSchedulerT, Service):
         self._janitors = {}
         self._tickers = {}
         self._out_topics = {}
+        self._rebalances = 0
         super().__init__(**kwargs)
 
         # Attach event hooks to changes to partitions so
@@ -161,20 +184,46 @@ class MessageScheduler(MessageSchedulerT, Service):
     async def maybe_create_topics(self):
         """Create topics required for scheduling service."""
 
-        # Ensure producer has starter before creating topics.
-        await self.app.producer.maybe_start()
+        await self.app.declare_topics(self.topics_to_declare())
+        self.topics_created.set()
 
-        topics = [
-            self.schedule_rejections_topic.maybe_declare(),
-            self.schedule_requests_topic.maybe_declare(),
-            self.schedule_actions_topic.maybe_declare(),
+    def topics_to_declare(self) -> List[TopicT]:
+        """Return topics required for scheduling service."""
+        return [
+            self.schedule_rejections_topic,
+            self.schedule_requests_topic,
+            self.schedule_actions_topic,
         ]
-        await asyncio.gather(*topics)
-        self.topics_created.set()
 
     async def on_timetable_recovery_completed(
         self, sender: Any, actives, standbys, **kwargs
     ):
+        changelog_topic = self.timetable.changelog_topic.get_topic_name()
+        rebalances = self._rebalances
+
+        def aborted() -> bool:
+            # Another rebalance started: this one's recovery is abandoned.
+            return self.should_stop or self._rebalances != rebalances
+
+        for topic, partition in actives:
+            if topic != changelog_topic:
+                continue
+            if self.timetable_keys.binary:
+                migrated = await self.migrate_timetable_keys(partition, aborted)
+                if migrated is None:
+                    return
+            occupancy = self.occupancy
+            if occupancy is not None:
+                # Also done when the index is built: TimeKeys may have been
+                # written without it, e.g. by an earlier release.
+                repaired = await occupancy.rebuild(partition, aborted)
+                if repaired is None:
+                    return
+                if repaired:
+                    self.log.info(
+                        f"Rebuilt occupancy index @ P{partition}: "
+                        f"{repaired} keys updated."
+                    )
         self.timetable_recovered.set()
         self.can_distribute.set()
         self.checkpoints.resume()
@@ -197,7 +246,78 @@ class MessageScheduler(MessageSchedulerT, Service):
     ):
         pass
 
+    async def migrate_timetable_keys(
+        self, partition: int, aborted: Callable[[], bool] = lambda: False
+    ) -> Optional[int]:
+        """Rewrite ``string`` layout keys of a timetable partition in the
+        ``binary`` layout, returning the number of keys rewritten.
+
+        Called once the partition is recovered and before dispatchers,
+        janitors and tickers resume, so nothing else reads or writes the
+        partition meanwhile. Rewrites go through the changelog, so standbys
+        and later recoveries only see binary keys.
+
+        Keys are visited in batches of
+        :data:`~kaspr.scheduler.utils.SCAN_BATCH_SIZE`, yielding to the event
+        loop in between. Returns None if ``aborted()`` became true; keys not
+        migrated yet are migrated by the next recovery, as each key is
+        rewritten before the string one is deleted.
+        """
+        timetable = self.timetable
+        keys = self.timetable_keys
+        if timetable.can_seek:
+            # JSON strings sort after binary keys and before checkpoints
+            # (JSON lists), so this visits only string keys.
+            candidates = timetable.keys_from_partition("", partition)
+        else:
+            candidates = [
+                key
+                for key, _ in timetable.items_for_partition(partition)
+                if type(key) is str
+            ]
+        migrated = 0
+        for count, key in enumerate(candidates, 1):
+            if type(key) is not str:
+                break
+            if not count % SCAN_BATCH_SIZE:
+                await asyncio.sleep(0)
+                if aborted():
+                    return None
+            parsed = parse_string_key(key)
+            if parsed is None:
+                if key.startswith(OCCUPANCY_PREFIX):
+                    # Built again from the binary TimeKeys.
+                    timetable.del_for_partition(key, partition=partition)
+                continue
+            tag, time_key, sequence = parsed
+            if tag == TAG_MESSAGE:
+                new_key = keys.message(TTLocation(partition, time_key, sequence))
+            elif tag == TAG_LIVE:
+                new_key = keys.live(time_key)
+            else:
+                new_key = keys.timekey(time_key)
+            value = timetable.get_for_partition(key, partition=partition)
+            existing = timetable.get_for_partition(new_key, partition=partition)
+            if existing is None or (tag == TAG_TIMEKEY and value > existing):
+                timetable.update_for_partition({new_key: value}, partition=partition)
+            elif tag != TAG_TIMEKEY and existing != value:
+                # Only possible after switching back to the string layout.
+                # An equal entry was written by an interrupted migration.
+                self.log.warning(
+                    f"Timetable key {key!r} @ P{partition} already exists "
+                    "in the binary layout; keeping the binary entry."
+                )
+            timetable.del_for_partition(key, partition=partition)
+            migrated += 1
+        if migrated:
+            self.log.info(
+                f"Migrated {migrated} timetable keys @ P{partition} "
+                "to the binary layout."
+            )
+        return migrated
+
     def on_rebalance_started(self, sender: Any, **kwargs):
+        self._rebalances += 1
         self.timetable_recovered.clear()
         self.can_distribute.clear()
         self.checkpoints.on_rebalance_started()
@@ -413,19 +533,28 @@ class MessageScheduler(MessageSchedulerT, Service):
 
     def prepare_timetable(self):
         """Prepare the timetable table."""
-        return self.app.Table(
+        options = {
+            "write_buffer_size": self.app.conf.store_rocksdb_write_buffer_size,
+            "max_write_buffer_number": self.app.conf.store_rocksdb_max_write_buffer_number,
+            "target_file_size_base": self.app.conf.store_rocksdb_target_file_size_base,
+            "block_cache_size": self.app.conf.store_rocksdb_block_cache_size,
+            "block_cache_compressed_size": self.app.conf.store_rocksdb_block_cache_compressed_size,
+            "bloom_filter_size": self.app.conf.store_rocksdb_bloom_filter_size,
+            "set_cache_index_and_filter_blocks": self.app.conf.store_rocksdb_set_cache_index_and_filter_blocks,
+        }
+        if self.timetable_keys.binary:
+            # Bloom filters by second: all binary keys of a second share
+            # their first BINARY_KEY_PREFIX_LENGTH bytes.
+            options["prefix_extractor_enabled"] = True
+            options["prefix_max_length"] = BINARY_KEY_PREFIX_LENGTH
+        table = self.app.Table(
             "timetable",
             partitions=self.app.conf.scheduler_topic_partitions,
-            options={
-                "write_buffer_size": self.app.conf.store_rocksdb_write_buffer_size,
-                "max_write_buffer_number": self.app.conf.store_rocksdb_max_write_buffer_number,
-                "target_file_size_base": self.app.conf.store_rocksdb_target_file_size_base,
-                "block_cache_size": self.app.conf.store_rocksdb_block_cache_size,
-                "block_cache_compressed_size": self.app.conf.store_rocksdb_block_cache_compressed_size,
-                "bloom_filter_size": self.app.conf.store_rocksdb_bloom_filter_size,
-                "set_cache_index_and_filter_blocks": self.app.conf.store_rocksdb_set_cache_index_and_filter_blocks,
-            },
+            options=options,
         )
+        # Set before the store and changelog are created, which read it.
+        table.key_serializer = TimetableKeyCodec()
+        return table
 
     def prepare_schedule_index(self):
         """Prepare the schedule index table.
@@ -509,6 +638,18 @@ class MessageScheduler(MessageSchedulerT, Service):
         """Timetable table."""
         return self.prepare_timetable()
 
+    @cached_property
+    def timetable_keys(self) -> TimetableKeys:
+        """Builds timetable keys in the configured layout."""
+        return TimetableKeys(self.app.conf.scheduler_timetable_key_format)
+
+    @cached_property
+    def occupancy(self) -> Optional[OccupancyIndex]:
+        """Index of occupied timetable seconds, if enabled."""
+        if not self.app.conf.scheduler_occupancy_index_enabled:
+            return None
+        return OccupancyIndex(self.timetable, self.timetable_keys)
+
     @cached_property
     def schedule_index(self) -> KasprTableT:
         """Reverse index mapping request IDs to Timetable locations."""
@@ -652,11 +793,11 @@ class MessageScheduler(MessageSchedulerT, Service):
             loc_time_key = index_entry["tk"]
             loc_sequence = index_entry["seq"]
             location = TTLocation(partition, loc_time_key, loc_sequence)
-            message_key = create_message_key(location)
+            message_key = self.timetable_keys.message(location)
             timetable.del_for_partition(message_key, partition=partition)
             schedule_index.del_for_partition(fire_request_id, partition=partition)
             # Decrement live count
-            live_key = f"{loc_time_key}{TK_LIVE_SUFFIX}"
+            live_key = self.timetable_keys.live(loc_time_key)
             live_value = timetable.get_for_partition(live_key, partition=partition)
             live_count = self._live_count_from_value(live_value)
             if live_count > 0:
@@ -851,6 +992,7 @@ class MessageScheduler(MessageSchedulerT, Service):
             _action = action.decode() if isinstance(action, bytes) else action
             partition = event.message.partition
             timetable = self.app.scheduler.timetable
+            timetable_keys = self.app.scheduler.timetable_keys
             schedule_index = self.app.scheduler.schedule_index
 
             _request_id = (
@@ -1091,7 +1233,7 @@ class MessageScheduler(MessageSchedulerT, Service):
                     loc_time_key = index_entry["tk"]
                     loc_sequence = index_entry["seq"]
                     location = TTLocation(partition, loc_time_key, loc_sequence)
-                    message_key = create_message_key(location)
+                    message_key = timetable_keys.message(location)
 
                     if _action == SCHEDULER_ACTION_REPLACE:
                         existing_fingerprint = index_entry.get("fp")
@@ -1127,7 +1269,7 @@ class MessageScheduler(MessageSchedulerT, Service):
                     timetable.del_for_partition(message_key, partition=partition)
                     schedule_index.del_for_partition(_request_id, partition=partition)
                     # Decrement the live count for this timekey
-                    live_key = f"{loc_time_key}{TK_LIVE_SUFFIX}"
+                    live_key = timetable_keys.live(loc_time_key)
                     live_value = timetable.get_for_partition(
                         live_key, partition=partition
                     )
@@ -1178,11 +1320,12 @@ class MessageScheduler(MessageSchedulerT, Service):
                     )
                     continue
 
+                count_key = timetable_keys.timekey(int(time_key))
                 message_total = (
-                    timetable.get_for_partition(time_key, partition=partition) or 0
+                    timetable.get_for_partition(count_key, partition=partition) or 0
                 )
                 location = TTLocation(partition, int(time_key), sequence=message_total)
-                message_key = create_message_key(location)
+                message_key = timetable_keys.message(location)
 
                 if _action == SCHEDULER_ACTION_REPLACE and replace_message_entry:
                     message_entry = replace_message_entry
@@ -1194,12 +1337,12 @@ class MessageScheduler(MessageSchedulerT, Service):
                     )
 
                 entry_fingerprint = self._schedule_fingerprint(int(time_key), message_entry)
-                live_key = f"{time_key}{TK_LIVE_SUFFIX}"
+                live_key = timetable_keys.live(int(time_key))
                 live_value = timetable.get_for_partition(live_key, partition=partition)
                 live_count = self._live_count_from_value(live_value)
                 timetable.update_for_partition(
                     {
-                        time_key: message_total + 1,
+                        count_key: message_total + 1,
                         live_key: self._next_live_value(
                             live_count + 1, existing=live_value
                         ),
@@ -1207,6 +1350,8 @@ class MessageScheduler(MessageSchedulerT, Service):
                     },
                     partition=partition,
                 )
+                if not message_total and self.occupancy is not None:
+                    self.occupancy.add(int(time_key), partition)
 
                 # Store reverse index entry when request_id is provided
                 if _request_id:
@@ -0,0 +1,280 @@
+import asyncio
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from kaspr.types import KasprTableT
+from .utils import (
+    TimetableKeys,
+    parse_string_key,
+    BINARY_KEY_PREFIX_LENGTH,
+    OCCUPANCY_PREFIX,
+    SCAN_BATCH_SIZE,
+    TAG_OCCUPIED_HOUR,
+    TAG_OCCUPIED_MINUTE,
+    TAG_TIMEKEY,
+)
+
+SECONDS_PER_MINUTE = 60
+MINUTES_PER_HOUR = 60
+
+#: Version stored in a partition's built marker. Markers of other versions
+#: (including ones written by earlier releases) mean the index is rebuilt.
+OCCUPANCY_INDEX_VERSION = 2
+
+
+def _lowest_bit(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+class OccupancyIndex:
+    """Index of the seconds of a Timetable partition holding a TimeKey.
+
+    The index is stored in the Timetable itself, so it is written to the
+    changelog and recovered with the keys it indexes:
+
+    Timetable
+    ---------------------------------
+    Key                | Value
+    ---------------------------------
+    minute 28452863    | 0b1001     <--- seconds 0 and 3 are occupied
+    hour 474214        | 0b1000...  <--- minute 23 is occupied
+    ...
+
+    A second is set when its TimeKey is created, and cleared when the
+    janitor removes the TimeKey, so canceled messages keep their second
+    occupied until then. Finding the next occupied second reads one key per
+    hour of empty schedule, instead of one per second.
+
+    TimeKeys may also be written without updating the index, with the index
+    disabled or by an earlier release, so the index is checked against the
+    TimeKeys every time the partition is recovered (see :meth:`rebuild`).
+    Until that has completed, :meth:`is_built` is False and scans must not
+    use the index.
+    """
+
+    def __init__(self, timetable: KasprTableT, keys: TimetableKeys) -> None:
+        self.timetable = timetable
+        self.keys = keys
+
+    def _minute_mask(self, minute: int, partition: int) -> int:
+        return (
+            self.timetable.get_for_partition(
+                self.keys.occupied_minute(minute), partition=partition
+            )
+            or 0
+        )
+
+    def _hour_mask(self, hour: int, partition: int) -> int:
+        return (
+            self.timetable.get_for_partition(
+                self.keys.occupied_hour(hour), partition=partition
+            )
+            or 0
+        )
+
+    def add(self, time_key: int, partition: int) -> None:
+        """Mark ``time_key`` as occupied."""
+        minute, second = divmod(time_key, SECONDS_PER_MINUTE)
+        mask = self._minute_mask(minute, partition)
+        if mask >> second & 1:
+            return
+        changes = {self.keys.occupied_minute(minute): mask | 1 << second}
+        if not mask:
+            hour, offset = divmod(minute, MINUTES_PER_HOUR)
+            changes[self.keys.occupied_hour(hour)] = (
+                self._hour_mask(hour, partition) | 1 << offset
+            )
+        self.timetable.update_for_partition(changes, partition=partition)
+
+    def discard(self, time_key: int, partition: int) -> None:
+        """Mark ``time_key`` as empty."""
+        timetable = self.timetable
+        minute, second = divmod(time_key, SECONDS_PER_MINUTE)
+        mask = self._minute_mask(minute, partition)
+        if not mask >> second & 1:
+            return
+        mask &= ~(1 << second)
+        if mask:
+            timetable.update_for_partition(
+                {self.keys.occupied_minute(minute): mask}, partition=partition
+            )
+            return
+        timetable.del_for_partition(
+            self.keys.occupied_minute(minute), partition=partition
+        )
+        hour, offset = divmod(minute, MINUTES_PER_HOUR)
+        hour_mask = self._hour_mask(hour, partition) & ~(1 << offset)
+        if hour_mask:
+            timetable.update_for_partition(
+                {self.keys.occupied_hour(hour): hour_mask}, partition=partition
+            )
+        else:
+            timetable.del_for_partition(
+                self.keys.occupied_hour(hour), partition=partition
+            )
+
+    def next_occupied(self, time_key: int, until: int, partition: int) -> Optional[int]:
+        """Return the first occupied second from ``time_key`` to ``until``,
+        or None."""
+        minute, second = divmod(time_key, SECONDS_PER_MINUTE)
+        mask = self._minute_mask(minute, partition) >> second
+        if mask:
+            found = time_key + _lowest_bit(mask)
+            return found if found <= until else None
+        minute += 1
+        hour, offset = divmod(minute, MINUTES_PER_HOUR)
+        last_hour = until // (SECONDS_PER_MINUTE * MINUTES_PER_HOUR)
+        while hour <= last_hour:
+            hour_mask = self._hour_mask(hour, partition) >> offset << offset
+            while hour_mask:
+                bit = _lowest_bit(hour_mask)
+                minute = hour * MINUTES_PER_HOUR + bit
+                mask = self._minute_mask(minute, partition)
+                if mask:
+                    found = minute * SECONDS_PER_MINUTE + _lowest_bit(mask)
+                    return found if found <= until else None
+                hour_mask &= ~(1 << bit)
+            hour += 1
+            offset = 0
+        return None
+
+    def is_built(self, partition: int) -> bool:
+        """Return True if the index of ``partition`` can be used."""
+        return (
+            self.timetable.get_for_partition(
+                self.keys.occupancy_built(), partition=partition
+            )
+            == OCCUPANCY_INDEX_VERSION
+        )
+
+    def _timekeys(self, partition: int) -> Iterator[int]:
+        timetable = self.timetable
+        keys = self.keys
+        if not timetable.can_seek:
+            for key, _ in timetable.items_for_partition(partition):
+                time_key = self._timekey_of(key)
+                if time_key is not None:
+                    yield time_key
+            return
+        if keys.binary:
+            for key in timetable.keys_from_partition(keys.timekey(0), partition):
+                time_key = keys.timekey_of(key)
+                if time_key is None:
+                    # TimeKeys sort before other binary keys.
+                    return
+                yield time_key
+            return
+        # JSON strings sort after binary keys, so this visits string keys
+        # and then checkpoints.
+        for key in timetable.keys_from_partition("", partition):
+            if type(key) is not str:
+                return
+            time_key = self._timekey_of(key)
+            if time_key is not None:
+                yield time_key
+
+    def _timekey_of(self, key: Any) -> Optional[int]:
+        if self.keys.binary:
+            return self.keys.timekey_of(key)
+        parsed = parse_string_key(key)
+        if parsed is not None and parsed[0] == TAG_TIMEKEY:
+            return parsed[1]
+        return None
+
+    def _index_keys(self, partition: int) -> Iterator[Any]:
+        """Iterate the minute and hour keys stored for ``partition``."""
+        timetable = self.timetable
+        keys = self.keys
+        if not timetable.can_seek:
+            for key, _ in timetable.items_for_partition(partition):
+                if self._is_index_key(key):
+                    yield key
+            return
+        # Minute and hour keys sort together, before the binary marker and
+        # after the string one.
+        start = keys.occupied_minute(0) if keys.binary else OCCUPANCY_PREFIX
+        built = keys.occupancy_built()
+        for key in timetable.keys_from_partition(start, partition):
+            if key == built:
+                continue
+            if not self._is_index_key(key):
+                return
+            yield key
+
+    def _is_index_key(self, key: Any) -> bool:
+        if self.keys.binary:
+            return (
+                type(key) is bytes
+                and len(key) == BINARY_KEY_PREFIX_LENGTH
+                and key[1] in (TAG_OCCUPIED_MINUTE, TAG_OCCUPIED_HOUR)
+            )
+        return (
+            type(key) is str
+            and key.startswith(OCCUPANCY_PREFIX)
+            and key != self.keys.occupancy_built()
+        )
+
+    async def rebuild(
+        self, partition: int, aborted: Callable[[], bool] = lambda: False
+    ) -> Optional[int]:
+        """Bring the index of ``partition`` in line with its TimeKeys.
+
+        Returns the number of index keys written or deleted, or None if
+        ``aborted()`` became true, in which case the index is left unusable
+        until the next rebuild. The store is read in batches of
+        :data:`~kaspr.scheduler.utils.SCAN_BATCH_SIZE` keys, yielding to the
+        event loop in between. Only keys that differ are written, so an index
+        already in line costs no writes.
+        """
+        timetable = self.timetable
+        keys = self.keys
+        minutes: Dict[int, int] = {}
+        hours: Dict[int, int] = {}
+        for count, time_key in enumerate(self._timekeys(partition), 1):
+            minute, second = divmod(time_key, SECONDS_PER_MINUTE)
+            hour, offset = divmod(minute, MINUTES_PER_HOUR)
+            minutes[minute] = minutes.get(minute, 0) | 1 << second
+            hours[hour] = hours.get(hour, 0) | 1 << offset
+            if not count % SCAN_BATCH_SIZE:
+                await asyncio.sleep(0)
+                if aborted():
+                    return None
+        expected = {
+            keys.occupied_minute(minute): mask for minute, mask in minutes.items()
+        }
+        expected.update(
+            (keys.occupied_hour(hour), mask) for hour, mask in hours.items()
+        )
+        stale: List[Any] = []
+        for count, key in enumerate(self._index_keys(partition), 1):
+            if key not in expected:
+                stale.append(key)
+            if not count % SCAN_BATCH_SIZE:
+                await asyncio.sleep(0)
+                if aborted():
+                    return None
+        changes = {}
+        items = list(expected.items())
+        for start in range(0, len(items), SCAN_BATCH_SIZE):
+            batch = items[start : start + SCAN_BATCH_SIZE]
+            current = timetable.get_many_for_partition(
+                [key for key, _ in batch], partition=partition
+            )
+            changes.update(
+                (key, mask) for (key, mask), value in zip(batch, current) if value != mask
+            )
+            await asyncio.sleep(0)
+            if aborted():
+                return None
+        built = self.is_built(partition)
+        if built and not changes and not stale:
+            return 0
+        if built:
+            # Unusable until the repairs below are complete.
+            timetable.del_for_partition(keys.occupancy_built(), partition=partition)
+        for key in stale:
+            timetable.del_for_partition(key, partition=partition)
+        if changes:
+            timetable.update_for_partition(changes, partition=partition)
+        timetable.update_for_partition(
+            {keys.occupancy_built(): OCCUPANCY_INDEX_VERSION}, partition=partition
+        )
+        return len(changes) + len(stale)
@@ -5,12 +5,10 @@ from kaspr.types import KasprAppT, CronTickerT, TTLocation
 from kaspr.sensors.kaspr import KasprMonitor
 from .utils import (
     current_timekey,
-    create_message_key,
     compute_next_fire,
     compute_fires_in_window,
     due_index_key,
     due_index_prefix,
-    TK_LIVE_SUFFIX,
 )
 
 
@@ -328,6 +326,7 @@ class CronTicker(CronTickerT, Service):
         """
         cron_registry = self.app.scheduler.cron_registry
         timetable = self.app.scheduler.timetable
+        keys = self.app.scheduler.timetable_keys
         schedule_index = self.app.scheduler.schedule_index
 
         dest = entry.get("dest")
@@ -347,13 +346,13 @@ class CronTicker(CronTickerT, Service):
             # For past fires, place them at the current second so the
             # Dispatcher (which never revisits past time_keys) will find them.
             effective_tk = fire_epoch if fire_epoch >= now else now
-            time_key = str(effective_tk)
+            time_key = keys.timekey(effective_tk)
 
             message_total = (
                 timetable.get_for_partition(time_key, partition=partition) or 0
             )
             location = TTLocation(partition, effective_tk, sequence=message_total)
-            message_key = create_message_key(location)
+            message_key = keys.message(location)
 
             # Add cron fire timestamp header
             msg_headers_with_fire = dict(msg_headers)
@@ -366,7 +365,7 @@ class CronTicker(CronTickerT, Service):
                 "__kms": {"d": dest, "rid": fire_request_id},
             }
 
-            live_key = f"{time_key}{TK_LIVE_SUFFIX}"
+            live_key = keys.live(effective_tk)
             live_value = timetable.get_for_partition(live_key, partition=partition)
             live_count = self._live_count_from_value(live_value)
 
@@ -378,6 +377,8 @@ class CronTicker(CronTickerT, Service):
                 },
                 partition=partition,
             )
+            if not message_total and self.app.scheduler.occupancy is not None:
+                self.app.scheduler.occupancy.add(effective_tk, partition)
 
             schedule_index.update_for_partition(
                 {fire_request_id: {"tk": effective_tk, "seq": message_total}},
@@ -1,15 +1,182 @@
+import struct
 from math import floor
 from time import time
 from datetime import datetime, timezone
 from dataclasses import dataclass
-from typing import List
-from croniter import croniter
+from typing import Any, List, Optional, Tuple, Union
+from faust.serializers import codecs
 from kaspr.types import TTLocation
 
 # Suffix appended to a TimeKey to store live (non-canceled) metadata.
 # e.g. "1707171828:live" -> {"count": 2}
 TK_LIVE_SUFFIX = ":live"
 
+#: Layouts of Timetable keys, see :class:`TimetableKeys`.
+KEY_FORMAT_STRING = "string"
+KEY_FORMAT_BINARY = "binary"
+
+#: First byte of binary Timetable keys. JSON never starts with it, so
+#: binary keys and JSON keys (legacy keys, checkpoints) share a store.
+BINARY_KEY_VERSION = 1
+
+#: Type tags of binary Timetable keys, following the version byte.
+TAG_TIMEKEY = 1
+TAG_MESSAGE = 2
+TAG_LIVE = 3
+TAG_OCCUPIED_MINUTE = 4
+TAG_OCCUPIED_HOUR = 5
+TAG_OCCUPANCY_BUILT = 6
+
+#: Keys visited by a scan run at recovery between yields to the event loop.
+SCAN_BATCH_SIZE = 1000
+
+# Prefix of occupancy index keys in the ``string`` layout. It does not
+# start with a digit, so these keys sort after all TimeKeys.
+OCCUPANCY_PREFIX = "occ:"
+
+# version, tag, time key [, sequence]; all big-endian, so byte order is
+# numeric order.
+_TIMEKEY = struct.Struct(">BBQ")
+_MESSAGE = struct.Struct(">BBQI")
+
+#: Length of the version, tag and time key shared by all binary keys of a
+#: second, used as the store's prefix length.
+BINARY_KEY_PREFIX_LENGTH = _TIMEKEY.size
+
+TimetableKey = Union[str, bytes]
+
+
+class TimetableKeyCodec(codecs.json):
+    """JSON key codec passing binary Timetable keys through unchanged.
+
+    Other keys, i.e. ``string`` layout keys and checkpoints, are JSON as
+    with the default key serializer, so existing stores read the same.
+    """
+
+    _prefix = bytes([BINARY_KEY_VERSION])
+
+    def _dumps(self, s: Any) -> bytes:
+        if isinstance(s, bytes):
+            return s
+        return super()._dumps(s)
+
+    def _loads(self, s: bytes) -> Any:
+        if s[:1] == self._prefix:
+            return bytes(s)
+        return super()._loads(s)
+
+
+class TimetableKeys:
+    """Builds Timetable keys in one of two layouts.
+
+    ``string`` keys are decimal strings: ``"1707171828"`` (TimeKey),
+    ``"1707171828-3"`` (MessageKey) and ``"1707171828:live"``. Stored as
+    JSON, their byte order is only time order for equal length numbers,
+    and sequences sort as text (``-10`` before ``-2``).
+
+    ``binary`` keys are a version byte, a type tag, the big-endian time key
+    and, for MessageKeys, the big-endian sequence. Keys of a type sort by
+    time and then sequence, so TimeKeys can be range scanned without
+    meeting other keys, and all keys of a second share a fixed length
+    prefix (see :data:`BINARY_KEY_PREFIX_LENGTH`).
+    """
+
+    def __init__(self, format: str = KEY_FORMAT_STRING) -> None:
+        if format not in (KEY_FORMAT_STRING, KEY_FORMAT_BINARY):
+            raise ValueError(f"Unknown timetable key format `{format}`")
+        self.format = format
+        self.binary = format == KEY_FORMAT_BINARY
+
+    def timekey(self, time_key: int) -> TimetableKey:
+        """Return the key holding the slots allocated at ``time_key``."""
+        if self.binary:
+            return _TIMEKEY.pack(BINARY_KEY_VERSION, TAG_TIMEKEY, time_key)
+        return str(time_key)
+
+    def message(self, location: TTLocation) -> TimetableKey:
+        """Return the key of the message at ``location``."""
+        if self.binary:
+            return _MESSAGE.pack(
+                BINARY_KEY_VERSION, TAG_MESSAGE, location.time_key, location.sequence
+            )
+        return create_message_key(location)
+
+    def live(self, time_key: int) -> TimetableKey:
+        """Return the key holding the live count at ``time_key``."""
+        if self.binary:
+            return _TIMEKEY.pack(BINARY_KEY_VERSION, TAG_LIVE, time_key)
+        return f"{time_key}{TK_LIVE_SUFFIX}"
+
+    def occupied_minute(self, minute: int) -> TimetableKey:
+        """Return the key of the occupied seconds of a minute (epoch // 60)."""
+        if self.binary:
+            return _TIMEKEY.pack(BINARY_KEY_VERSION, TAG_OCCUPIED_MINUTE, minute)
+        return f"{OCCUPANCY_PREFIX}m:{minute}"
+
+    def occupied_hour(self, hour: int) -> TimetableKey:
+        """Return the key of the occupied minutes of an hour (epoch // 3600)."""
+        if self.binary:
+            return _TIMEKEY.pack(BINARY_KEY_VERSION, TAG_OCCUPIED_HOUR, hour)
+        return f"{OCCUPANCY_PREFIX}h:{hour}"
+
+    def occupancy_built(self) -> TimetableKey:
+        """Return the key marking a partition's occupancy index as built."""
+        if self.binary:
+            return _TIMEKEY.pack(BINARY_KEY_VERSION, TAG_OCCUPANCY_BUILT, 0)
+        return f"{OCCUPANCY_PREFIX}built"
+
+    def timekey_of(self, key: Any) -> Optional[int]:
+        """Return the TimeKey a key in this layout belongs to, if any.
+
+        Binary keys only count for their own type, so a range scan over
+        TimeKeys stops at the first key of another type.
+        """
+        if not self.binary:
+            return timekey_of(key)
+        if type(key) is bytes and len(key) == _TIMEKEY.size:
+            version, tag, time_key = _TIMEKEY.unpack(key)
+            if version == BINARY_KEY_VERSION and tag == TAG_TIMEKEY:
+                return time_key
+        return None
+
+
+def seek_timekey(
+    timetable: Any, keys: TimetableKeys, time_key: int, until: int, partition: int
+) -> Optional[int]:
+    """Return the first TimeKey from ``time_key`` to ``until`` in a
+    Timetable partition, or None, by seeking a store iterator.
+
+    Requires a store that can seek, see ``KasprTable.can_seek``.
+    """
+    for key in timetable.keys_from_partition(keys.timekey(time_key), partition):
+        found = keys.timekey_of(key)
+        if found is None or found > until:
+            # Keys of other kinds sort after all TimeKeys.
+            return None
+        if found >= time_key:
+            return found
+    return None
+
+
+def parse_string_key(key: Any) -> Optional[Tuple[int, int, Optional[int]]]:
+    """Return ``(tag, time_key, sequence)`` of a ``string`` layout key.
+
+    The sequence is None except for MessageKeys. Returns None for other
+    keys, e.g. checkpoints.
+    """
+    if type(key) is not str:
+        return None
+    if key.endswith(TK_LIVE_SUFFIX):
+        head = key[: -len(TK_LIVE_SUFFIX)]
+        return (TAG_LIVE, int(head), None) if head.isdigit() else None
+    head, sep, sequence = key.partition("-")
+    if not head.isdigit():
+        return None
+    if not sep:
+        return TAG_TIMEKEY, int(head), None
+    return (TAG_MESSAGE, int(head), int(sequence)) if sequence.isdigit() else None
+
+
 @dataclass(frozen=True)
 class SchedulerPart:
     janitor: str = "J"
@@ -21,6 +188,16 @@ def current_timekey():
 def create_message_key(location: TTLocation) -> str:
     return f"{location.time_key}-{location.sequence}"
 
+def timekey_of(key: Any) -> Optional[int]:
+    """Return the TimeKey a Timetable key belongs to, if it is one.
+
+    e.g. 1707171828 for "1707171828", "1707171828-3" and "1707171828:live".
+    """
+    if type(key) is not str:
+        return None
+    head = key.split("-", 1)[0].split(":", 1)[0]
+    return int(head) if head.isdigit() else None
+
 def prettydate(location: TTLocation):
     return datetime.fromtimestamp(location.time_key, tz=timezone.utc).isoformat().replace("+00:00", "Z")
 
@@ -28,9 +205,16 @@ def locdiff(loc1: TTLocation, loc2: TTLocation):
     return loc1.time_key - loc2.time_key
 
 
+def _croniter() -> Any:
+    """Return the croniter class, imported on first use of cron support."""
+    from croniter import croniter
+
+    return croniter
+
+
 def validate_cron_expr(expr: str) -> bool:
     """Validate a cron expression string."""
-    return croniter.is_valid(expr)
+    return _croniter().is_valid(expr)
 
 
 def compute_next_fire(expr: str, after: int) -> int:
@@ -44,7 +228,7 @@ def compute_next_fire(expr: str, after: int) -> int:
         Next fire time as unix epoch (floored to integer seconds).
     """
     dt = datetime.fromtimestamp(after, tz=timezone.utc)
-    cron = croniter(expr, dt)
+    cron = _croniter()(expr, dt)
     next_dt = cron.get_next(datetime)
     return floor(next_dt.timestamp())
 
@@ -62,7 +246,7 @@ def compute_fires_in_window(expr: str, after: int, until: int) -> List[int]:
     """
     fires = []
     dt = datetime.fromtimestamp(after, tz=timezone.utc)
-    cron = croniter(expr, dt)
+    cron = _croniter()(expr, dt)
     while True:
         next_dt = cron.get_next(datetime)
         fire = floor(next_dt.timestamp())
@@ -79,7 +263,7 @@ def cron_min_interval(expr: str) -> float:
     Returns float('inf') if fewer than 2 fires can be computed.
     """
     dt = datetime.fromtimestamp(0, tz=timezone.utc)
-    cron = croniter(expr, dt)
+    cron = _croniter()(expr, dt)
     first = cron.get_next(datetime)
     second = cron.get_next(datetime)
     return (second - first).total_seconds()
@@ -1,6 +1,6 @@
-import psutil
 import shutil
 import os
+import typing
 from mode import Service
 from collections import defaultdict
 from typing import Mapping, MutableMapping, Optional, Dict
@@ -18,6 +18,9 @@ from mode.utils.objects import KeywordReduce
 
 from kaspr.scheduler.utils import SchedulerPart
 
+if typing.TYPE_CHECKING:
+    import psutil
+
 DISPATCHER = SchedulerPart.dispatcher
 JANITOR = SchedulerPart.janitor
 
@@ -174,7 +177,7 @@ class KasprMonitor(Monitor):
 
     app: KasprAppT
 
-    process = psutil.Process
+    process: "psutil.Process"
 
     #: Number of messages added to timetable by partition
     #: since startup
@@ -242,6 +245,21 @@ class KasprMonitor(Monitor):
     #: Number of keys in table
     count_table_keys: Mapping[KasprTableT, int] = None
 
+    #: Number of operation calls run in an executor, by operation name
+    executor_calls_total: Mapping[str, int] = None
+
+    #: Seconds operation calls waited for an executor, by operation name
+    executor_queue_time_total: Mapping[str, float] = None
+
+    #: Seconds operation calls ran in an executor, by operation name
+    executor_run_time_total: Mapping[str, float] = None
+
+    #: Agent run in the sender of each fused channel, by channel name
+    fused_channels: Mapping[str, str] = None
+
+    #: Number of values processed through each fused channel
+    fused_values_total: Mapping[str, int] = None
+
     def __init__(
         self,
         app: KasprAppT,
@@ -254,6 +272,9 @@ class KasprMonitor(Monitor):
         **kwargs,
     ) -> None:
         self.app = app
+        # psutil is imported with the monitor rather than with kaspr.
+        import psutil
+
         self.process = psutil.Process(os.getpid())
         self.scheduled_total = defaultdict(int)
         self.instant_send_total = defaultdict(int)
@@ -283,6 +304,11 @@ class KasprMonitor(Monitor):
         self.checkpoints = {} if checkpoints is None else checkpoints
         self.count_timetable_keys = count_timetable_keys or 0
         self.count_table_keys = defaultdict(int)
+        self.executor_calls_total = defaultdict(int)
+        self.executor_queue_time_total = defaultdict(float)
+        self.executor_run_time_total = defaultdict(float)
+        self.fused_channels = {}
+        self.fused_values_total = defaultdict(int)
 
         super().__init__(*args, **kwargs)
 
@@ -412,6 +438,34 @@ class KasprMonitor(Monitor):
         """Call when cron ticker completes a tick cycle."""
         ...
 
+    def on_operation_executed(
+        self, operation: str, executor: str, queue_time: float, run_time: float
+    ):
+        """Call when a processor operation has run in an executor.
+
+        Args:
+            operation: Name of the operation.
+            executor: Executor type, e.g. ``thread``.
+            queue_time: Seconds waited before the call started running.
+            run_time: Seconds the call ran for.
+        """
+        self.executor_calls_total[operation] += 1
+        self.executor_queue_time_total[operation] += queue_time
+        self.executor_run_time_total[operation] += run_time
+
+    def on_channel_fused(self, channel: str, agent: str):
+        """Call when an agent is fused with the channel it reads.
+
+        Args:
+            channel: Name of the channel.
+            agent: Name of the agent run by the channel's sender.
+        """
+        self.fused_channels[channel] = agent
+
+    def on_fused_value(self, channel: str, agent: str):
+        """Call when a value sent to a fused channel has been processed."""
+        self.fused_values_total[channel] += 1
+
     def on_dispatcher_paused(self, dispatcher: DispatcherT):
         """Call when dispatcher paused processing."""
         self._dispatcher_or_create(dispatcher).paused = True
@@ -512,6 +566,8 @@ class KasprMonitor(Monitor):
                 self.on_table_key_count_refreshed(table)
 
     def _sample_memory(self):
+        import psutil
+
         vm = psutil.virtual_memory()
         sm = psutil.swap_memory()
         self.infra.process_rss_bytes = self.process.memory_info().rss
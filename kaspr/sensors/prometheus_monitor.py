@@ -291,6 +291,32 @@ class PrometheusMonitor(KasprMonitor):
             buckets=self.DEFAULT_LATENCY_WIDE_BUCKET,
         )
 
+        # Processor executors
+        self.executor_queue_latency = Histogram(
+            f"{prefix}executor_queue_latency_ms",
+            "Time operation calls waited for an executor in ms",
+            ["operation", "executor", *common_label_keys],
+            buckets=self.DEFAULT_LATENCY_WIDE_BUCKET,
+        )
+        self.executor_run_latency = Histogram(
+            f"{prefix}executor_run_latency_ms",
+            "Time operation calls ran in an executor in ms",
+            ["operation", "executor", *common_label_keys],
+            buckets=self.DEFAULT_LATENCY_WIDE_BUCKET,
+        )
+
+        # Fused channels
+        self.fused_channel_chains = Gauge(
+            f"{prefix}fused_channel_chains",
+            "Channels whose reading agent runs in the channel's sender",
+            ["channel", "agent", *common_label_keys],
+        )
+        self.fused_channel_values = Counter(
+            f"{prefix}fused_channel_values",
+            "Values processed through fused channels",
+            ["channel", "agent", *common_label_keys],
+        )
+
         # App information
         self.app_info = Gauge(
             f"{prefix}app_info",
@@ -659,6 +685,29 @@ class PrometheusMonitor(KasprMonitor):
             state.messages_removed
         )
 
+    def on_operation_executed(
+        self, operation: str, executor: str, queue_time: float, run_time: float
+    ):
+        """Call when a processor operation has run in an executor."""
+        super().on_operation_executed(operation, executor, queue_time, run_time)
+        labels = {"operation": operation, "executor": executor, **self.common_labels}
+        self.executor_queue_latency.labels(**labels).observe(queue_time * 1000.0)
+        self.executor_run_latency.labels(**labels).observe(run_time * 1000.0)
+
+    def on_channel_fused(self, channel: str, agent: str):
+        """Call when an agent is fused with the channel it reads."""
+        super().on_channel_fused(channel, agent)
+        self.fused_channel_chains.labels(
+            channel=channel, agent=agent, **self.common_labels
+        ).set(1)
+
+    def on_fused_value(self, channel: str, agent: str):
+        """Call when a value sent to a fused channel has been processed."""
+        super().on_fused_value(channel, agent)
+        self.fused_channel_values.labels(
+            channel=channel, agent=agent, **self.common_labels
+        ).inc()
+
     def on_message_scheduled(self, location: TTLocation):
         """Call when a message is added to the Timetable."""
         super().on_message_scheduled(location)
@@ -1,8 +1,9 @@
 import abc
 import typing
 from datetime import datetime
-from typing import ClassVar, Type, Callable, Any
-from faust.types import AppT, WindowT
+from concurrent.futures import Executor
+from typing import ClassVar, Type, Callable, Any, Iterable
+from faust.types import AppT, TopicT, WindowT
 
 from mode.utils.objects import cached_property
 from kaspr.types.message_scheduler import MessageSchedulerT
@@ -42,6 +43,11 @@ class KasprAppT(AppT):
     def scheduler(self) -> MessageSchedulerT:
         ...
 
+    @cached_property
+    @abc.abstractmethod
+    def processor_thread_pool(self) -> Executor:
+        ...
+
     @abc.abstractmethod
     def register_named_channel(self, name: str, channel: Any) -> None:
         ... 
@@ -50,6 +56,10 @@ class KasprAppT(AppT):
     def resolve_named_channel(self, name: str) -> Any:
         ...
 
+    @abc.abstractmethod
+    async def declare_topics(self, topics: Iterable[TopicT]) -> None:
+        ...
+
     def Table(
         self,
         name: str,
@@ -1,5 +1,5 @@
 import abc
-from typing import Dict, TYPE_CHECKING
+from typing import Dict, List, TYPE_CHECKING
 from faust.types import ServiceT, TopicT
 from mode.utils.objects import cached_property
 from marshmallow import INCLUDE, EXCLUDE, Schema, ValidationError, fields
@@ -22,7 +22,17 @@ class AppBuilderT:
 
     @abc.abstractmethod
     def maybe_create_topics(self) -> None:
-        """Maybe declare agent input topics."""
+        """Maybe declare agent input and output topics."""
+        ...
+
+    @abc.abstractmethod
+    def topics_to_declare(self) -> List[TopicT]:
+        """Return topics to declare before agents start."""
+        ...
+
+    @abc.abstractmethod
+    async def warm_up_metadata(self) -> None:
+        """Fetch partition metadata of output topics."""
         ...
         
     @cached_property
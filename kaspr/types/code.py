@@ -5,14 +5,27 @@ T = TypeVar("T")
 
 Function = Callable[[T], Union[T, Awaitable[T]]]
 
+#: Kinds of entry point functions, see :attr:`CodeT.func_kind`.
+FUNC_SYNC = "sync"
+FUNC_COROUTINE = "coroutine"
+FUNC_GENERATOR = "generator"
+FUNC_ASYNC_GENERATOR = "async_generator"
+
 class CodeT:
     
     @abc.abstractmethod
     def with_scope(self, scope: Dict[str, T]) -> Union["CodeT", None]: ...
 
+    @abc.abstractmethod
+    def clear_scope(self) -> Union["CodeT", None]: ...
+
     @abc.abstractmethod
     def execute(self) -> Union["CodeT", None]: ...    
 
     @property
     def func(self) -> Callable[[T], Union[T, Awaitable[T]]]:
-        ...
\ No newline at end of file
+        ...
+
+    @property
+    def func_kind(self) -> str:
+        ...
@@ -51,6 +51,16 @@ class MessageSchedulerT(ServiceT):
     def timetable(self) -> KasprTableT:
         ...            
 
+    @cached_property
+    @abc.abstractmethod
+    def timetable_keys(self) -> typing.Any:
+        ...
+
+    @cached_property
+    @abc.abstractmethod
+    def occupancy(self) -> typing.Any:
+        ...
+
     @cached_property
     @abc.abstractmethod
     def schedule_index(self) -> KasprTableT:
@@ -70,6 +80,10 @@ class MessageSchedulerT(ServiceT):
     async def maybe_create_topics(self):
         ...
 
+    @abc.abstractmethod
+    def topics_to_declare(self) -> typing.List[TopicT]:
+        ...
+
     @abc.abstractmethod
     async def wait_until_topics_created(self):
         ...
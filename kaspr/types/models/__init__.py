@@ -21,6 +21,8 @@ from .agent.operations import (
     AgentProcessorOperation,
     AgentProcessorFilterOperator,
     AgentProcessorMapOperator,
+    AgentProcessorMapBatchOperator,
+    AgentProcessorFilterBatchOperator,
 )
 from .webview import (
     WebViewSpec,
@@ -73,6 +75,8 @@ __all__ = [
     "AgentProcessorOperation",
     "AgentProcessorFilterOperator",
     "AgentProcessorMapOperator",
+    "AgentProcessorMapBatchOperator",
+    "AgentProcessorFilterBatchOperator",
     "WebViewSpec",
     "WebViewResponseSpec",
     "WebViewRequestSpec",
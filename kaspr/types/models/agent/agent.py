@@ -2,7 +2,8 @@ from typing import Optional
 from kaspr.types.models.base import SpecComponent
 from kaspr.types.models.agent.input import AgentInputSpec
 from kaspr.types.models.agent.output import AgentOutputSpec
-from kaspr.types.models.agent.processor import AgentProcessorSpec
+from kaspr.types.models.agent.processor import AgentProcessorSpec, FusedChannel
+from kaspr.types.models.executors import EXECUTOR_PROCESS
 from kaspr.types.app import KasprAppT
 from kaspr.types.agent import KasprAgentT
 
@@ -11,6 +12,7 @@ class AgentSpec(SpecComponent):
     name: str
     description: Optional[str]
     isolated_partitions: Optional[bool]
+    concurrency: Optional[int]
     input: AgentInputSpec
     output: AgentOutputSpec
     processors: AgentProcessorSpec
@@ -18,19 +20,73 @@ class AgentSpec(SpecComponent):
     app: KasprAppT = None
 
     _agent: KasprAgentT = None
+    _fused: FusedChannel = None
 
-    def prepare_agent(self) -> KasprAgentT:
-        self.log.info("Preparing...")
-        self._warn_serializer_mismatch()
+    def _prepare_processors(self) -> AgentProcessorSpec:
         processors = self.processors
         processors.input = self.input
         processors.output = self.output
+        processors.concurrency = self.concurrency
+        return processors
+
+    def prepare_agent(self) -> KasprAgentT:
+        self.log.info("Preparing...")
+        self._warn_serializer_mismatch()
+        processors = self._prepare_processors()
         return self.app.agent(
             self.input.channel,
             name=self.name,
             isolated_partitions=self.isolated_partitions,
         )(processors.processor)
 
+    @property
+    def input_channel_name(self) -> Optional[str]:
+        """Return the name of the in-memory channel this agent reads, if any."""
+        input = self.input
+        topic_spec = input.topic_spec
+        if topic_spec and (topic_spec.name or topic_spec.pattern):
+            return None
+        return input.channel_spec.name if input.channel_spec else None
+
+    @property
+    def fusable(self) -> bool:
+        """Return True if this agent can run in the task sending to its channel.
+
+        Agents buffering events with ``take`` or processing them
+        concurrently rely on their own stream, so they keep it, as do
+        agents already built and agents with ``executor: process``
+        operations, which need one of the two.
+        """
+        return (
+            self._agent is None
+            and self.input_channel_name is not None
+            and not self.input.buffer_spec
+            and (self.concurrency or 1) <= 1
+            and not any(
+                operation.executor == EXECUTOR_PROCESS
+                for operation in self.processors.operations
+            )
+        )
+
+    def fuse(self) -> FusedChannel:
+        """Return a channel running this agent's processors on each value.
+
+        The agent is not started; see :class:`FusedChannel`.
+        """
+        if self._agent is not None:
+            raise RuntimeError(f"Agent {self.name} is already running.")
+        if self._fused is None:
+            self.log.info("Fusing with channel %s", self.input_channel_name)
+            self._fused = FusedChannel(
+                self._prepare_processors(), self.input_channel_name, self.name
+            )
+        return self._fused
+
+    @property
+    def fused(self) -> bool:
+        """Return True if this agent runs behind a fused channel."""
+        return self._fused is not None
+
     def _warn_serializer_mismatch(self) -> None:
         """Log a warning if the input topic's serializers don't match the
         target table's serializers. A mismatch can cause double-encoded keys
@@ -1,7 +1,10 @@
-from typing import Optional, TypeVar, List, Dict, Union
-from kaspr.utils.functional import maybe_async
+from typing import Any, Optional, TypeVar, List, Dict, Sequence, Tuple, Union
+from kaspr.utils.functional import maybe_async, needs_await
+from kaspr.utils.columnar import ColumnarBatch, true_indices
+from kaspr.utils.selectors import compile_comparison
 from kaspr.types.models.base import SpecComponent
 from kaspr.types.models.pycode import PyCode
+from kaspr.types.code import FUNC_COROUTINE, FUNC_SYNC
 from kaspr.types.operation import ProcessorOperatorT
 from kaspr.types.models.tableref import TableRefSpec
 from kaspr.types.table import KasprTableT, KasprGlobalTableT
@@ -9,26 +12,172 @@ from kaspr.types.app import KasprAppT
 
 T = TypeVar("T")
 Table = Union[KasprTableT, KasprGlobalTableT]
+Batch = Tuple[List[T], List[Any]]
+
+
+def _check_batch_size(name: str, result: Sequence[Any], values: List[T]) -> None:
+    """Raise if a batch operator did not return one item per value."""
+    try:
+        size = len(result)
+    except TypeError:
+        size = None
+    if size != len(values):
+        raise ValueError(
+            f"{name} must return one item per value "
+            f"(expected {len(values)}, got {size})."
+        )
+
+
+def _batch_values(values: Sequence[T], columnar: bool) -> Sequence[T]:
+    """Return batch values in the representation an operator asked for."""
+    if columnar:
+        return values if isinstance(values, ColumnarBatch) else ColumnarBatch(values)
+    if isinstance(values, ColumnarBatch):
+        return values.to_records()
+    return values
+
 
 class AgentProcessorFilterOperator(ProcessorOperatorT, PyCode):
-    
+    """Filter values by PyCode, or by comparing a field.
+
+    With ``field`` set, the value's field at that path is compared to
+    ``operand`` with the ``op`` comparison (``eq`` by default), see
+    :mod:`kaspr.utils.selectors`. No code is executed for it.
+    """
+
+    field: Optional[str] = None
+    op: Optional[str] = None
+    operand: Any = None
+
+    def execute(self) -> "AgentProcessorFilterOperator":
+        if not self.field:
+            return super().execute()
+        self._func = compile_comparison(self.field, self.op or "eq", self.operand)
+        self._func_kind = FUNC_SYNC
+        self._executed = True
+        return self
+
     async def process(self, value: T, **kwargs) -> T:
         if not await maybe_async(self.func(value, **kwargs)):
             return self.skip_value
         else:
             return value
 
+    def call(self, value: T, **kwargs) -> T:
+        if self.func_kind == FUNC_COROUTINE:
+            return self.process(value, **kwargs)
+        predicate = self.func(value, **kwargs)
+        if needs_await(predicate):
+            return self._filter(value, predicate)
+        if not predicate:
+            return self.skip_value
+        return value
+
+    async def _filter(self, value: T, predicate: Any) -> T:
+        if not await predicate:
+            return self.skip_value
+        return value
+
 
 class AgentProcessorMapOperator(ProcessorOperatorT, PyCode):
     async def process(self, value: T, **kwargs) -> T:
         return await maybe_async(self.func(value, **kwargs))
 
+    def call(self, value: T, **kwargs) -> T:
+        return self.func(value, **kwargs)
+
+
+class AgentProcessorMapBatchOperator(ProcessorOperatorT, PyCode):
+    """Map a buffered batch of values.
+
+    The entry point is called with the list of values and must return a
+    list of the same length. ``context["event"]`` is the list of events.
+    With ``columnar`` set, it is called with a :class:`ColumnarBatch`
+    instead and may return that batch after assigning columns to it.
+    """
+
+    columnar: Optional[bool] = None
+
+    is_batch = True
+
+    async def process(self, value: Batch, **kwargs) -> Batch:
+        values, events = value
+        values = _batch_values(values, self.columnar)
+        return self._result(values, events, await maybe_async(self.func(values, **kwargs)))
+
+    def call(self, value: Batch, **kwargs) -> Batch:
+        if self.func_kind == FUNC_COROUTINE:
+            return self.process(value, **kwargs)
+        values, events = value
+        values = _batch_values(values, self.columnar)
+        result = self.func(values, **kwargs)
+        if needs_await(result):
+            return self._await_result(values, events, result)
+        return self._result(values, events, result)
+
+    async def _await_result(self, values: Sequence[T], events: List[Any], result: Any) -> Batch:
+        return self._result(values, events, await result)
+
+    def _result(self, values: Sequence[T], events: List[Any], result: Sequence[T]) -> Batch:
+        _check_batch_size("map_batch", result, values)
+        if not isinstance(result, ColumnarBatch):
+            result = list(result)
+        return result, events
+
+
+class AgentProcessorFilterBatchOperator(ProcessorOperatorT, PyCode):
+    """Filter a buffered batch of values.
+
+    The entry point is called with the list of values and must return a
+    list (or boolean array) of the same length; values whose flag is false
+    are dropped along with their events. ``context["event"]`` is the list
+    of events. With ``columnar`` set, it is called with a
+    :class:`ColumnarBatch` instead.
+    """
+
+    columnar: Optional[bool] = None
+
+    is_batch = True
+
+    async def process(self, value: Batch, **kwargs) -> Batch:
+        values, events = value
+        values = _batch_values(values, self.columnar)
+        return self._result(values, events, await maybe_async(self.func(values, **kwargs)))
+
+    def call(self, value: Batch, **kwargs) -> Batch:
+        if self.func_kind == FUNC_COROUTINE:
+            return self.process(value, **kwargs)
+        values, events = value
+        values = _batch_values(values, self.columnar)
+        result = self.func(values, **kwargs)
+        if needs_await(result):
+            return self._await_result(values, events, result)
+        return self._result(values, events, result)
+
+    async def _await_result(self, values: Sequence[T], events: List[Any], result: Any) -> Batch:
+        return self._result(values, events, await result)
+
+    def _result(self, values: Sequence[T], events: List[Any], mask: Sequence[bool]) -> Batch:
+        _check_batch_size("filter_batch", mask, values)
+        kept = true_indices(mask)
+        if not kept:
+            return self.skip_value
+        if len(kept) == len(values):
+            return values, events
+        if isinstance(values, ColumnarBatch):
+            return values.take(kept), [events[i] for i in kept]
+        return [values[i] for i in kept], [events[i] for i in kept]
+
 
 class AgentProcessorOperation(SpecComponent):
     name: str
     filter: Optional[AgentProcessorFilterOperator]
     map: Optional[AgentProcessorMapOperator]
+    map_batch: Optional[AgentProcessorMapBatchOperator]
+    filter_batch: Optional[AgentProcessorFilterBatchOperator]
     table_refs: Optional[List[TableRefSpec]]
+    executor: Optional[str]
+    max_concurrency: Optional[int]
 
     app: KasprAppT = None
 
@@ -37,7 +186,14 @@ class AgentProcessorOperation(SpecComponent):
 
     def get_operator(self) -> ProcessorOperatorT:
         """Get the specific operator type for this operation block."""
-        return next((x for x in [self.filter, self.map] if x is not None), None)
+        return next(
+            (
+                x
+                for x in [self.filter, self.map, self.map_batch, self.filter_batch]
+                if x is not None
+            ),
+            None,
+        )
 
     def prepare_tables(self) -> Dict[str, Table]:
         """Tables for operation keyed by argument name."""
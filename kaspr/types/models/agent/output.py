@@ -1,11 +1,28 @@
-from typing import Optional, Iterable, TypeVar, cast
+import asyncio
+from functools import partial
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Iterable,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
+from faust.types import EventT, RecordMetadata
 from kaspr.types.models.base import SpecComponent
 from kaspr.types.models.topicout import TopicOutSpec
 from kaspr.types.app import KasprAppT
 from kaspr.types.channel import KasprChannelT
+from kaspr.types.stream import KasprStreamT
 from kaspr.types.topic import KasprTopicT
 
 T = TypeVar("T")
+Route = Tuple[TopicOutSpec, Optional[Callable[[Any], Any]], bool]
 
 
 class AgentOutputSpec(SpecComponent):
@@ -18,15 +35,49 @@ class AgentOutputSpec(SpecComponent):
 
     _topics: KasprTopicT = None
     _channel: KasprChannelT = None
+    _routes: List[Route] = None
 
     async def send(self, value: T):
         """Send value to all topics, channels, and callables."""
-        if self.topics_spec:
-            for ts in self.topics_spec:
-                ts = cast(TopicOutSpec, ts)
-                if ts.should_skip(value):
-                    continue
-                await ts.send(value)
+        for delivery in await self.deliver(value):
+            await delivery
+
+    async def deliver(self, value: T) -> List[Awaitable[RecordMetadata]]:
+        """Send value to all topics without waiting for acknowledgements.
+
+        Sends to several topics are issued concurrently; the value is sent
+        to every topic before the next value is, so ordering is kept per
+        topic. Returns the delivery futures of the topics that set ``ack``.
+        """
+        targets = [
+            (ts, ack)
+            for ts, predicate, ack in self.routes
+            if predicate is None or predicate(value)
+        ]
+        if not targets:
+            return []
+        if len(targets) == 1:
+            ts, ack = targets[0]
+            delivery = await ts.deliver(value)
+            return [delivery] if ack else []
+        deliveries = await asyncio.gather(*(ts.deliver(value) for ts, _ in targets))
+        return [
+            delivery for (_, ack), delivery in zip(targets, deliveries) if ack
+        ]
+
+    def prepare_routes(self) -> List[Route]:
+        """Resolve each output topic's predicate and ack flag once."""
+        return [
+            (ts, ts.predicate_func, bool(ts.ack))
+            for ts in cast(Iterable[TopicOutSpec], self.topics_spec or [])
+        ]
+
+    @property
+    def routes(self) -> List[Route]:
+        """Output topics with their predicate (or None) and ack flag."""
+        if self._routes is None:
+            self._routes = self.prepare_routes()
+        return self._routes
 
     def prepare_topics(self) -> Iterable[KasprTopicT]:
         if self.topics_spec:
@@ -48,3 +99,106 @@ class AgentOutputSpec(SpecComponent):
     def shortlabel(self) -> str:
         """Return short description."""
         return self.label
+
+
+class OutputWindow:
+    """Acks events once the sends they produced are delivered.
+
+    Sends are issued in order as values are processed, so ordering per
+    partition is kept by the producer, but the agent does not wait for
+    each delivery before taking the next event. Instead the delivery
+    futures of each event are gathered, and the event is acked when they
+    complete. As the consumer only commits offsets of acked events, an
+    offset is never committed before its output is delivered.
+
+    At most ``max_in_flight`` sends are pending at a time; :meth:`track`
+    waits for deliveries when the window is full.
+
+    If ``reader`` is given, it is cancelled when a delivery fails, so the
+    error is raised (see :meth:`raise_for_error`) without waiting for the
+    next event to be tracked.
+    """
+
+    def __init__(
+        self,
+        stream: KasprStreamT,
+        max_in_flight: int,
+        reader: Optional["asyncio.Task[Any]"] = None,
+    ) -> None:
+        self.stream = stream
+        self.max_in_flight = max(1, max_in_flight)
+        self.reader = reader
+        self._pending: Set[asyncio.Future] = set()
+        self._in_flight = 0
+        self._error: Optional[BaseException] = None
+
+    async def track(
+        self, events: Sequence[EventT], deliveries: Sequence[Awaitable[Any]]
+    ) -> None:
+        """Ack ``events`` once ``deliveries`` complete.
+
+        Raises:
+            Exception: the first delivery error of a previously tracked
+                event.
+        """
+        self.raise_for_error()
+        if not deliveries:
+            for event in events:
+                await self.stream.ack(event)
+            return
+        while self._pending and self._in_flight + len(deliveries) > self.max_in_flight:
+            await asyncio.wait(self._pending, return_when=asyncio.FIRST_COMPLETED)
+            self.raise_for_error()
+        delivered = asyncio.gather(*deliveries)
+        self._pending.add(delivered)
+        self._in_flight += len(deliveries)
+        delivered.add_done_callback(
+            partial(self._on_delivered, list(events), len(deliveries))
+        )
+
+    async def flush(self) -> None:
+        """Wait for all pending deliveries.
+
+        Raises:
+            Exception: the first delivery error.
+        """
+        if self._pending:
+            await asyncio.wait(self._pending)
+        self.raise_for_error()
+
+    def raise_for_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _on_delivered(
+        self, events: List[EventT], count: int, delivered: asyncio.Future
+    ) -> None:
+        self._pending.discard(delivered)
+        self._in_flight -= count
+        if delivered.cancelled():
+            return
+        error = delivered.exception()
+        if error is not None:
+            # The events stay unacked, so they are processed again.
+            if self._error is None:
+                self._error = error
+                if self.reader is not None and not self.reader.done():
+                    self.reader.cancel()
+            return
+        for event in events:
+            _ack_now(self.stream, event)
+
+
+def _ack_now(stream: KasprStreamT, event: EventT) -> None:
+    """Ack ``event`` before returning.
+
+    ``Stream.ack`` is a coroutine for faust's API, but it does not suspend,
+    so it is run to completion here rather than scheduled as a task.
+    """
+    ack = stream.ack(event)
+    try:
+        ack.send(None)
+    except StopIteration:
+        return
+    ack.close()
+    raise RuntimeError(f"{type(stream).__name__}.ack suspended.")
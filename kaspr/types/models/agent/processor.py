@@ -1,15 +1,144 @@
+import asyncio
+import weakref
 from typing import Optional, List, Awaitable, Any, Callable, Dict
-from inspect import isasyncgen
-from kaspr.utils.functional import ensure_generator
+from faust.streams import _current_event as _faust_current_event
+from faust.streams import current_event as faust_current_event
+from faust.types import EventT
+from mode import Service
+from kaspr.utils.context import ProcessorContext, set_current_event
 from kaspr.types.models.base import SpecComponent
 from kaspr.types.models.agent.operations import AgentProcessorOperation
 from kaspr.types.models.agent.input import AgentInputSpec
-from kaspr.types.models.agent.output import AgentOutputSpec
+from kaspr.types.models.agent.output import AgentOutputSpec, OutputWindow
 from kaspr.types.models.pycode import PyCode
+from kaspr.types.models.pipeline import Emitter, Pipeline
+from kaspr.types.models.executors import (
+    EXECUTOR_PROCESS,
+    EXECUTOR_THREAD,
+    ProcessExecutor,
+    ThreadExecutor,
+)
 from kaspr.types.app import KasprAppT
 from kaspr.types.stream import KasprStreamT
 
 
+#: Events queued per lane when an agent processes events concurrently.
+LANE_BUFFER_SIZE = 16
+
+# Calls to worker processes are only batched across values processed
+# together; one event at a time would cost a round trip per event.
+PROCESS_EXECUTOR_NEEDS_BATCHES = (
+    "Operations with 'executor: process' require the agent input to define "
+    "'take', or the agent to set 'concurrency' above 1."
+)
+
+
+def _discard(value: Any) -> None:
+    """Emitter for agents without outputs."""
+
+
+def _acks_deliveries(output: Optional[AgentOutputSpec]) -> bool:
+    """Return True if ``output`` sends to a topic with ``ack`` set."""
+    return output is not None and any(ack for _, _, ack in output.routes)
+
+
+def _collector(output: Optional[AgentOutputSpec], deliveries: List[Any]) -> Emitter:
+    """Return an emitter sending values to ``output``, adding the delivery
+    futures of acked sends to ``deliveries``."""
+    if output is None:
+        return _discard
+
+    async def emit(value: Any) -> None:
+        deliveries.extend(await output.deliver(value))
+
+    return emit
+
+
+class FusedChannel(Service):
+    """Stands in for a channel read by a single agent.
+
+    Values sent to it skip the channel, stream and event machinery of the
+    agent: they are queued as they are, with the sender's event, and a
+    task of this service runs the agent's pipeline on them and sends the
+    results to the agent's output. Deliveries are tracked by an
+    :class:`OutputWindow` as in the agent; there is no channel event to
+    ack, so only delivery errors and the in-flight bound apply.
+
+    The sender, e.g. a join's response task, only waits when the queue is
+    full, as it would for a channel. Processing and delivery errors are
+    logged and the value dropped, as when a crashed agent is restarted by
+    its supervisor, so they never reach the sender.
+    """
+
+    def __init__(
+        self, processors: "AgentProcessorSpec", name: str, agent: str, **kwargs: Any
+    ) -> None:
+        super().__init__(**kwargs)
+        self.processors = processors
+        self.name = name
+        self.agent = agent
+        self._queue: asyncio.Queue = asyncio.Queue(
+            maxsize=processors.app.conf.stream_buffer_maxsize
+        )
+        self._window: Optional[OutputWindow] = None
+
+    @property
+    def window(self) -> OutputWindow:
+        if self._window is None:
+            self._window = OutputWindow(
+                None, self.processors.app.conf.agent_output_max_in_flight
+            )
+        return self._window
+
+    async def send(self, *, value: Any = None, **kwargs: Any) -> None:
+        """Queue ``value`` for the agent's pipeline."""
+        # The event of the sender, e.g. the join's response message.
+        await self._queue.put((value, faust_current_event()))
+
+    @Service.task
+    async def _process(self) -> None:
+        processors = self.processors
+        monitor = processors.app.monitor
+        deliveries = []
+        while not self.should_stop:
+            value, event = await self._queue.get()
+            if event is not None:
+                # Table operations find the partition from faust's current
+                # event, which is otherwise only set for the sending task.
+                _faust_current_event.set(weakref.ref(event))
+            set_current_event(event)
+            try:
+                processors.init_scope
+                # Read for each value, so a reloaded pipeline is used.
+                pipeline = processors.compiled_pipeline
+                if not pipeline:
+                    continue
+                if pipeline.batch_size:
+                    raise ValueError(
+                        "Batch operations require the agent input to define 'take'."
+                    )
+                await pipeline.stream(value, _collector(processors.output, deliveries))
+                await self.window.track((), deliveries)
+            except Exception as e:
+                processors.log.exception(
+                    "Agent %s failed on a value of fused channel %s: %r",
+                    self.agent,
+                    self.name,
+                    e,
+                )
+                processors.on_error(e)
+                # A failed delivery fails every later track of the window.
+                self._window = None
+                continue
+            finally:
+                deliveries.clear()
+            monitor.on_fused_value(self.name, self.agent)
+
+    @property
+    def label(self) -> str:
+        return f"{type(self).__name__}: {self.name} -> {self.agent}"
+
+
 class AgentProcessorSpec(SpecComponent):
     """Processor specification."""
 
@@ -19,28 +148,38 @@ class AgentProcessorSpec(SpecComponent):
 
     app: KasprAppT = None
 
+    #: Number of events with different keys processed concurrently.
+    concurrency: Optional[int] = None
+
     _processor: Callable[..., Awaitable[Any]] = None
     _output: AgentOutputSpec = None
     _input: AgentInputSpec = None
     _init_scope: Dict[str, Any] = None
+    _context: ProcessorContext = None
+    _compiled_pipeline: Pipeline = None
+    _process_executor: ProcessExecutor = None
 
     def prepare_processor(self) -> Callable[..., Awaitable[Any]]:
-        operations = {op.name: op for op in self.operations}
         input = self.input
         output = self.output
 
         async def _aprocessor(stream: KasprStreamT):
-            context = {"app": self.app}
-            if self.init:
-                self.init.with_scope({"context": {**context}})
-            init_scope = self.init_scope
-            ops = []
-            for name in self.pipeline:
-                if name not in operations:
-                    raise ValueError(f"Operation '{name}' is not defined.")
-                ops.append(operations[name])
-            if not ops:
+            self.init_scope  # prepares init and operator scopes
+            pipeline = self.compiled_pipeline
+            if not pipeline:
                 return
+            concurrency = self.concurrency or 1
+            window = None
+            if concurrency > 1 or _acks_deliveries(output):
+                # Events are acked by the output window once processed and
+                # their acked sends delivered, rather than by faust when the
+                # next event is taken.
+                stream = stream.noack()
+                window = OutputWindow(
+                    stream,
+                    self.app.conf.agent_output_max_in_flight,
+                    reader=asyncio.current_task(),
+                )
             _stream = stream
             buffered = False
             if input.buffer_spec:
@@ -49,99 +188,282 @@ class AgentProcessorSpec(SpecComponent):
                     within=input.buffer_spec.timeout,
                 )
                 buffered = True
+            if pipeline.batch_size and not buffered:
+                raise ValueError(
+                    "Batch operations require the agent input to define 'take'."
+                )
+            if concurrency > 1 and buffered:
+                raise ValueError(
+                    "Agent concurrency cannot be combined with input 'take'."
+                )
+            if pipeline.coalesced and not buffered and concurrency == 1:
+                raise ValueError(PROCESS_EXECUTOR_NEEDS_BATCHES)
             try:
-                async for value in _stream:
-                    operation = ops[0]
-                    operator = operation.operator
-                    tables = operation.tables
-                    event = stream.current_event
-                    _value = value
-                    if buffered:
-                        _value, event = _value
-                    scope = {
-                        **init_scope,
-                        "context": {**context, "event": event},
-                    }
-                    operator.with_scope(scope)
-                    value = await operator.process(_value, **tables)
-                    if value == operator.skip_value:
-                        continue
-                    gen = ensure_generator(value, async_gen=isasyncgen(value))
-
-                    if isasyncgen(gen):
-                        async for value in gen:
-                            # Start with the initial value
-                            current_values = [value]
-                            for operation in ops[1:]:
-                                next_values = []
-                                operator = operation.operator
-                                tables = operation.tables
-                                for current_value in current_values:
-                                    scope = {
-                                        **init_scope,
-                                        "context": {**context, "event": event},
-                                    }
-                                    operator.with_scope(scope)
-                                    value = await operator.process(current_value, **tables)
-                                    if value == operator.skip_value:
-                                        continue
-                                    # Collect all results
-                                    next_values.extend(
-                                        ensure_generator(value, async_gen=isasyncgen(value))
-                                    )
-                                # Update for the next callback
-                                current_values = next_values
-
-                            for value in current_values:
-                                if output:
-                                    await output.send(value)                                
-                    else:
-                        for value in gen:
-                            # Start with the initial value
-                            current_values = [value]
-                            for operation in ops[1:]:
-                                next_values = []
-                                operator = operation.operator
-                                tables = operation.tables
-                                for current_value in current_values:
-                                    scope = {
-                                        **init_scope,
-                                        "context": {**context, "event": event},
-                                    }
-                                    operator.with_scope(scope)
-                                    value = await operator.process(current_value, **tables)
-                                    if value == operator.skip_value:
-                                        continue
-                                    # Collect all results
-                                    next_values.extend(
-                                        ensure_generator(value, async_gen=isasyncgen(value))
-                                    )
-                                # Update for the next callback
-                                current_values = next_values
-
-                            for value in current_values:
-                                if output:
-                                    await output.send(value)
-
+                try:
+                    if concurrency > 1:
+                        await self._process_lanes(stream, output, window, concurrency)
+                        return
+                    await self._process_stream(stream, _stream, buffered, window)
+                except asyncio.CancelledError:
+                    if window is not None:
+                        # Cancelled by the window when a delivery failed.
+                        window.raise_for_error()
+                    raise
             except Exception as e:
                 self.on_error(e)
                 raise
 
         return _aprocessor
 
+    async def _process_stream(
+        self,
+        stream: KasprStreamT,
+        events_stream: KasprStreamT,
+        buffered: bool,
+        window: Optional[OutputWindow],
+    ) -> None:
+        """Process events one at a time (or one ``take`` batch at a time).
+
+        Without a ``window``, events are acked by faust as usual.
+        """
+        deliveries = []
+        emit = _collector(self.output, deliveries)
+        async for value in events_stream:
+            # Read for each event, so a reloaded pipeline is used from the
+            # next event on (see :meth:`reload`).
+            pipeline = self.compiled_pipeline
+            event = stream.current_event
+            events = (event,)
+            if buffered:
+                value, event = value
+                events = list(event)
+            set_current_event(event)
+            # Results are sent as they are produced, so fan-out operations
+            # are never buffered in memory.
+            if pipeline.batch_size:
+                await pipeline.stream_batch(value, event, emit)
+            else:
+                await pipeline.stream(value, emit)
+            if window is not None:
+                await window.track(events, deliveries)
+            deliveries.clear()
+        if window is not None:
+            await window.flush()
+
+    async def _process_lanes(
+        self,
+        stream: KasprStreamT,
+        output: Optional[AgentOutputSpec],
+        window: OutputWindow,
+        concurrency: int,
+    ) -> None:
+        """Process events in ``concurrency`` lanes selected by message key.
+
+        Events with the same key always go to the same lane and are
+        processed in order; events with different keys are processed
+        concurrently. Events without a key are spread across lanes and are
+        not ordered relative to each other.
+
+        Acks are manual: an event is acked once it has been fully processed
+        and its output delivered, and the consumer only commits offsets up
+        to the first event in the partition that has not been acked, so a
+        crash never skips an event that was still in flight.
+
+        A lane that fails cancels the task reading the stream, so the
+        error is raised at once rather than when the next event arrives.
+        """
+        queues = [asyncio.Queue(maxsize=LANE_BUFFER_SIZE) for _ in range(concurrency)]
+        failed = asyncio.Event()
+        errors: List[BaseException] = []
+        reader = asyncio.current_task()
+
+        async def _lane(queue: asyncio.Queue) -> None:
+            deliveries = []
+            emit = _collector(output, deliveries)
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    value, event = item
+                    # Table operations find the partition from faust's current
+                    # event, which is otherwise only set for the consuming task.
+                    _faust_current_event.set(weakref.ref(event))
+                    set_current_event(event)
+                    await self.compiled_pipeline.stream(value, emit)
+                    await window.track((event,), deliveries)
+                    deliveries.clear()
+            except Exception as exc:
+                errors.append(exc)
+                if not failed.is_set():
+                    failed.set()
+                    reader.cancel()
+
+        async def _put(queue: asyncio.Queue, item: Any) -> None:
+            put = asyncio.ensure_future(queue.put(item))
+            wait_failed = asyncio.ensure_future(failed.wait())
+            try:
+                await asyncio.wait(
+                    [put, wait_failed], return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                put.cancel()
+                wait_failed.cancel()
+
+        lanes = [asyncio.ensure_future(_lane(queue)) for queue in queues]
+        unkeyed = 0
+        try:
+            async for value in stream:
+                if errors:
+                    break
+                event: EventT = stream.current_event
+                key = event.message.key if event is not None else None
+                if key is None:
+                    unkeyed += 1
+                    queue = queues[unkeyed % concurrency]
+                else:
+                    queue = queues[hash(key) % concurrency]
+                if queue.full():
+                    await _put(queue, (value, event))
+                else:
+                    queue.put_nowait((value, event))
+                if errors:
+                    break
+            else:
+                # Stream ended: let lanes finish what they have queued.
+                for queue in queues:
+                    await _put(queue, None)
+                await asyncio.wait(lanes)
+                if not errors:
+                    await window.flush()
+        except asyncio.CancelledError:
+            if not errors:
+                raise
+        finally:
+            for lane in lanes:
+                lane.cancel()
+            await asyncio.gather(*lanes, return_exceptions=True)
+        if errors:
+            raise errors[0]
+
+    def reload(self, processors: "AgentProcessorSpec") -> None:
+        """Replace this processor's operations with those of ``processors``.
+
+        Runs :meth:`prepare_reload` and then :meth:`apply_reload`, so an
+        invalid definition leaves the running one in place.
+
+        Raises:
+            SyntaxError: if the code of an operation does not compile.
+            ValueError: if the new pipeline cannot be compiled, or needs an
+                input ``take`` or ``concurrency`` the agent does not have.
+        """
+        self.prepare_reload(processors)
+        self.apply_reload(processors)
+
+    def prepare_reload(self, processors: "AgentProcessorSpec") -> None:
+        """Run the init block of ``processors`` and compile its operations
+        and pipeline for this agent, without replacing anything.
+
+        Raises:
+            SyntaxError: if the code of an operation does not compile.
+            ValueError: if the new pipeline cannot be compiled, or needs an
+                input ``take`` or ``concurrency`` the agent does not have.
+        """
+        processors.app = self.app
+        processors.input = self.input
+        processors.output = self.output
+        processors.concurrency = self.concurrency
+        processors.init_scope
+        for operation in processors.operations:
+            if operation.operator is not None:
+                operation.operator.compiled_python
+        pipeline = processors.compiled_pipeline
+        buffered = bool(self.input and self.input.buffer_spec)
+        if pipeline.batch_size and not buffered:
+            raise ValueError(
+                "Batch operations require the agent input to define 'take'."
+            )
+        if pipeline.coalesced and not buffered and (self.concurrency or 1) == 1:
+            raise ValueError(PROCESS_EXECUTOR_NEEDS_BATCHES)
+
+    def apply_reload(self, processors: "AgentProcessorSpec") -> None:
+        """Swap in the operations of ``processors``, prepared by
+        :meth:`prepare_reload`.
+
+        The agent keeps consuming: events taken after the swap go through
+        the new pipeline, while values already in the old one finish there.
+        """
+        previous = self._process_executor
+        self.pipeline = processors.pipeline
+        self.init = processors.init
+        self.operations = processors.operations
+        self._context = processors._context
+        self._init_scope = processors._init_scope
+        self._process_executor = processors._process_executor
+        self._compiled_pipeline = processors.compiled_pipeline
+        if previous is not None:
+            previous.retire()
+
     def on_error(self, e: Exception):
         """Handle errors in the processor."""
         if self.init:
             self.init.clear_scope()
+        for operation in self.operations:
+            if operation.operator is not None:
+                operation.operator.clear_scope()
         self._init_scope = None
+        if self._process_executor is not None:
+            # Worker processes run init again when the pool restarts.
+            self._process_executor.shutdown()
 
     @property
     def init_scope(self) -> Dict[str, Any]:
         """Return the initialization scope."""
         if self._init_scope is None:
-            self._init_scope = self.init.execute().scope if self.init else {}
+            context = self.context
+            if self.init:
+                self.init.with_scope({"context": context})
+            init_scope = self.init.execute().scope if self.init else {}
+            # Operators share one scope per init generation; per-event state
+            # is read through ``context`` rather than copied into each scope.
+            for operation in self.operations:
+                if operation.operator is not None:
+                    operation.operator.with_scope({**init_scope, "context": context})
+            self._init_scope = init_scope
         return self._init_scope
+
+    @property
+    def context(self) -> ProcessorContext:
+        """Return the context exposed to PyCode as ``context``."""
+        if self._context is None:
+            self._context = ProcessorContext(app=self.app)
+        return self._context
     
+    @property
+    def compiled_pipeline(self) -> Pipeline:
+        """Return the pipeline compiled from this processor's operations."""
+        if self._compiled_pipeline is None:
+            self._compiled_pipeline = Pipeline.compile(
+                self.operations,
+                self.pipeline,
+                executors={
+                    EXECUTOR_PROCESS: self.process_executor,
+                    EXECUTOR_THREAD: ThreadExecutor(
+                        self.app.processor_thread_pool, self.app.monitor
+                    ),
+                },
+            )
+        return self._compiled_pipeline
+
+    @property
+    def process_executor(self) -> ProcessExecutor:
+        """Return the worker process pool for ``executor: process`` operations."""
+        if self._process_executor is None:
+            self._process_executor = ProcessExecutor(
+                self.init, self.app.conf.processor_process_pool_size
+            )
+        return self._process_executor
+
     @property
     def processor(self) -> Callable[..., Awaitable[Any]]:
         if self._processor is None:
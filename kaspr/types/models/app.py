@@ -30,7 +30,9 @@ class AppSpec(SpecComponent):
     def agents(self) -> List[KasprAgentT]:
         if self.app:
             if self._agents is None:
-                self._agents = [agent.agent for agent in self.agents_spec]
+                self._agents = [
+                    agent.agent for agent in self.agents_spec if not agent.fused
+                ]
             return self._agents
 
     @property
@@ -0,0 +1,409 @@
+"""Executors for running processor operations off the event loop.
+
+An operation declaring ``executor: process`` is run in a pool of worker
+processes owned by its processor. Each worker compiles the processor's
+``init`` block and the operation code once, when it starts, so ``init``
+state is per worker process rather than shared with the event loop.
+
+Calls are micro-batched: values arriving for the same operation while
+the pool is busy are pickled and sent to a worker together, instead of
+one round trip per value. Each caller gets its own result back, so
+pipeline order is kept. Values only arrive together when the agent
+processes several at once, so agents using ``executor: process`` must
+define an input ``take`` (whose buffered values are run through the
+pipeline concurrently) or a ``concurrency`` above 1.
+
+An operation declaring ``executor: thread`` is called in the app's
+bounded thread pool instead, sharing the processor's ``init`` scope. It
+is meant for code that blocks on I/O or releases the GIL. Its entry point
+must not be async, and is resolved on the event loop before each call,
+as executing the operation's source is not thread-safe.
+"""
+
+import asyncio
+import contextvars
+import multiprocessing
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from time import monotonic
+from types import AsyncGeneratorType, CoroutineType, GeneratorType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from mode.utils.imports import symbol_by_name
+from kaspr.utils.columnar import ColumnarBatch
+from kaspr.utils.context import ProcessorContext, set_current_event
+from kaspr.utils.functional import needs_await
+from kaspr.types.code import CodeT, FUNC_ASYNC_GENERATOR, FUNC_COROUTINE
+from kaspr.types.operation import ProcessorOperatorT
+
+__all__ = ["ProcessExecutor", "ThreadExecutor", "EXECUTOR_PROCESS", "EXECUTOR_THREAD"]
+
+EXECUTOR_PROCESS = "process"
+EXECUTOR_THREAD = "thread"
+
+#: Maximum number of values sent to a worker process in one call.
+PROCESS_BATCH_MAX_SIZE = 256
+
+# Result tags returned by worker processes, one per value.
+_VALUE = 0
+_SKIPPED = 1
+_FANOUT = 2
+_ERROR = 3
+
+_SKIP = ProcessorOperatorT.skip_value
+
+CodeSpec = Tuple[str, Dict[str, Any]]
+Result = Tuple[int, Any]
+
+# Worker process state, set by :func:`_init_worker`.
+_worker_operators: Dict[str, ProcessorOperatorT] = {}
+_worker_error: Optional[BaseException] = None
+
+
+def _code_spec(code: CodeT) -> CodeSpec:
+    """Return a picklable description of a PyCode block."""
+    cls = type(code)
+    attrs = {"python": code.python, "entrypoint": code.entrypoint}
+    if getattr(code, "columnar", None) is not None:
+        attrs["columnar"] = code.columnar
+    return f"{cls.__module__}:{cls.__qualname__}", attrs
+
+
+def _from_code_spec(spec: CodeSpec) -> CodeT:
+    path, attrs = spec
+    return symbol_by_name(path)(**attrs)
+
+
+def _picklable(ex: BaseException) -> BaseException:
+    """Return ``ex``, or a stand-in if it cannot be sent to the parent."""
+    try:
+        pickle.dumps(ex)
+    except Exception:
+        return RuntimeError(f"{type(ex).__name__}: {ex}")
+    return ex
+
+
+def _check_operation(operation: Any, executor: str, with_tables: bool) -> None:
+    """Raise if ``operation`` cannot be called off the event loop.
+
+    Operations given their tables (``with_tables``) are rejected if they
+    reference any.
+    """
+    if with_tables and operation.table_refs:
+        # Tables are only safe to use from the event loop thread.
+        raise ValueError(
+            f"Operation '{operation.name}' uses tables and cannot run "
+            f"with 'executor: {executor}'."
+        )
+
+
+def _check_sync(operation: Any, executor: str) -> None:
+    """Raise if the entry point of ``operation`` is async."""
+    if operation.operator.func_kind in (FUNC_COROUTINE, FUNC_ASYNC_GENERATOR):
+        raise ValueError(
+            f"Operation '{operation.name}' is async and cannot run "
+            f"with 'executor: {executor}'."
+        )
+
+
+def _sync_result(result: Any, executor: str) -> Any:
+    """Return an operator result, consuming generators eagerly."""
+    if isinstance(result, AsyncGeneratorType) or needs_await(result):
+        if isinstance(result, CoroutineType):
+            result.close()
+        raise TypeError(f"Operations with 'executor: {executor}' must not be async.")
+    if isinstance(result, GeneratorType):
+        return list(result)
+    return result
+
+
+def _init_worker(init: Optional[CodeSpec], operators: Dict[str, CodeSpec]) -> None:
+    """Compile the init block and operators in a new worker process."""
+    global _worker_error
+    try:
+        set_current_event(None)
+        context = ProcessorContext()
+        scope = {}
+        if init is not None:
+            scope = _from_code_spec(init).with_scope({"context": context}).execute().scope
+        for name, spec in operators.items():
+            operator = _from_code_spec(spec)
+            operator.with_scope({**scope, "context": context})
+            _worker_operators[name] = operator
+    except Exception as ex:
+        # Reported for every value instead of breaking the whole pool.
+        _worker_error = _picklable(ex)
+
+
+def _call_in_worker(operator: ProcessorOperatorT, value: Any) -> Result:
+    try:
+        result = operator.call(value)
+        if result is operator.skip_value:
+            return _SKIPPED, None
+        if isinstance(result, GeneratorType):
+            return _FANOUT, _sync_result(result, EXECUTOR_PROCESS)
+        result = _sync_result(result, EXECUTOR_PROCESS)
+        if operator.is_batch:
+            values, events = result
+            if isinstance(values, ColumnarBatch):
+                values = values.to_records()
+            result = list(values), events
+        return _VALUE, result
+    except Exception as ex:
+        return _ERROR, _picklable(ex)
+
+
+def _run_in_worker(name: str, values: List[Any]) -> List[Result]:
+    """Run a batch of values through operator ``name`` in a worker."""
+    if _worker_error is not None:
+        return [(_ERROR, _worker_error)] * len(values)
+    operator = _worker_operators[name]
+    return [_call_in_worker(operator, value) for value in values]
+
+
+class _ProcessStage:
+    """Coalesces calls to one operation into batches for the pool."""
+
+    __slots__ = (
+        "executor",
+        "name",
+        "is_batch",
+        "limit",
+        "_pending",
+        "_inflight",
+        "_scheduled",
+    )
+
+    def __init__(
+        self, executor: "ProcessExecutor", name: str, is_batch: bool, limit: int
+    ) -> None:
+        self.executor = executor
+        self.name = name
+        self.is_batch = is_batch
+        self.limit = limit
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._inflight = 0
+        self._scheduled = False
+
+    async def call(self, value: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        events = None
+        if self.is_batch:
+            # Events stay in this process; workers get their positions.
+            values, events = value
+            if isinstance(values, ColumnarBatch):
+                values = values.to_records()
+            value = (values, list(range(len(events))))
+        waiter = loop.create_future()
+        self._pending.append((value, waiter))
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._flush)
+        executor = self.executor
+        executor._calls += 1
+        try:
+            kind, result = await waiter
+        finally:
+            executor._calls -= 1
+            if executor._retired:
+                executor._maybe_close()
+        if kind == _VALUE:
+            if events is not None:
+                values, positions = result
+                return values, [events[i] for i in positions]
+            return result
+        if kind == _SKIPPED:
+            return _SKIP
+        if kind == _FANOUT:
+            return (item for item in result)
+        raise result
+
+    def _flush(self) -> None:
+        self._scheduled = False
+        limit = self.limit
+        while self._pending and self._inflight < limit:
+            # Spread what is pending over the idle workers.
+            size = -(-len(self._pending) // (limit - self._inflight))
+            size = min(size, PROCESS_BATCH_MAX_SIZE)
+            batch, self._pending = self._pending[:size], self._pending[size:]
+            self._submit(batch)
+
+    def _submit(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(
+                self.executor.pool,
+                _run_in_worker,
+                self.name,
+                [value for value, _ in batch],
+            )
+        except Exception as ex:
+            for _, waiter in batch:
+                if not waiter.done():
+                    waiter.set_exception(ex)
+            return
+        self._inflight += 1
+        future.add_done_callback(partial(self._done, batch))
+
+    def _done(self, batch: List[Tuple[Any, asyncio.Future]], future: asyncio.Future) -> None:
+        self._inflight -= 1
+        if future.cancelled():
+            for _, waiter in batch:
+                waiter.cancel()
+        elif future.exception() is not None:
+            for _, waiter in batch:
+                if not waiter.done():
+                    waiter.set_exception(future.exception())
+        else:
+            for (_, waiter), result in zip(batch, future.result()):
+                if not waiter.done():
+                    waiter.set_result(result)
+        if self._pending and not self._scheduled:
+            self._flush()
+
+
+class ProcessExecutor:
+    """Pool of worker processes running a processor's operations.
+
+    The pool is started on first use. :meth:`shutdown` stops it, and a
+    new pool (running ``init`` again) is started when it is next used.
+    :meth:`retire` stops it once calls already made have completed.
+    """
+
+    #: Calls made concurrently are sent to a worker together, see
+    #: :attr:`~kaspr.types.models.pipeline.Pipeline.coalesced`.
+    coalesces_calls = True
+
+    def __init__(self, init: Optional[CodeT], max_workers: int) -> None:
+        self.init = init
+        self.max_workers = max(1, max_workers)
+        self._operators: Dict[str, ProcessorOperatorT] = {}
+        self._pool: ProcessPoolExecutor = None
+        self._calls = 0
+        self._retired = False
+
+    def bind(self, operation: Any, with_tables: bool = True) -> Callable[[Any], Any]:
+        """Return the call used by the pipeline stage for ``operation``."""
+        _check_operation(operation, EXECUTOR_PROCESS, with_tables)
+        self._operators[operation.name] = operation.operator
+        limit = min(self.max_workers, operation.max_concurrency or self.max_workers)
+        return _ProcessStage(
+            self, operation.name, operation.operator.is_batch, limit
+        ).call
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Workers are spawned rather than forked: the parent runs an
+            # event loop and threads that must not be copied into them.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    _code_spec(self.init) if self.init else None,
+                    {name: _code_spec(op) for name, op in self._operators.items()},
+                ),
+            )
+        return self._pool
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def retire(self) -> None:
+        """Stop the worker processes once pending calls complete.
+
+        Used when the operations are replaced, while values may still be
+        going through the previous pipeline.
+        """
+        self._retired = True
+        self._maybe_close()
+
+    def _maybe_close(self) -> None:
+        if not self._calls:
+            self.shutdown()
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: {sorted(self._operators)}>"
+
+
+class _ThreadStage:
+    """Calls one operation in a thread pool, up to ``limit`` at a time."""
+
+    __slots__ = ("executor", "name", "operator", "_semaphore")
+
+    def __init__(
+        self,
+        executor: "ThreadExecutor",
+        name: str,
+        operator: ProcessorOperatorT,
+        limit: Optional[int],
+    ) -> None:
+        self.executor = executor
+        self.name = name
+        self.operator = operator
+        self._semaphore = asyncio.Semaphore(limit) if limit else None
+
+    async def call(self, value: Any, **kwargs: Any) -> Any:
+        queued = monotonic()
+        # Resolves the entry point on the loop if its scope was cleared,
+        # e.g. after an error, rather than in a pool thread.
+        self.operator.func
+        if self._semaphore is None:
+            fanout, result, started, finished = await self._submit(value, kwargs)
+        else:
+            async with self._semaphore:
+                fanout, result, started, finished = await self._submit(value, kwargs)
+        monitor = self.executor.monitor
+        if monitor is not None:
+            monitor.on_operation_executed(
+                self.name, EXECUTOR_THREAD, started - queued, finished - started
+            )
+        if fanout:
+            return (item for item in result)
+        return result
+
+    def _submit(self, value: Any, kwargs: Dict[str, Any]) -> asyncio.Future:
+        # Run in a copy of the current context, so the operation sees the
+        # event being processed (``context["event"]``).
+        context = contextvars.copy_context()
+        return asyncio.get_running_loop().run_in_executor(
+            self.executor.pool, context.run, self._run, value, kwargs
+        )
+
+    def _run(self, value: Any, kwargs: Dict[str, Any]) -> Tuple[bool, Any, float, float]:
+        started = monotonic()
+        result = self.operator.call(value, **kwargs)
+        fanout = isinstance(result, GeneratorType)
+        result = _sync_result(result, EXECUTOR_THREAD)
+        return fanout, result, started, monotonic()
+
+
+class ThreadExecutor:
+    """Runs a processor's blocking operations in a thread pool.
+
+    The pool is shared by all processors of the app and bounds the number
+    of threads; ``max_concurrency`` on an operation further limits how many
+    of its calls run at once. Time spent waiting for a thread and time
+    spent running are reported to ``monitor``.
+    """
+
+    coalesces_calls = False
+
+    def __init__(self, pool: Executor, monitor: Any = None) -> None:
+        self.pool = pool
+        self.monitor = monitor
+
+    def bind(self, operation: Any, with_tables: bool = True) -> Callable[..., Any]:
+        """Return the call used by the pipeline stage for ``operation``."""
+        _check_operation(operation, EXECUTOR_THREAD, with_tables)
+        _check_sync(operation, EXECUTOR_THREAD)
+        return _ThreadStage(
+            self, operation.name, operation.operator, operation.max_concurrency
+        ).call
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: {self.pool!r}>"
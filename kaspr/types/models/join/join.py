@@ -1,6 +1,8 @@
 """JoinSpec model for key joins between tables."""
 
-from typing import Optional
+from typing import Any, Optional
+from faust.tables.keyjoin import KeyJoinProcessor
+from mode import ServiceT
 from kaspr.types.models.base import SpecComponent
 from kaspr.types.models.pycode import PyCode
 from kaspr.types.app import KasprAppT
@@ -20,19 +22,45 @@ class JoinSpec(SpecComponent):
     app: KasprAppT = None
 
     _join: KasprJoinT = None
+    _processor: Any = None
 
     def _prepare_join(self) -> KasprChannelT:
         left_table: KasprTableT = self.app.tables[self.left_table]
         right_table: KasprTableT = self.app.tables[self.right_table]
         extractor = self.extractor.func
         inner = (self.join_type or "inner") == "inner"
-        channel = left_table.key_join(
-            right_table, extractor=extractor, inner=inner
+        # As Table.key_join, keeping the processor so its output can be
+        # fused with the agent reading it (see :meth:`fuse`).
+        processor = KeyJoinProcessor(
+            self.app,
+            left_table=left_table,
+            right_table=right_table,
+            extractor=extractor,
+            inner=inner,
         )
-        channel_name = self.output_channel or f"{self.name}-channel"
-        self.app.register_named_channel(channel_name, channel)
+        left_table.beacon.add(processor)
+        left_table.add_dependency(processor)
+        self._processor = processor
+        channel = processor._output_channel
+        self.app.register_named_channel(self.channel_name, channel)
         return channel
 
+    def fuse(self, channel: Any) -> None:
+        """Send joined values to ``channel`` instead of the output channel.
+
+        ``channel`` only needs an async ``send(value=...)`` method. If it is
+        a service, it is started and stopped with the join.
+        """
+        self.join
+        self._processor._output_channel = channel
+        if isinstance(channel, ServiceT):
+            self._processor.add_dependency(channel)
+
+    @property
+    def channel_name(self) -> str:
+        """Return the name the output channel is registered under."""
+        return self.output_channel or f"{self.name}-channel"
+
     @property
     def join(self) -> KasprChannelT:
         if self._join is None:
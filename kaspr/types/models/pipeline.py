@@ -0,0 +1,312 @@
+"""Compiled processor pipeline.
+
+A processor ``pipeline`` names the operations to run, in order. Instead of
+interpreting that list for every value, the processor specs compile it once
+into a :class:`Pipeline`, which is shared by agents, webviews and tasks.
+"""
+
+import asyncio
+from inspect import isawaitable
+from types import AsyncGeneratorType, CoroutineType, GeneratorType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from kaspr.exceptions import KasprProcessingError
+from kaspr.utils.columnar import ColumnarBatch
+from kaspr.utils.context import set_current_event
+from kaspr.utils.functional import PLAIN_RESULT_TYPES, needs_await
+from kaspr.types.operation import ProcessorOperatorT
+
+T = TypeVar("T")
+
+Emitter = Callable[[Any], Union[None, Awaitable[Any]]]
+
+_SKIP = ProcessorOperatorT.skip_value
+
+
+class _EmitError(Exception):
+    """Carries an error raised by an emitter past the stage error handling."""
+
+
+class PipelineStage:
+    """A single operation bound to its operator and table arguments."""
+
+    __slots__ = ("name", "operator", "tables", "call")
+
+    def __init__(
+        self,
+        name: str,
+        operator: ProcessorOperatorT,
+        tables: Mapping[str, Any],
+        call: Optional[Callable[..., Any]] = None,
+    ) -> None:
+        self.name = name
+        self.operator = operator
+        self.tables = tables
+        self.call = call or operator.call
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: {self.name}>"
+
+
+class Pipeline:
+    """Ordered operations compiled into a single executor.
+
+    Consecutive stages are run back to back in one loop while operators
+    return plain values, so no intermediate collections are created per
+    stage. Operators are called through :meth:`ProcessorOperatorT.call`,
+    so only operators that return an awaitable are awaited.
+
+    Only when an operator returns a (sync or async) generator does
+    execution fan out. Fan-out is depth-first: each yielded item is run
+    through the remaining stages, and emitted, before the next item is
+    pulled.
+    """
+
+    __slots__ = ("stages", "batch_size", "coalesced")
+
+    stages: Tuple[PipelineStage, ...]
+
+    #: Number of leading batch stages, see :meth:`stream_batch`.
+    batch_size: int
+
+    #: True if a stage batches calls made concurrently (``executor:
+    #: process``). The values of a buffered batch are then run through the
+    #: per-value stages concurrently, see :meth:`stream_batch`.
+    coalesced: bool
+
+    def __init__(self, stages: Iterable[PipelineStage], coalesced: bool = False) -> None:
+        self.stages = tuple(stages)
+        self.coalesced = coalesced
+        self.batch_size = 0
+        for stage in self.stages:
+            if not stage.operator.is_batch:
+                break
+            self.batch_size += 1
+        for stage in self.stages[self.batch_size :]:
+            if stage.operator.is_batch:
+                raise ValueError(
+                    f"Batch operation '{stage.name}' must come before "
+                    "all per-value operations in the pipeline."
+                )
+
+    @classmethod
+    def compile(
+        cls,
+        operations: Iterable[Any],
+        pipeline: List[str],
+        with_tables: bool = True,
+        executors: Optional[Mapping[str, Any]] = None,
+    ) -> "Pipeline":
+        """Compile operations named by ``pipeline`` into a pipeline.
+
+        Arguments:
+            operations: Processor operations, looked up by ``name``.
+            pipeline: Ordered operation names.
+            with_tables: Pass each operation's tables to its operator.
+            executors: Executors by name. Operations that set ``executor``
+                are called through the executor's ``bind(operation,
+                with_tables)``.
+        """
+        by_name = {op.name: op for op in operations}
+        stages = []
+        coalesced = False
+        for name in pipeline or []:
+            if name not in by_name:
+                raise ValueError(f"Operation '{name}' is not defined.")
+            operation = by_name[name]
+            executor = getattr(operation, "executor", None)
+            if executor:
+                if not executors or executor not in executors:
+                    raise ValueError(
+                        f"Operation '{name}' uses executor '{executor}', "
+                        "which is not supported here."
+                    )
+                call = executors[executor].bind(operation, with_tables)
+                coalesced = coalesced or executors[executor].coalesces_calls
+                stages.append(PipelineStage(name, operation.operator, {}, call))
+                continue
+            tables = operation.tables if with_tables else {}
+            stages.append(PipelineStage(name, operation.operator, tables))
+        return cls(stages, coalesced)
+
+    async def run(self, value: T, **kwargs: Any) -> List[Any]:
+        """Run a value through the pipeline and return all output values.
+
+        Keyword arguments are passed to the first operation only.
+
+        Raises:
+            KasprProcessingError: if an operation fails.
+        """
+        results = []
+        await self.stream(value, results.append, **kwargs)
+        return results
+
+    async def stream(self, value: T, emit: Emitter, **kwargs: Any) -> None:
+        """Run a value through the pipeline, emitting output values as they
+        are produced.
+
+        Each value yielded by a fan-out operation is taken through the
+        remaining stages and passed to ``emit`` before the next one is
+        pulled, so outputs are never accumulated. If ``emit`` returns an
+        awaitable it is awaited, which applies backpressure from the
+        consumer (e.g. the producer buffer) to the operations.
+
+        Keyword arguments are passed to the first operation only.
+
+        Raises:
+            KasprProcessingError: if an operation fails. Errors raised by
+                ``emit`` are propagated unchanged.
+        """
+        if not self.stages:
+            return
+        try:
+            await self._run(0, value, kwargs, emit)
+        except _EmitError as ex:
+            raise ex.__cause__
+
+    async def stream_batch(
+        self, values: List[T], events: List[Any], emit: Emitter
+    ) -> None:
+        """Run a buffered batch through the pipeline, emitting output values
+        as they are produced.
+
+        Leading batch operations are called once with the ``(values,
+        events)`` pair, with ``context["event"]`` set to the list of events
+        still in the batch. Each remaining value is then taken through the
+        per-value operations with ``context["event"]`` set to its own
+        event, as in :meth:`stream`. If the pipeline is :attr:`coalesced`,
+        the values are run through them concurrently instead, so their calls
+        to a worker process are sent together, and outputs are emitted in
+        value order once all values are through.
+
+        Raises:
+            KasprProcessingError: if an operation fails. Errors raised by
+                ``emit`` are propagated unchanged.
+        """
+        batch = (values, events)
+        stage = None
+        try:
+            for stage in self.stages[: self.batch_size]:
+                set_current_event(batch[1])
+                if stage.tables:
+                    batch = stage.call(batch, **stage.tables)
+                else:
+                    batch = stage.call(batch)
+                if needs_await(batch):
+                    batch = await batch
+                if batch is _SKIP:
+                    return
+        except Exception as ex:
+            raise KasprProcessingError(
+                message=str(ex),
+                cause=ex,
+                operation=stage.name if stage else None,
+            ) from ex
+        index = self.batch_size
+        values, events = batch
+        if isinstance(values, ColumnarBatch):
+            values = values.to_records()
+        if self.coalesced:
+            await self._run_concurrently(index, values, events, emit)
+            return
+        try:
+            for value, event in zip(values, events):
+                set_current_event(event)
+                await self._run(index, value, None, emit)
+        except _EmitError as ex:
+            raise ex.__cause__
+
+    async def _run_concurrently(
+        self, index: int, values: List[T], events: List[Any], emit: Emitter
+    ) -> None:
+        outputs: List[List[Any]] = [[] for _ in values]
+
+        async def _run_value(value: Any, event: Any, output: List[Any]) -> None:
+            set_current_event(event)
+            await self._run(index, value, None, output.append)
+
+        tasks = [
+            asyncio.ensure_future(_run_value(value, event, output))
+            for value, event, output in zip(values, events, outputs)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for output in outputs:
+            for value in output:
+                result = emit(value)
+                if result is not None and needs_await(result):
+                    await result
+
+    async def _run(
+        self,
+        index: int,
+        value: Any,
+        kwargs: Optional[Dict[str, Any]],
+        emit: Emitter,
+    ) -> None:
+        stages = self.stages
+        count = len(stages)
+        stage = None
+        try:
+            while index < count:
+                stage = stages[index]
+                index += 1
+                tables = stage.tables
+                if kwargs:
+                    value = stage.call(value, **tables, **kwargs)
+                    kwargs = None
+                elif tables:
+                    value = stage.call(value, **tables)
+                else:
+                    value = stage.call(value)
+                value_type = type(value)
+                # Inlined needs_await(), as this runs for every value.
+                if value_type is CoroutineType or (
+                    value_type not in PLAIN_RESULT_TYPES and isawaitable(value)
+                ):
+                    value = await value
+                    value_type = type(value)
+                if value is _SKIP:
+                    return
+                if value_type is GeneratorType:
+                    for item in value:
+                        await self._run(index, item, None, emit)
+                    return
+                if value_type is AsyncGeneratorType:
+                    async for item in value:
+                        await self._run(index, item, None, emit)
+                    return
+        except (KasprProcessingError, _EmitError):
+            raise
+        except Exception as ex:
+            raise KasprProcessingError(
+                message=str(ex),
+                cause=ex,
+                operation=stage.name if stage else None,
+            ) from ex
+        try:
+            result = emit(value)
+            if result is not None and needs_await(result):
+                await result
+        except Exception as ex:
+            raise _EmitError() from ex
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: {[s.name for s in self.stages]}>"
@@ -1,14 +1,88 @@
 """PyCode model"""
+import ast
 from typing import Any, Union, Callable, TypeVar, Awaitable, Optional, Dict
 from types import CodeType
+from inspect import (
+    CO_ASYNC_GENERATOR,
+    CO_COROUTINE,
+    CO_GENERATOR,
+    isasyncgenfunction,
+    iscoroutinefunction,
+    isgeneratorfunction,
+)
 from mode.utils.objects import cached_property
+from kaspr.utils.codecache import compile_source
 from kaspr.types.models.base import SpecComponent
-from kaspr.types.code import CodeT
+from kaspr.types.code import (
+    CodeT,
+    FUNC_SYNC,
+    FUNC_COROUTINE,
+    FUNC_GENERATOR,
+    FUNC_ASYNC_GENERATOR,
+)
 
 T = TypeVar("T")
 Function = Callable[[T], Union[T, Awaitable[T]]]
 
 
+def _func_kind(func: Optional[Function]) -> Optional[str]:
+    """Classify a function by how its result must be consumed."""
+    if func is None:
+        return None
+    if iscoroutinefunction(func):
+        return FUNC_COROUTINE
+    if isasyncgenfunction(func):
+        return FUNC_ASYNC_GENERATOR
+    if isgeneratorfunction(func):
+        return FUNC_GENERATOR
+    return FUNC_SYNC
+
+
+def _binds(node: ast.AST, name: str) -> bool:
+    """Return True if ``node`` may bind ``name``."""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return node.name == name
+    if isinstance(node, ast.Name):
+        return node.id == name and not isinstance(node.ctx, ast.Load)
+    if isinstance(node, ast.alias):
+        return (node.asname or node.name.partition(".")[0]) == name
+    if isinstance(node, (ast.Global, ast.Nonlocal)):
+        return name in node.names
+    return False
+
+
+def _declared_func_kind(source: str, code: CodeType, entrypoint: str) -> Optional[str]:
+    """Classify the entry point from its source, without executing it.
+
+    Only an entry point bound once, by an undecorated top-level ``def``,
+    is classified; None is returned for anything else.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    bindings = [node for node in ast.walk(tree) if _binds(node, entrypoint)]
+    if len(bindings) != 1:
+        return None
+    node = bindings[0]
+    if (
+        node not in tree.body
+        or not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        or node.decorator_list
+    ):
+        return None
+    for const in code.co_consts:
+        if isinstance(const, CodeType) and const.co_name == entrypoint:
+            if const.co_flags & CO_COROUTINE:
+                return FUNC_COROUTINE
+            if const.co_flags & CO_ASYNC_GENERATOR:
+                return FUNC_ASYNC_GENERATOR
+            if const.co_flags & CO_GENERATOR:
+                return FUNC_GENERATOR
+            return FUNC_SYNC
+    return None
+
+
 class PyCode(CodeT, SpecComponent):
     """Python code specification."""
 
@@ -18,13 +92,18 @@ class PyCode(CodeT, SpecComponent):
     _compiled_python: CodeType
     _scope: Dict[str, T]
     _func: Function
+    _func_kind: Optional[str]
+    _executed: bool
+    _scoped: bool
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._compiled_python = None
         self._scope = {}
         self._func = None
-
+        self._func_kind = None
+        self._executed = False
+        self._scoped = False
 
     @classmethod
     def default(cls) -> "PyCode":
@@ -32,13 +111,30 @@ class PyCode(CodeT, SpecComponent):
         return cls(python="", entrypoint=None)
 
     def with_scope(self, scope: Dict[str, T]) -> "PyCode":
-        """Set the scope for executing source code"""
-        self._scope = scope
+        """Set the scope for executing source code.
+
+        Once the source has been executed, the cached function holds the
+        scope as its globals, so a new scope is merged into the existing one
+        instead of replacing it. If the source was executed before any scope
+        was set, it is executed again in the new scope when next used.
+        """
+        if self._executed and self._scoped:
+            self._scope.update(scope)
+        else:
+            self._scope = scope
+            self._func = None
+            self._func_kind = None
+            self._executed = False
+        self._scoped = True
         return self
 
     def clear_scope(self) -> "PyCode":
-        """Clear the scope"""
+        """Clear the scope, forcing the source to be executed again."""
         self._scope.clear()
+        self._func = None
+        self._func_kind = None
+        self._executed = False
+        self._scoped = False
         return self
 
     def execute(self) -> "PyCode":
@@ -55,19 +151,43 @@ class PyCode(CodeT, SpecComponent):
                 (v for v in self._scope.values() if callable(v)),
                 None,
             )
+        self._func_kind = _func_kind(self._func)
+        self._executed = True
         return self
 
     @property
     def func(self) -> Optional[Function]:
-        # TODO: explore if we can cache the function to avoid re-execution
-        self.execute()
+        """Entry point function, resolved on first access."""
+        if not self._executed:
+            self.execute()
         return self._func
+
+    @property
+    def func_kind(self) -> Optional[str]:
+        """Kind of the entry point function (sync, coroutine, generator
+        or async generator).
+
+        Read before the source is executed, the kind is taken from the
+        source where possible, so the source is not executed before its
+        scope is set.
+        """
+        if not self._executed and self._func_kind is None:
+            if self.entrypoint:
+                self._func_kind = _declared_func_kind(
+                    self.python, self.compiled_python, self.entrypoint
+                )
+            if self._func_kind is None:
+                self.execute()
+        return self._func_kind
     
     @cached_property
     def compiled_python(self) -> CodeType:
-        """Return the compiled python code."""
+        """Return the compiled python code.
+
+        Identical sources share one code object across all blocks.
+        """
         if not self._compiled_python:
-            self._compiled_python = compile(self.python, "<string>", "exec")
+            self._compiled_python = compile_source(self.python)
         return self._compiled_python
 
     @property
@@ -4,11 +4,12 @@ The first operation in the pipeline is always called with no input value
 because there is no source value for tasks.
 """
 
-from typing import Optional, TypeVar, Dict, List, Union
-from kaspr.utils.functional import maybe_async
+from typing import Any, Optional, TypeVar, Dict, List, Union
+from kaspr.utils.functional import maybe_async, needs_await
 from kaspr.types.models.base import SpecComponent
 from kaspr.types.models.topicout import TopicOutSpec
 from kaspr.types.models.pycode import PyCode
+from kaspr.types.code import FUNC_COROUTINE
 from kaspr.types.operation import ProcessorOperatorT
 from kaspr.types.models.tableref import TableRefSpec
 from kaspr.types.table import KasprTableT, KasprGlobalTableT
@@ -23,6 +24,10 @@ class TaskProcessorTopicSendOperator(ProcessorOperatorT, TopicOutSpec):
         # Not applicable for this operator
         ...
 
+    def clear_scope(self):
+        # Not applicable for this operator
+        ...
+
     def execute(self): 
         # Not applicable for this operator
         ...
@@ -43,6 +48,11 @@ class TaskProcessorMapOperator(ProcessorOperatorT, PyCode):
             return await maybe_async(self.func(**kwargs))
         return await maybe_async(self.func(value, **kwargs))
 
+    def call(self, value, first_op=False, **kwargs) -> T:
+        if first_op:
+            return self.func(**kwargs)
+        return self.func(value, **kwargs)
+
 class TaskProcessorFilterOperator(ProcessorOperatorT, PyCode):
 
     async def process(self, value, first_op=False, **kwargs) -> T:
@@ -56,6 +66,24 @@ class TaskProcessorFilterOperator(ProcessorOperatorT, PyCode):
         else:
             return value
 
+    def call(self, value, first_op=False, **kwargs) -> T:
+        if self.func_kind == FUNC_COROUTINE:
+            return self.process(value, first_op=first_op, **kwargs)
+        if first_op:
+            predicate = self.func(**kwargs)
+        else:
+            predicate = self.func(value, **kwargs)
+        if needs_await(predicate):
+            return self._filter(value, predicate)
+        if not predicate:
+            return self.skip_value
+        return value
+
+    async def _filter(self, value: T, predicate: Any) -> T:
+        if not await predicate:
+            return self.skip_value
+        return value
+
 class TaskProcessorOperation(SpecComponent):
     """Defines all possible operations in a TaskProcessor."""
     name: str
@@ -63,6 +91,8 @@ class TaskProcessorOperation(SpecComponent):
     map: Optional[TaskProcessorMapOperator]
     filter: Optional[TaskProcessorFilterOperator]
     table_refs: Optional[List[TableRefSpec]]
+    executor: Optional[str]
+    max_concurrency: Optional[int]
 
     app: KasprAppT = None
 
@@ -1,9 +1,10 @@
 from typing import Optional, List, Awaitable, Any, Callable, Dict
-from inspect import isasyncgen
-from kaspr.utils.functional import ensure_generator
+from kaspr.utils.context import ProcessorContext
 from kaspr.types.models.base import SpecComponent
 from kaspr.types.models.task.operations import TaskProcessorOperation
 from kaspr.types.models.pycode import PyCode
+from kaspr.types.models.pipeline import Pipeline
+from kaspr.types.models.executors import EXECUTOR_THREAD, ThreadExecutor
 from kaspr.types.app import KasprAppT
 
 
@@ -18,89 +19,23 @@ class TaskProcessorSpec(SpecComponent):
 
     _processor: Callable[..., Awaitable[Any]] = None
     _init_scope: Dict[str, Any] = None
+    _context: ProcessorContext = None
+    _compiled_pipeline: Pipeline = None
 
     def has_args(self, func: Callable) -> bool:
         """Check if function has arguments."""
         return func.__code__.co_argcount > 0
 
     def prepare_processor(self) -> Callable[..., Awaitable[Any]]:
-        operations = {op.name: op for op in self.operations}
-
         async def _request_processor(app, **kwargs: Any) -> Any:
             try:
-                context = {"app": self.app}
-                if self.init:
-                    self.init.with_scope({"context": {**context}})                
-                init_scope = self.init_scope
-                for name in self.pipeline:
-                    if name not in operations:
-                        raise ValueError(f"Operation '{name}' is not defined.")
-                ops = [operations[name] for name in self.pipeline]
-                operation = None
+                self.init_scope  # prepares init and operator scopes
+                pipeline = self.compiled_pipeline
                 # No operations, just return
-                if not ops:
+                if not pipeline:
                     return
-                operation = ops[0]
-                operator = operation.operator
-                scope = {
-                    **init_scope,
-                    "context": {**context},
-                }
-                operator.with_scope(scope)
                 # Initial call is always with None value
-                result = await operator.process(None, first_op=True, **kwargs)
-                if result == operator.skip_value:
-                    return
-                gen = ensure_generator(result, async_gen=isasyncgen(result))
-
-                if isasyncgen(gen):
-                    async for value in gen:
-                        # Start with the initial value
-                        current_values = [value]
-                        for operation in ops[1:]:
-                            next_values = []
-                            operator = operation.operator
-                            for current_value in current_values:
-                                scope = {
-                                    **init_scope,
-                                    "context": {**context},
-                                }
-                                operator.with_scope(scope)
-                                result = await operator.process(current_value)
-                                if result == operator.skip_value:
-                                    continue
-                                # Collect all results
-                                next_values.extend(
-                                    ensure_generator(
-                                        result, async_gen=isasyncgen(result)
-                                    )
-                                )
-                            # Update for the next callback
-                            current_values = next_values
-                else:
-                    for value in gen:
-                        # Start with the initial value
-                        current_values = [value]
-                        for operation in ops[1:]:
-                            next_values = []
-                            operator = operation.operator
-                            for current_value in current_values:
-                                scope = {
-                                    **init_scope,
-                                    "context": {**context},
-                                }
-                                operator.with_scope(scope)
-                                result = await operator.process(current_value)
-                                if result == operator.skip_value:
-                                    continue
-                                # Collect all results
-                                next_values.extend(
-                                    ensure_generator(
-                                        result, async_gen=isasyncgen(result)
-                                    )
-                                )
-                            # Update for the next callback
-                            current_values = next_values
+                await pipeline.run(None, first_op=True, **kwargs)
 
             except Exception as e:
                 self.on_error(e)
@@ -108,12 +43,73 @@ class TaskProcessorSpec(SpecComponent):
 
         return _request_processor
 
+    def reload(self, processors: "TaskProcessorSpec") -> None:
+        """Replace this processor's operations with those of ``processors``.
+
+        Runs :meth:`prepare_reload` and then :meth:`apply_reload`, so an
+        invalid definition leaves the running one in place.
+
+        Raises:
+            SyntaxError: if the code of an operation does not compile.
+            ValueError: if the new pipeline cannot be compiled.
+        """
+        self.prepare_reload(processors)
+        self.apply_reload(processors)
+
+    def prepare_reload(self, processors: "TaskProcessorSpec") -> None:
+        """Run the init block of ``processors`` and compile its operations
+        and pipeline, without replacing anything.
+
+        Raises:
+            SyntaxError: if the code of an operation does not compile.
+            ValueError: if the new pipeline cannot be compiled.
+        """
+        processors.app = self.app
+        processors.init_scope
+        for operation in processors.operations:
+            if operation.operator is not None:
+                operation.operator.compiled_python
+        processors.compiled_pipeline
+
+    def apply_reload(self, processors: "TaskProcessorSpec") -> None:
+        """Swap in the operations of ``processors``, prepared by
+        :meth:`prepare_reload`. Runs started after the swap use the new pipeline.
+        """
+        self.pipeline = processors.pipeline
+        self.init = processors.init
+        self.operations = processors.operations
+        self._context = processors._context
+        self._init_scope = processors._init_scope
+        self._compiled_pipeline = processors.compiled_pipeline
+
     def on_error(self, e: Exception):
         """Handle errors in the processor."""
         if self.init:
             self.init.clear_scope()
+        for operation in self.operations:
+            if operation.operator is not None:
+                operation.operator.clear_scope()
         self._init_scope = None
 
+    @property
+    def compiled_pipeline(self) -> Pipeline:
+        """Return the pipeline compiled from this processor's operations.
+
+        Tables are not passed to task operations.
+        """
+        if self._compiled_pipeline is None:
+            self._compiled_pipeline = Pipeline.compile(
+                self.operations,
+                self.pipeline,
+                with_tables=False,
+                executors={
+                    EXECUTOR_THREAD: ThreadExecutor(
+                        self.app.processor_thread_pool, self.app.monitor
+                    )
+                },
+            )
+        return self._compiled_pipeline
+
     @property
     def processor(self) -> Callable[..., Awaitable[Any]]:
         if self._processor is None:
@@ -124,9 +120,25 @@ class TaskProcessorSpec(SpecComponent):
     def init_scope(self) -> Dict[str, Any]:
         """Return the initialization scope."""
         if self._init_scope is None:
-            self._init_scope = self.init.execute().scope if self.init else {}
+            context = self.context
+            if self.init:
+                self.init.with_scope({"context": context})
+            init_scope = self.init.execute().scope if self.init else {}
+            # Operators share one scope per init generation; per-event state
+            # is read through ``context`` rather than copied into each scope.
+            for operation in self.operations:
+                if operation.operator is not None:
+                    operation.operator.with_scope({**init_scope, "context": context})
+            self._init_scope = init_scope
         return self._init_scope
 
+    @property
+    def context(self) -> ProcessorContext:
+        """Return the context exposed to PyCode as ``context``."""
+        if self._context is None:
+            self._context = ProcessorContext(app=self.app, with_event=False)
+        return self._context
+
     @property
     def label(self) -> str:
         """Return description, used in graphs and logs."""
@@ -1,5 +1,7 @@
 from typing import Optional, Dict, TypeVar, Callable, Union, Awaitable, OrderedDict
+from faust.types import RecordMetadata
 from kaspr.types.models.base import SpecComponent
+from kaspr.utils.selectors import Selection, compile_selection
 from kaspr.types.app import KasprAppT
 from kaspr.types.topic import KasprTopicT
 from kaspr.types.models.topicselector import (
@@ -28,6 +30,12 @@ class TopicOutSpec(SpecComponent):
     partition_selector: Optional[TopicPartitionSelector]
     headers_selector: Optional[TopicHeadersSelector]
     predicate: Optional[TopicPredicate]
+    #: Declarative alternatives to the selectors above, see
+    #: :mod:`kaspr.utils.selectors`.
+    key_field: Optional[Selection] = None
+    value_field: Optional[Selection] = None
+    partition_field: Optional[Selection] = None
+    headers_field: Optional[Selection] = None
 
     app: KasprAppT = None
     _topics: Dict[str, KasprTopicT] = dict()
@@ -44,7 +52,18 @@ class TopicOutSpec(SpecComponent):
         If ack is True, returns metadata (offset, timestamp, etc).
         of the sent message.
         """
-        res = await self.get_topic(value).send(
+        res = await self.deliver(value, **kwargs)
+        if self.ack:
+            return (await res)._asdict()
+
+    async def deliver(self, value: T, **kwargs) -> Awaitable[RecordMetadata]:
+        """Send value to topic according to spec, without waiting for
+        the broker to acknowledge it.
+
+        Returns the future that resolves to the message metadata once
+        the message is delivered.
+        """
+        return await self.get_topic(value).send(
             key_serializer=self.key_serializer,
             value_serializer=self.value_serializer,
             key=self.get_key(value, **kwargs),
@@ -52,8 +71,6 @@ class TopicOutSpec(SpecComponent):
             partition=self.get_partition(value, **kwargs),
             headers=self.get_headers(value, **kwargs),
         )
-        if self.ack:
-            return (await res)._asdict()
 
     def get_topic_name(self, value: T, **kwargs) -> KasprTopicT:
         """Get topic from value"""
@@ -122,6 +139,8 @@ class TopicOutSpec(SpecComponent):
         """Key selector function"""
         if self._key_selector_func is None and self.key_selector:
             self._key_selector_func = self.key_selector.func
+        elif self._key_selector_func is None and self.key_field:
+            self._key_selector_func = compile_selection(self.key_field)
         return self._key_selector_func
 
     @property
@@ -129,6 +148,8 @@ class TopicOutSpec(SpecComponent):
         """Value selector function"""
         if self._value_selector_func is None and self.value_selector:
             self._value_selector_func = self.value_selector.func
+        elif self._value_selector_func is None and self.value_field:
+            self._value_selector_func = compile_selection(self.value_field)
         return self._value_selector_func
 
     @property
@@ -136,6 +157,8 @@ class TopicOutSpec(SpecComponent):
         """Partition selector function"""
         if self._partition_selector_func is None and self.partition_selector:
             self._partition_selector_func = self.partition_selector.func
+        elif self._partition_selector_func is None and self.partition_field:
+            self._partition_selector_func = compile_selection(self.partition_field)
         return self._partition_selector_func
 
     @property
@@ -143,6 +166,8 @@ class TopicOutSpec(SpecComponent):
         """Headers selector function"""
         if self._headers_selector_func is None and self.headers_selector:
             self._headers_selector_func = self.headers_selector.func
+        elif self._headers_selector_func is None and self.headers_field:
+            self._headers_selector_func = compile_selection(self.headers_field)
         return self._headers_selector_func
 
     @property
@@ -1,8 +1,9 @@
-from typing import Optional, TypeVar, Dict, List, Union
-from kaspr.utils.functional import maybe_async
+from typing import Any, Optional, TypeVar, Dict, List, Union
+from kaspr.utils.functional import maybe_async, needs_await
 from kaspr.types.models.base import SpecComponent
 from kaspr.types.models.topicout import TopicOutSpec
 from kaspr.types.models.pycode import PyCode
+from kaspr.types.code import FUNC_COROUTINE
 from kaspr.types.operation import ProcessorOperatorT
 from kaspr.types.models.tableref import TableRefSpec
 from kaspr.types.table import KasprTableT, KasprGlobalTableT
@@ -17,6 +18,10 @@ class WebViewProcessorTopicSendOperator(ProcessorOperatorT, TopicOutSpec):
         # Not applicable for this operator
         ...
 
+    def clear_scope(self):
+        # Not applicable for this operator
+        ...
+
     def execute(self): 
         # Not applicable for this operator
         ...
@@ -34,12 +39,30 @@ class WebViewProcessorFilterOperator(ProcessorOperatorT, PyCode):
             return self.skip_value
         else:
             return value
-        
+
+    def call(self, value: T, **kwargs) -> T:
+        if self.func_kind == FUNC_COROUTINE:
+            return self.process(value, **kwargs)
+        predicate = self.func(value, **kwargs)
+        if needs_await(predicate):
+            return self._filter(value, predicate)
+        if not predicate:
+            return self.skip_value
+        return value
+
+    async def _filter(self, value: T, predicate: Any) -> T:
+        if not await predicate:
+            return self.skip_value
+        return value
+
 class WebViewProcessorMapOperator(ProcessorOperatorT, PyCode):
     """Operator to reformat a value."""
     async def process(self, value: T, **kwargs) -> T:
         return await maybe_async(self.func(value, **kwargs))
 
+    def call(self, value: T, **kwargs) -> T:
+        return self.func(value, **kwargs)
+
 
 class WebViewProcessorOperation(SpecComponent):
     """Defines all possible operations in a WebViewProcessor."""
@@ -48,6 +71,8 @@ class WebViewProcessorOperation(SpecComponent):
     map: Optional[WebViewProcessorMapOperator]
     filter: Optional[WebViewProcessorFilterOperator]
     table_refs: Optional[List[TableRefSpec]]
+    executor: Optional[str]
+    max_concurrency: Optional[int]
 
     app: KasprAppT = None
 
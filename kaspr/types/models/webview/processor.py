@@ -1,10 +1,11 @@
 from typing import Optional, List, Awaitable, Any, Callable, Dict
-from inspect import isasyncgen
-from kaspr.utils.functional import ensure_generator
+from kaspr.utils.context import ProcessorContext
 from kaspr.types.models.base import SpecComponent
 from kaspr.types.models.webview.operations import WebViewProcessorOperation
 from kaspr.types.models.webview.response import WebViewResponseSpec
 from kaspr.types.models.pycode import PyCode
+from kaspr.types.models.pipeline import Pipeline
+from kaspr.types.models.executors import EXECUTOR_THREAD, ThreadExecutor
 from kaspr.types.app import KasprAppT
 from kaspr.types.webview import KasprWebRequest, KasprWeb
 from kaspr.exceptions import KasprProcessingError
@@ -22,99 +23,20 @@ class WebViewProcessorSpec(SpecComponent):
     _processor: Callable[..., Awaitable[Any]] = None
     _response: WebViewResponseSpec = None
     _init_scope: Dict[str, Any] = None
+    _context: ProcessorContext = None
+    _compiled_pipeline: Pipeline = None
 
     def prepare_processor(self) -> Callable[..., Awaitable[Any]]:
-        operations = {op.name: op for op in self.operations}
-
         async def _request_processor(
             web: KasprWeb, request: KasprWebRequest, **kwargs: Any
         ) -> Any:
             try:
-                context = {"app": self.app}
-                if self.init:
-                    self.init.with_scope({"context": {**context}})                  
-                init_scope = self.init_scope
-                for name in self.pipeline:
-                    if name not in operations:
-                        raise ValueError(f"Operation '{name}' is not defined.")
-                ops = [operations[name] for name in self.pipeline]
-                operation = None
+                self.init_scope  # prepares init and operator scopes
+                pipeline = self.compiled_pipeline
                 # No operations, return the request data
-                if not ops:
+                if not pipeline:
                     return self.response.build_success(web)
-                operation = ops[0]
-                operator = operation.operator
-                tables = operation.tables
-                scope = {
-                    **init_scope,
-                    "context": {**context},
-                }
-                operator.with_scope(scope)
-                result = await operator.process(request, **tables, **kwargs)
-                if result == operator.skip_value:
-                    return
-                gen = ensure_generator(result, async_gen=isasyncgen(result))
-                response_values = []
-                if isasyncgen(gen):
-                    async for value in gen:
-                        # Start with the initial value
-                        current_values = [value]
-                        for operation in ops[1:]:
-                            next_values = []
-                            operator = operation.operator
-                            tables = operation.tables
-                            for current_value in current_values:
-                                scope = {
-                                    **init_scope,
-                                    "context": {**context},
-                                }
-                                operator.with_scope(scope)
-                                result = await operator.process(current_value, **tables)
-                                if result == operator.skip_value:
-                                    continue
-                                # Collect all results
-                                next_values.extend(
-                                    ensure_generator(
-                                        result, async_gen=isasyncgen(result)
-                                    )
-                                )
-                            # Update for the next callback
-                            current_values = next_values
-                        response_values.extend(current_values)
-
-                    if len(response_values) > 0:
-                        # Processors can generate multiple values, but we can only return one value in
-                        # a web response, so we return the last successful value.
-                        return self.response.build_success(web, response_values[-1])
-                    else:
-                        return self.response.build_success(web)
-                else:
-                    for value in gen:
-                        # Start with the initial value
-                        current_values = [value]
-                        for operation in ops[1:]:
-                            next_values = []
-                            operator = operation.operator
-                            tables = operation.tables
-                            for current_value in current_values:
-                                scope = {
-                                    **init_scope,
-                                    "context": {**context},
-                                }
-                                operator.with_scope(scope)
-                                result = await operator.process(current_value, **tables)
-                                if result == operator.skip_value:
-                                    continue
-                                # Collect all results
-                                next_values.extend(
-                                    ensure_generator(
-                                        result, async_gen=isasyncgen(result)
-                                    )
-                                )
-                            # Update for the next callback
-                            current_values = next_values
-                        response_values.extend(current_values)
-
+                response_values = await pipeline.run(request, **kwargs)
                 if len(response_values) > 0:
                     # Processors can generate multiple values, but we can only return one value in
                     # a web response, so we return the last successful value.
@@ -122,29 +44,101 @@ class WebViewProcessorSpec(SpecComponent):
                 else:
                     return self.response.build_success(web)
 
+            except KasprProcessingError as error:
+                return self.response.build_error(web, error)
             except Exception as ex:
-                error = KasprProcessingError(
-                    message=str(ex),
-                    operation=operation.name if operation else None,
-                    cause=ex,
-                )
+                error = KasprProcessingError(message=str(ex), cause=ex)
                 return self.response.build_error(web, error)
 
         return _request_processor
 
+    def reload(self, processors: "WebViewProcessorSpec") -> None:
+        """Replace this processor's operations with those of ``processors``.
+
+        Runs :meth:`prepare_reload` and then :meth:`apply_reload`, so an
+        invalid definition leaves the running one in place.
+
+        Raises:
+            SyntaxError: if the code of an operation does not compile.
+            ValueError: if the new pipeline cannot be compiled.
+        """
+        self.prepare_reload(processors)
+        self.apply_reload(processors)
+
+    def prepare_reload(self, processors: "WebViewProcessorSpec") -> None:
+        """Run the init block of ``processors`` and compile its operations
+        and pipeline, without replacing anything.
+
+        Raises:
+            SyntaxError: if the code of an operation does not compile.
+            ValueError: if the new pipeline cannot be compiled.
+        """
+        processors.app = self.app
+        processors.response = self.response
+        processors.init_scope
+        for operation in processors.operations:
+            if operation.operator is not None:
+                operation.operator.compiled_python
+        processors.compiled_pipeline
+
+    def apply_reload(self, processors: "WebViewProcessorSpec") -> None:
+        """Swap in the operations of ``processors``, prepared by
+        :meth:`prepare_reload`. Requests started after the swap use the new pipeline.
+        """
+        self.pipeline = processors.pipeline
+        self.init = processors.init
+        self.operations = processors.operations
+        self._context = processors._context
+        self._init_scope = processors._init_scope
+        self._compiled_pipeline = processors.compiled_pipeline
+
     def on_error(self, e: Exception):
         """Handle errors in the processor."""
         if self.init:
             self.init.clear_scope()
+        for operation in self.operations:
+            if operation.operator is not None:
+                operation.operator.clear_scope()
         self._init_scope = None
 
     @property
     def init_scope(self) -> Dict[str, Any]:
         """Return the initialization scope."""
         if self._init_scope is None:
-            self._init_scope = self.init.execute().scope if self.init else {}
+            context = self.context
+            if self.init:
+                self.init.with_scope({"context": context})
+            init_scope = self.init.execute().scope if self.init else {}
+            # Operators share one scope per init generation; per-event state
+            # is read through ``context`` rather than copied into each scope.
+            for operation in self.operations:
+                if operation.operator is not None:
+                    operation.operator.with_scope({**init_scope, "context": context})
+            self._init_scope = init_scope
         return self._init_scope
+
+    @property
+    def context(self) -> ProcessorContext:
+        """Return the context exposed to PyCode as ``context``."""
+        if self._context is None:
+            self._context = ProcessorContext(app=self.app, with_event=False)
+        return self._context
     
+    @property
+    def compiled_pipeline(self) -> Pipeline:
+        """Return the pipeline compiled from this processor's operations."""
+        if self._compiled_pipeline is None:
+            self._compiled_pipeline = Pipeline.compile(
+                self.operations,
+                self.pipeline,
+                executors={
+                    EXECUTOR_THREAD: ThreadExecutor(
+                        self.app.processor_thread_pool, self.app.monitor
+                    )
+                },
+            )
+        return self._compiled_pipeline
+
     @property
     def processor(self) -> Callable[..., Awaitable[Any]]:
         if self._processor is None:
@@ -1,5 +1,5 @@
 import abc
-from typing import Union, TypeVar
+from typing import Union, TypeVar, Awaitable
 from kaspr.types.code import CodeT
 
 T = TypeVar("T")
@@ -7,5 +7,18 @@ T = TypeVar("T")
 class ProcessorOperatorT(CodeT):
     skip_value = object()
 
+    #: Batch operators process a ``(values, events)`` pair from a
+    #: buffered input rather than a single value.
+    is_batch: bool = False
+
     @abc.abstractmethod
     async def process(self, value: T) -> Union["T", None]: ...
+
+    def call(self, value: T, **kwargs) -> Union["T", Awaitable["T"], None]:
+        """Process value, returning an awaitable only if the operator must be awaited.
+
+        Pipelines call operators through this method so that operators with
+        synchronous entry points are processed without creating a coroutine.
+        Defaults to :meth:`process`.
+        """
+        return self.process(value, **kwargs)
@@ -21,6 +21,8 @@ from .agent.operations import (
     AgentProcessorOperationSchema,
     AgentProcessorFilterOperatorSchema,
     AgentProcessorMapOperatorSchema,
+    AgentProcessorMapBatchOperatorSchema,
+    AgentProcessorFilterBatchOperatorSchema,
 )
 from .webview import (
     WebViewSpecSchema,
@@ -63,6 +65,8 @@ __all__ = [
     "AgentProcessorOperationSchema",
     "AgentProcessorFilterOperatorSchema",
     "AgentProcessorMapOperatorSchema",
+    "AgentProcessorMapBatchOperatorSchema",
+    "AgentProcessorFilterBatchOperatorSchema",
     "WebViewSpecSchema",
     "WebViewResponseSpecSchema",
     "WebViewRequestSpecSchema",
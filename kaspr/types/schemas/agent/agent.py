@@ -2,7 +2,7 @@ from kaspr.types.schemas.base import BaseSchema
 from kaspr.types.schemas.agent.input import AgentInputSpecSchema
 from kaspr.types.schemas.agent.output import AgentOutputSpecSchema
 from kaspr.types.schemas.agent.processor import AgentProcessorSpecSchema
-from marshmallow import fields
+from marshmallow import fields, validate
 from kaspr.types.models import AgentSpec
 
 
@@ -14,6 +14,12 @@ class AgentSpecSchema(BaseSchema):
     isolated_partitions = fields.Bool(
         data_key="isolated_partitions", allow_none=True, load_default=None
     )
+    concurrency = fields.Int(
+        data_key="concurrency",
+        allow_none=True,
+        load_default=None,
+        validate=validate.Range(min=1),
+    )
     input = fields.Nested(AgentInputSpecSchema(), data_key="input", required=True)
     output = fields.Nested(
         AgentOutputSpecSchema(), data_key="output", allow_none=True, load_default=None
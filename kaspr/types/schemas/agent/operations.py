@@ -1,22 +1,57 @@
 from kaspr.types.schemas.base import BaseSchema
-from marshmallow import fields
+from marshmallow import fields, validate, validates_schema
 from kaspr.types.models import (
     AgentProcessorOperation,
     AgentProcessorFilterOperator,
     AgentProcessorMapOperator,
+    AgentProcessorMapBatchOperator,
+    AgentProcessorFilterBatchOperator,
 )
+from kaspr.types.models.executors import EXECUTOR_PROCESS, EXECUTOR_THREAD
 from kaspr.types.schemas.pycode import PyCodeSchema
 from kaspr.types.schemas.tableref import TableRefSpecSchema
+from kaspr.utils.selectors import COMPARISONS
 
 
 class AgentProcessorFilterOperatorSchema(PyCodeSchema):
     __model__ = AgentProcessorFilterOperator
 
+    python = fields.String(data_key="python", allow_none=False, load_default="")
+    field = fields.String(data_key="field", allow_none=True, load_default=None)
+    op = fields.String(
+        data_key="op",
+        allow_none=True,
+        load_default=None,
+        validate=validate.OneOf(list(COMPARISONS)),
+    )
+    operand = fields.Raw(data_key="value", allow_none=True, load_default=None)
+
+    @validates_schema
+    def validate_filter(self, data, **kwargs):
+        if data.get("field") and data.get("python"):
+            raise ValueError(
+                "Only one of 'python' or 'field' can be provided, but not both."
+            )
+        if not data.get("field") and not data.get("python"):
+            raise ValueError("One of 'python' or 'field' must be provided.")
+
 
 class AgentProcessorMapOperatorSchema(PyCodeSchema):
     __model__ = AgentProcessorMapOperator
 
 
+class AgentProcessorMapBatchOperatorSchema(PyCodeSchema):
+    __model__ = AgentProcessorMapBatchOperator
+
+    columnar = fields.Bool(data_key="columnar", allow_none=True, load_default=None)
+
+
+class AgentProcessorFilterBatchOperatorSchema(PyCodeSchema):
+    __model__ = AgentProcessorFilterBatchOperator
+
+    columnar = fields.Bool(data_key="columnar", allow_none=True, load_default=None)
+
+
 class AgentProcessorOperationSchema(BaseSchema):
     __model__ = AgentProcessorOperation
 
@@ -33,6 +68,18 @@ class AgentProcessorOperationSchema(BaseSchema):
         allow_none=True,
         load_default=None,
     )
+    map_batch = fields.Nested(
+        AgentProcessorMapBatchOperatorSchema(),
+        data_key="map_batch",
+        allow_none=True,
+        load_default=None,
+    )
+    filter_batch = fields.Nested(
+        AgentProcessorFilterBatchOperatorSchema(),
+        data_key="filter_batch",
+        allow_none=True,
+        load_default=None,
+    )
     table_refs = fields.List(
         fields.Nested(
             TableRefSpecSchema(), required=True
@@ -41,3 +88,21 @@ class AgentProcessorOperationSchema(BaseSchema):
         allow_none=False,
         load_default=list,
     )    
+    executor = fields.String(
+        data_key="executor",
+        allow_none=True,
+        load_default=None,
+        validate=validate.OneOf([EXECUTOR_PROCESS, EXECUTOR_THREAD]),
+    )
+    max_concurrency = fields.Int(
+        data_key="max_concurrency",
+        allow_none=True,
+        load_default=None,
+        validate=validate.Range(min=1),
+    )
+
+    @validates_schema
+    def validate_executor(self, data, **kwargs):
+        filter = data.get("filter")
+        if data.get("executor") and filter is not None and filter.field:
+            raise ValueError("Field comparisons cannot set an 'executor'.")
@@ -1,4 +1,3 @@
-import yaml
 from marshmallow import fields
 from kaspr.types.schemas.base import BaseSchema
 from kaspr.types.schemas.agent.agent import AgentSpecSchema
@@ -8,6 +7,7 @@ from kaspr.types.schemas.join import JoinSpecSchema
 from kaspr.types.schemas.task import TaskSpecSchema
 from kaspr.types.models import AppSpec
 from kaspr.types import KasprAppT
+from kaspr.utils.speccache import load_yaml
 
 
 class AppSpecSchema(BaseSchema):
@@ -51,4 +51,4 @@ class AppSpecSchema(BaseSchema):
     @classmethod
     def from_file(cls, file, app: KasprAppT) -> AppSpec:
         """Load an AppSpec from a file."""
-        return AppSpecSchema(context={"app": app}).load(yaml.safe_load(file))
+        return AppSpecSchema(context={"app": app}).load(load_yaml(file))
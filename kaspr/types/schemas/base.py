@@ -1,6 +1,7 @@
 from typing import Any, Dict, Optional
 from marshmallow import INCLUDE, EXCLUDE, Schema, post_load, pre_load
 from kaspr.types.models import UnknownModel
+from kaspr.utils import speccache
 
 __all__ = [
     "BaseSchema",
@@ -36,4 +37,6 @@ class BaseSchema(Schema):
             data_list = data.get("objects", [{}])
             # guard against empty return list of a valid results return
             data = data_list[0] if len(data_list) != 0 else {}
-        return self.__model__(**data, **self.context)
\ No newline at end of file
+        model = self.__model__(**data, **self.context)
+        speccache.record_model(model, data)
+        return model
\ No newline at end of file
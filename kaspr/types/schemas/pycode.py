@@ -1,6 +1,7 @@
 from kaspr.types.schemas.base import BaseSchema
 from marshmallow import fields
 from kaspr.types.models import PyCode
+from kaspr.utils import speccache
 
 class PyCodeSchema(BaseSchema):
     __model__ = PyCode
@@ -11,4 +12,8 @@ class PyCodeSchema(BaseSchema):
     @classmethod
     def default(cls):
         """Return the a default instance of PyCode."""
-        return PyCode.default()
\ No newline at end of file
+        code = PyCode.default()
+        speccache.record_model(
+            code, {"python": code.python, "entrypoint": code.entrypoint}
+        )
+        return code
\ No newline at end of file
@@ -1,5 +1,6 @@
 from typing import Dict
-from marshmallow import fields, validates_schema
+from marshmallow import ValidationError, fields, validates_schema
+from kaspr.utils.selectors import validate_selection
 from kaspr.types.schemas.base import BaseSchema
 from kaspr.types.models.topicout import TopicOutSpec
 from kaspr.types.schemas.topicselector import (
@@ -12,6 +13,23 @@ from kaspr.types.schemas.topicselector import (
 )
 
 
+def _validate_field(selection) -> None:
+    try:
+        validate_selection(selection)
+    except ValueError as exc:
+        raise ValidationError(str(exc)) from exc
+
+
+def _field_selection(data_key: str) -> fields.Raw:
+    """Field path or projection, see :mod:`kaspr.utils.selectors`."""
+    return fields.Raw(
+        data_key=data_key,
+        allow_none=True,
+        load_default=None,
+        validate=_validate_field,
+    )
+
+
 class TopicOutSpecSchema(BaseSchema):
     __model__ = TopicOutSpec
 
@@ -59,6 +77,10 @@ class TopicOutSpecSchema(BaseSchema):
         allow_none=True,
         load_default=None,
     )
+    key_field = _field_selection("key_field")
+    value_field = _field_selection("value_field")
+    partition_field = _field_selection("partition_field")
+    headers_field = _field_selection("headers_field")
 
     @validates_schema
     def validate_name(self, data: Dict, **kwargs):
@@ -68,3 +90,12 @@ class TopicOutSpecSchema(BaseSchema):
             )
         if not data.get("name") and not data.get("name_selector"):
             raise ValueError("One of 'name' or 'name_selector' must be provided.")
+
+    @validates_schema
+    def validate_fields(self, data: Dict, **kwargs):
+        for kind in ("key", "value", "partition", "headers"):
+            if data.get(f"{kind}_selector") and data.get(f"{kind}_field"):
+                raise ValueError(
+                    f"Only one of '{kind}_selector' or '{kind}_field' can be "
+                    "provided, but not both."
+                )
@@ -1,11 +1,12 @@
 from kaspr.types.schemas.base import BaseSchema
-from marshmallow import fields
+from marshmallow import fields, validate
 from kaspr.types.models.webview import (
     WebViewProcessorOperation,
     WebViewProcessorTopicSendOperator,
     WebViewProcessorMapOperator,
     WebViewProcessorFilterOperator
 )
+from kaspr.types.models.executors import EXECUTOR_THREAD
 from kaspr.types.schemas.pycode import PyCodeSchema
 from kaspr.types.schemas.topicout import TopicOutSpecSchema
 from kaspr.types.schemas.tableref import TableRefSpecSchema
@@ -50,4 +51,16 @@ class WebViewProcessorOperationSchema(BaseSchema):
         data_key="tables",
         allow_none=False,
         load_default=list,
-    )
\ No newline at end of file
+    )
+    executor = fields.String(
+        data_key="executor",
+        allow_none=True,
+        load_default=None,
+        validate=validate.OneOf([EXECUTOR_THREAD]),
+    )
+    max_concurrency = fields.Int(
+        data_key="max_concurrency",
+        allow_none=True,
+        load_default=None,
+        validate=validate.Range(min=1),
+    )
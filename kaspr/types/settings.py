@@ -2,7 +2,6 @@ import socket
 import re
 import random
 import os
-import psutil
 import math
 import ssl
 from pathlib import Path
@@ -54,7 +53,13 @@ def _subenv(input: str):
 
 def _getmem():
     """Return total available memory (RAM) in bytes"""
-    return psutil.virtual_memory().total
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        # Not available on this platform, psutil knows another way.
+        import psutil
+
+        return psutil.virtual_memory().total
 
 
 # ------------------------------------------------
@@ -191,6 +196,22 @@ STREAM_RECOVERY_DELAY = int(_getenv("STREAM_RECOVERY_DELAY", 10.0))
 #: are idempotent you can disable it using this setting.
 STREAM_WAIT_EMPTY = bool(_getenv("STREAM_WAIT_EMPTY", True))
 
+#: Maximum number of sends to outputs with ``ack: true`` an agent keeps in
+#: flight. Events are acked, and their offsets committed, once their sends
+#: are delivered; the agent waits for deliveries when the window is full.
+AGENT_OUTPUT_MAX_IN_FLIGHT = int(_getenv("AGENT_OUTPUT_MAX_IN_FLIGHT", 1000))
+
+#: Number of worker processes used by each processor that has operations
+#: with ``executor: process``. Defaults to the number of CPUs.
+PROCESSOR_PROCESS_POOL_SIZE = int(
+    _getenv("PROCESSOR_PROCESS_POOL_SIZE", os.cpu_count() or 1)
+)
+
+#: Number of threads shared by all operations with ``executor: thread``.
+PROCESSOR_THREAD_POOL_SIZE = int(
+    _getenv("PROCESSOR_THREAD_POOL_SIZE", min(32, (os.cpu_count() or 1) + 4))
+)
+
 #: RocksDB configirations
 #: (https://github.com/EighteenZi/rocksdb_wiki/blob/master/Memory-usage-in-RocksDB.md)
 # ------------------------------------------------
@@ -265,6 +286,45 @@ SCHEDULER_DISPATCHER_CHECKPOINT_INTERVAL = float(
     _getenv("SCHEDULER_DISPATCHER_CHECKPOINT_INTERVAL", 10.0)
 )
 
+#: How the dispatcher finds scheduled seconds in the timetable when the
+#: occupancy index is disabled: ``range`` seeks a store iterator to the
+#: next second holding messages, ``probe`` looks up every second.
+#: ``range`` needs a RocksDB store and falls back to ``probe`` without one.
+SCHEDULER_DISPATCHER_SCAN_MODE = _getenv("SCHEDULER_DISPATCHER_SCAN_MODE", "range")
+
+#: Maximum number of message slots of a second the dispatcher reads from
+#: the timetable in one multi-get.
+SCHEDULER_DISPATCHER_PREFETCH_SLOTS = int(
+    _getenv("SCHEDULER_DISPATCHER_PREFETCH_SLOTS", 1000)
+)
+
+#: Maximum number of due messages the dispatcher takes from its queue and
+#: sends as one batch, grouped by destination topic. Batches hold what is
+#: queued; the dispatcher never waits for a batch to fill.
+SCHEDULER_DISPATCHER_DELIVERY_BATCH_SIZE = int(
+    _getenv("SCHEDULER_DISPATCHER_DELIVERY_BATCH_SIZE", 256)
+)
+
+#: Maximum number of scheduled messages sent by a dispatcher and not yet
+#: acknowledged by the broker.
+SCHEDULER_DISPATCHER_MAX_IN_FLIGHT = int(
+    _getenv("SCHEDULER_DISPATCHER_MAX_IN_FLIGHT", 1000)
+)
+
+#: Keep an index of the seconds holding messages in each timetable
+#: partition, so the dispatcher and janitor skip empty minutes and hours.
+#: The index is checked against the timetable, and repaired, whenever a
+#: partition is recovered.
+SCHEDULER_OCCUPANCY_INDEX_ENABLED = bool(
+    _getenv("SCHEDULER_OCCUPANCY_INDEX_ENABLED", True)
+)
+
+#: Layout of timetable keys: ``string`` (e.g. ``"1707171828-3"``) or
+#: ``binary``, a compact layout whose byte order is time and sequence
+#: order. Legacy ``string`` keys are rewritten when a partition recovers
+#: with ``binary``; kaspr versions without ``binary`` cannot read them.
+SCHEDULER_TIMETABLE_KEY_FORMAT = _getenv("SCHEDULER_TIMETABLE_KEY_FORMAT", "string")
+
 #: How often we checkpoint the janitor's location in the timetable.
 SCHEDULER_JANITOR_CHECKPOINT_INTERVAL = float(
     _getenv("SCHEDULER_JANITOR_CHECKPOINT_INTERVAL", 10.0)
@@ -326,6 +386,24 @@ VALUE_SERIALIZER = _getenv("VALUE_SERIALIZER", "json")
 # Set this to False if you don't want to allow defining stream processors with configuration.
 APP_BUILDER_ENABLED = bool(_getenv("APP_BUILDER_ENABLED", True))
 
+#: Persist compiled PyCode from definition files under the table directory,
+#: so restarted workers load bytecode instead of compiling it again.
+CODE_CACHE_ENABLED = bool(_getenv("CODE_CACHE_ENABLED", True))
+
+#: Keep validated definition files under the table directory, keyed by
+#: content hash, so unchanged files are not parsed and validated again.
+DEFINITIONS_CACHE_ENABLED = bool(_getenv("DEFINITIONS_CACHE_ENABLED", True))
+
+#: Run an agent reading a join's output channel directly on each joined
+#: value, when it is the only agent reading that channel, instead of
+#: queueing values on the channel for it.
+CHANNEL_FUSION_ENABLED = bool(_getenv("CHANNEL_FUSION_ENABLED", True))
+
+#: Seconds between checks for changed definition files. Changes to the
+#: processors of agents, webviews and tasks are then applied without
+#: restarting the worker. Set to 0 to disable.
+DEFINITIONS_RELOAD_INTERVAL = float(_getenv("DEFINITIONS_RELOAD_INTERVAL", 0.0))
+
 #: Path to app builder class, used as default for :setting:`AppBuilder`.
 APP_BUILDER_TYPE = "kaspr.core.builder.AppBuilder"
 
@@ -367,6 +445,10 @@ class CustomSettings(Settings):
     stream_recovery_delay: float = STREAM_RECOVERY_DELAY
     stream_wait_empty: bool = STREAM_WAIT_EMPTY
 
+    agent_output_max_in_flight: int = AGENT_OUTPUT_MAX_IN_FLIGHT
+    processor_process_pool_size: int = PROCESSOR_PROCESS_POOL_SIZE
+    processor_thread_pool_size: int = PROCESSOR_THREAD_POOL_SIZE
+
     store_rocksdb_write_buffer_size: int = STORE_ROCKSDB_WRITE_BUFFER_SIZE
     store_rocksdb_max_write_buffer_number: int = STORE_ROCKSDB_MAX_WRITE_BUFFER_NUMBER
     store_rocksdb_target_file_size_base: int = STORE_ROCKSDB_TARGET_FILE_SIZE_BASE
@@ -387,6 +469,12 @@ class CustomSettings(Settings):
         SCHEDULER_DISPATCHER_DEFAULT_CHECKPOINT_LOOKBACK_DAYS
     )
     scheduler_dispatcher_checkpoint_interval: float = SCHEDULER_DISPATCHER_CHECKPOINT_INTERVAL
+    scheduler_dispatcher_scan_mode: str = SCHEDULER_DISPATCHER_SCAN_MODE
+    scheduler_dispatcher_prefetch_slots: int = SCHEDULER_DISPATCHER_PREFETCH_SLOTS
+    scheduler_dispatcher_delivery_batch_size: int = SCHEDULER_DISPATCHER_DELIVERY_BATCH_SIZE
+    scheduler_dispatcher_max_in_flight: int = SCHEDULER_DISPATCHER_MAX_IN_FLIGHT
+    scheduler_timetable_key_format: str = SCHEDULER_TIMETABLE_KEY_FORMAT
+    scheduler_occupancy_index_enabled: bool = SCHEDULER_OCCUPANCY_INDEX_ENABLED
     scheduler_janitor_checkpoint_interval: float = SCHEDULER_JANITOR_CHECKPOINT_INTERVAL
     scheduler_janitor_clean_interval_seconds: float = SCHEDULER_JANITOR_CLEAN_INTERVAL_SECONDS
     scheduler_janitor_highwater_offset_seconds: float = SCHEDULER_JANITOR_HIGHWATER_OFFSET_SECONDS
@@ -404,6 +492,10 @@ class CustomSettings(Settings):
     web_metrics_base_path: str = WEB_METRICS_BASE_PATH
 
     app_builder_enabled: bool = APP_BUILDER_ENABLED
+    code_cache_enabled: bool = CODE_CACHE_ENABLED
+    definitions_cache_enabled: bool = DEFINITIONS_CACHE_ENABLED
+    channel_fusion_enabled: bool = CHANNEL_FUSION_ENABLED
+    definitions_reload_interval: float = DEFINITIONS_RELOAD_INTERVAL
 
     _worker_name: str = None
     _kafka_credentials: CredentialsT = None
@@ -435,6 +527,9 @@ class CustomSettings(Settings):
         stream_buffer_maxsize: int = None,
         stream_recovery_delay: float = None,
         stream_wait_empty: bool = None,
+        agent_output_max_in_flight: int = None,
+        processor_process_pool_size: int = None,
+        processor_thread_pool_size: int = None,
         table_dir: str = None,
         store_rocksdb_write_buffer_size: int = None,
         store_rocksdb_max_write_buffer_number: int = None,
@@ -449,6 +544,12 @@ class CustomSettings(Settings):
         scheduler_checkpoint_save_interval_seconds: Seconds = None,
         scheduler_dispatcher_default_checkpoint_lookback_days: int = None,
         scheduler_dispatcher_checkpoint_interval: float = None,
+        scheduler_dispatcher_scan_mode: str = None,
+        scheduler_dispatcher_prefetch_slots: int = None,
+        scheduler_dispatcher_delivery_batch_size: int = None,
+        scheduler_dispatcher_max_in_flight: int = None,
+        scheduler_timetable_key_format: str = None,
+        scheduler_occupancy_index_enabled: bool = None,
         scheduler_janitor_checkpoint_interval: float = None,
         scheduler_janitor_clean_interval_seconds: Seconds = None,
         scheduler_janitor_highwater_offset_seconds: Seconds = None,
@@ -464,6 +565,10 @@ class CustomSettings(Settings):
         value_serializer: str = None,
         definitions_dir: str = None,
         app_builder_enabled: bool = None,
+        code_cache_enabled: bool = None,
+        definitions_cache_enabled: bool = None,
+        channel_fusion_enabled: bool = None,
+        definitions_reload_interval: float = None,
         canonical_url: Union[str, URL] = None,
         AppBuilder: SymbolArg[Type[AppBuilderT]] = None,
         **kwargs,
@@ -529,6 +634,15 @@ class CustomSettings(Settings):
         if stream_wait_empty is not None:
             self.stream_wait_empty = stream_wait_empty
 
+        if agent_output_max_in_flight is not None:
+            self.agent_output_max_in_flight = agent_output_max_in_flight
+
+        if processor_process_pool_size is not None:
+            self.processor_process_pool_size = processor_process_pool_size
+
+        if processor_thread_pool_size is not None:
+            self.processor_thread_pool_size = processor_thread_pool_size
+
         self.kafka_credentials = self._prepare_kafka_credentials()
 
         if table_dir is not None:
@@ -579,6 +693,18 @@ class CustomSettings(Settings):
         if app_builder_enabled is not None:
             self.app_builder_enabled = app_builder_enabled
 
+        if code_cache_enabled is not None:
+            self.code_cache_enabled = code_cache_enabled
+
+        if definitions_cache_enabled is not None:
+            self.definitions_cache_enabled = definitions_cache_enabled
+
+        if channel_fusion_enabled is not None:
+            self.channel_fusion_enabled = channel_fusion_enabled
+
+        if definitions_reload_interval is not None:
+            self.definitions_reload_interval = float(definitions_reload_interval)
+
         if worker_ordinal_number is not None:
             self.worker_ordinal_number = int(worker_ordinal_number)
 
@@ -640,6 +766,26 @@ class CustomSettings(Settings):
                 scheduler_dispatcher_checkpoint_interval
             )
 
+        if scheduler_dispatcher_scan_mode is not None:
+            self.scheduler_dispatcher_scan_mode = scheduler_dispatcher_scan_mode
+
+        if scheduler_dispatcher_prefetch_slots is not None:
+            self.scheduler_dispatcher_prefetch_slots = scheduler_dispatcher_prefetch_slots
+
+        if scheduler_dispatcher_delivery_batch_size is not None:
+            self.scheduler_dispatcher_delivery_batch_size = (
+                scheduler_dispatcher_delivery_batch_size
+            )
+
+        if scheduler_dispatcher_max_in_flight is not None:
+            self.scheduler_dispatcher_max_in_flight = scheduler_dispatcher_max_in_flight
+
+        if scheduler_timetable_key_format is not None:
+            self.scheduler_timetable_key_format = scheduler_timetable_key_format
+
+        if scheduler_occupancy_index_enabled is not None:
+            self.scheduler_occupancy_index_enabled = scheduler_occupancy_index_enabled
+
         if scheduler_janitor_checkpoint_interval is not None:
             self.scheduler_janitor_checkpoint_interval = want_seconds(
                 scheduler_janitor_checkpoint_interval
@@ -805,11 +951,15 @@ class CustomSettings(Settings):
 
     @property
     def AppBuilder(self) -> Type[AppBuilderT]:
+        # Resolved on first use, so the builder and the spec models it
+        # imports are not loaded when the app builder is disabled.
+        if not isinstance(self._AppBuilder, type):
+            self._AppBuilder = symbol_by_name(self._AppBuilder)
         return self._AppBuilder
 
     @AppBuilder.setter
     def AppBuilder(self, AppBuilder: SymbolArg[Type[AppBuilderT]]) -> None:
-        self._AppBuilder = symbol_by_name(AppBuilder)
+        self._AppBuilder = AppBuilder
 
     @property
     def canonical_url(self) -> URL:
@@ -0,0 +1,129 @@
+"""Process-wide cache of compiled PyCode sources.
+
+Code objects are kept in memory keyed by the hash of their source. When a
+cache directory is set (see :func:`set_code_cache_dir`), they are also
+written there with :mod:`marshal`, so a restarted worker loads bytecode
+instead of compiling every block again. Files are read lazily, the first
+time a source is compiled in the process.
+"""
+
+import hashlib
+import marshal
+import sys
+from importlib.util import MAGIC_NUMBER
+from pathlib import Path
+from time import monotonic
+from types import CodeType
+from typing import Dict, Optional
+from kaspr.utils.diskcache import write_cache_file
+
+__all__ = [
+    "CodeCacheStats",
+    "source_hash",
+    "compile_source",
+    "clear_code_cache",
+    "set_code_cache_dir",
+    "stats",
+]
+
+
+class CodeCacheStats:
+    """Counters of how compiled sources were obtained."""
+
+    __slots__ = ("hits", "disk_hits", "misses", "seconds")
+
+    def __init__(self) -> None:
+        #: Sources found in memory.
+        self.hits = 0
+        #: Sources loaded from the cache directory.
+        self.disk_hits = 0
+        #: Sources compiled.
+        self.misses = 0
+        #: Time spent loading and compiling, in seconds.
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}: hits={self.hits} "
+            f"disk_hits={self.disk_hits} misses={self.misses} "
+            f"seconds={self.seconds:.3f}>"
+        )
+
+
+#: Code objects by source hash, shared by all PyCode blocks.
+_code_cache: Dict[str, CodeType] = {}
+
+#: Directory bytecode is written to, if any.
+_cache_dir: Optional[Path] = None
+
+stats = CodeCacheStats()
+
+
+def source_hash(source: str) -> str:
+    """Return the content hash used to key compiled ``source``."""
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def set_code_cache_dir(directory: Optional[Path]) -> None:
+    """Persist compiled code in ``directory``, or only in memory if None."""
+    global _cache_dir
+    if directory is not None:
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            directory = None
+    _cache_dir = directory
+
+
+def _cache_path(key: str) -> Path:
+    # The cache tag (e.g. cpython-312) keeps bytecode of different
+    # interpreters apart; the magic number is checked when loading.
+    return _cache_dir / f"{key}.{sys.implementation.cache_tag}.pyc"
+
+
+def _load(key: str) -> Optional[CodeType]:
+    try:
+        data = _cache_path(key).read_bytes()
+    except OSError:
+        return None
+    if not data.startswith(MAGIC_NUMBER):
+        return None
+    try:
+        code = marshal.loads(data[len(MAGIC_NUMBER) :])
+    except (EOFError, ValueError, TypeError):
+        return None
+    return code if isinstance(code, CodeType) else None
+
+
+def _dump(key: str, code: CodeType) -> None:
+    write_cache_file(_cache_path(key), MAGIC_NUMBER + marshal.dumps(code))
+
+
+def compile_source(source: str) -> CodeType:
+    """Compile ``source``, reusing the code object of identical source.
+
+    Code objects are immutable, so blocks with the same source can share
+    one. Each block still executes it in its own scope.
+    """
+    key = source_hash(source)
+    code = _code_cache.get(key)
+    if code is not None:
+        stats.hits += 1
+        return code
+    started = monotonic()
+    code = _load(key) if _cache_dir is not None else None
+    if code is not None:
+        stats.disk_hits += 1
+    else:
+        code = compile(source, "<string>", "exec")
+        stats.misses += 1
+        if _cache_dir is not None:
+            _dump(key, code)
+    stats.seconds += monotonic() - started
+    _code_cache[key] = code
+    return code
+
+
+def clear_code_cache() -> None:
+    """Drop all cached code objects held in memory."""
+    _code_cache.clear()
@@ -0,0 +1,104 @@
+"""Columnar view over a batch of records."""
+
+from typing import Any, Dict, Iterator, List, Mapping, Sequence, Set
+from faust.exceptions import ImproperlyConfigured
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+__all__ = ["ColumnarBatch", "true_indices"]
+
+
+class ColumnarBatch:
+    """Batch of mapping records exposed as NumPy columns.
+
+    Columns are converted lazily: ``batch["amount"]`` builds an array from
+    the records the first time it is read and caches it. Assigning a column
+    (``batch["score"] = scores``) replaces or adds it for every row.
+
+    :meth:`to_records` returns the original record list when no column was
+    assigned. Otherwise only the assigned columns are written back into the
+    record mappings, in place, so values are never re-built from scratch.
+    """
+
+    __slots__ = ("_records", "_columns", "_assigned", "_names")
+
+    def __init__(self, records: Sequence[Mapping[str, Any]]) -> None:
+        if numpy is None:
+            raise ImproperlyConfigured(
+                "Columnar batches require `pip install numpy`."
+            )
+        self._records = records
+        self._columns: Dict[str, Any] = {}
+        self._assigned: Set[str] = set()
+        self._names: List[str] = None
+
+    @property
+    def columns(self) -> List[str]:
+        """Column names, in the order they first appear in the records."""
+        if self._names is None:
+            names = {}
+            for record in self._records:
+                names.update(dict.fromkeys(record))
+            names.update(dict.fromkeys(self._assigned))
+            self._names = list(names)
+        return self._names
+
+    def __getitem__(self, name: str) -> Any:
+        column = self._columns.get(name)
+        if column is None:
+            column = numpy.asarray([record.get(name) for record in self._records])
+            self._columns[name] = column
+        return column
+
+    def __setitem__(self, name: str, values: Any) -> None:
+        column = numpy.asarray(values)
+        if column.shape[:1] != (len(self._records),):
+            raise ValueError(
+                f"Column '{name}' must have one value per record "
+                f"(expected {len(self._records)}, got {column.shape[:1]})."
+            )
+        self._columns[name] = column
+        self._assigned.add(name)
+        if self._names is not None and name not in self._names:
+            self._names.append(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns or name in self.columns
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[Mapping[str, Any]]:
+        return iter(self.to_records())
+
+    def take(self, indices: Sequence[int]) -> "ColumnarBatch":
+        """Return a batch with only the rows at ``indices``."""
+        batch = type(self)([self._records[i] for i in indices])
+        indices = numpy.asarray(indices, dtype=numpy.intp)
+        for name, column in self._columns.items():
+            batch._columns[name] = column[indices]
+        batch._assigned = set(self._assigned)
+        return batch
+
+    def to_records(self) -> Sequence[Mapping[str, Any]]:
+        """Return the batch as records, writing back assigned columns."""
+        if self._assigned:
+            records = self._records
+            for name in self._assigned:
+                for record, value in zip(records, self._columns[name].tolist()):
+                    record[name] = value
+            self._assigned.clear()
+        return self._records
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: {len(self)} rows>"
+
+
+def true_indices(mask: Sequence[Any]) -> List[int]:
+    """Return the positions of truthy items in ``mask``."""
+    if numpy is not None and isinstance(mask, numpy.ndarray):
+        return numpy.flatnonzero(mask).tolist()
+    return [i for i, keep in enumerate(mask) if keep]
@@ -0,0 +1,61 @@
+"""Processor context exposed to PyCode as ``context``."""
+
+from contextvars import ContextVar
+from typing import Any, Iterator, MutableMapping
+
+_current_event: ContextVar[Any] = ContextVar("kaspr_current_event", default=None)
+
+
+def current_event() -> Any:
+    """Return the event being processed by the current task."""
+    return _current_event.get()
+
+
+def set_current_event(event: Any) -> None:
+    """Set the event being processed by the current task."""
+    _current_event.set(event)
+
+
+class ProcessorContext(MutableMapping):
+    """Mapping available to PyCode blocks as ``context``.
+
+    Static items (e.g. ``app``) are set once when the processor is prepared,
+    while ``context["event"]`` is read from a context variable. Setting the
+    event for each value is then a single variable assignment rather than a
+    copy of the whole scope, and concurrent tasks sharing the same operators
+    each see their own event.
+
+    Only agents process events: processors of webviews and tasks pass
+    ``with_event=False``, and their context has no ``event`` item.
+    """
+
+    __slots__ = ("_items", "_with_event")
+
+    def __init__(self, *, with_event: bool = True, **items: Any) -> None:
+        self._items = items
+        self._with_event = with_event
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "event" and self._with_event:
+            return _current_event.get()
+        return self._items[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "event" and self._with_event:
+            _current_event.set(value)
+        else:
+            self._items[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._items[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._items
+        if self._with_event:
+            yield "event"
+
+    def __len__(self) -> int:
+        return len(self._items) + self._with_event
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
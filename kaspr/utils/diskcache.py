@@ -0,0 +1,27 @@
+"""Helpers shared by the on-disk caches (see :mod:`kaspr.utils.codecache`
+and :mod:`kaspr.utils.speccache`)."""
+
+import os
+from pathlib import Path
+
+__all__ = ["write_cache_file"]
+
+
+def write_cache_file(path: Path, data: bytes) -> bool:
+    """Write ``data`` to ``path`` atomically, returning True if written.
+
+    The file is written under a temporary name and then renamed, so readers
+    never see a partial file. Caches are an optimization, so a read-only or
+    full disk is not an error: nothing is written and False is returned.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return False
+    return True
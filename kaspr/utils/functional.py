@@ -3,6 +3,7 @@ import math
 from datetime import timedelta
 from inspect import signature, isawaitable, isgenerator, isasyncgen
 from functools import wraps
+from types import CoroutineType
 from datetime import datetime, timezone
 from typing import Optional, Iterator, List, Mapping, Any
 
@@ -168,6 +169,24 @@ def ensure_date(dtstr, format=DEFAULT_DATE_FORMAT):
     """Converts input datetime string to YYYY-MM-DD format"""
     return datetime.fromisoformat(dtstr).strftime(format)
 
+#: Types of common results that are never awaitable, checked before the
+#: slower :func:`~inspect.isawaitable`.
+PLAIN_RESULT_TYPES = frozenset(
+    {bool, int, float, str, bytes, dict, list, tuple, type(None)}
+)
+
+
+def needs_await(res: Any) -> bool:
+    """Return True if ``res`` is awaitable, as :func:`maybe_async` checks.
+
+    Coroutines and common plain values are recognized by their type alone.
+    """
+    res_type = type(res)
+    if res_type is CoroutineType:
+        return True
+    return res_type not in PLAIN_RESULT_TYPES and isawaitable(res)
+
+
 async def maybe_async(res: Any) -> Any:
     """Await future if argument is Awaitable.
 
@@ -0,0 +1,194 @@
+"""Declarative field selectors.
+
+A selector picks data out of a value without PyCode. It is either a dotted
+path, e.g. ``customer.id``, or a projection mapping names to paths, e.g.
+``{"id": "customer.id", "total": "order.total"}``, which selects a dict.
+
+Path segments look up mapping keys; integer segments index sequences, and
+other objects are read by attribute. A missing key or attribute selects
+None, as does any segment after it.
+
+Selectors are compiled once into functions subscripting the value
+directly, e.g. ``value["customer"]["id"]``, so the common case of mappings
+nested in mappings costs no more than the equivalent PyCode. Only values
+that do not subscript that way take the slower, general lookup.
+"""
+
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, List, Union
+from kaspr.utils.codecache import compile_source
+
+__all__ = [
+    "COMPARISONS",
+    "Accessor",
+    "Selection",
+    "compile_comparison",
+    "compile_path",
+    "compile_selection",
+    "parse_path",
+    "validate_selection",
+]
+
+#: A compiled selector.
+Accessor = Callable[[Any], Any]
+
+#: A dotted path, or a mapping of names to dotted paths.
+Selection = Union[str, Dict[str, str]]
+
+Segment = Union[str, int]
+
+#: Comparisons of a selected field against an operand, by name.
+COMPARISONS: Dict[str, str] = {
+    "eq": "selected == operand",
+    "ne": "selected != operand",
+    # A missing field is neither greater nor less than anything.
+    "gt": "selected is not None and selected > operand",
+    "gte": "selected is not None and selected >= operand",
+    "lt": "selected is not None and selected < operand",
+    "lte": "selected is not None and selected <= operand",
+    "in": "contains(selected, operand)",
+    "not_in": "not contains(selected, operand)",
+    "exists": "(selected is not None) is operand",
+}
+
+_ACCESSOR = """
+def accessor(value):
+    try:
+        return value{subscripts}
+    except (LookupError, TypeError):
+        return lookup(value, segments)
+"""
+
+_COMPARISON = """
+def test(value):
+    try:
+        selected = value{subscripts}
+    except (LookupError, TypeError):
+        selected = lookup(value, segments)
+    return {comparison}
+"""
+
+
+def _contains(value: Any, operand: Any) -> bool:
+    try:
+        return value in operand
+    except TypeError:
+        # An unhashable value is not in a set of hashable ones.
+        return False
+
+
+def parse_path(path: str) -> List[Segment]:
+    """Split a dotted path into its segments.
+
+    Raises:
+        ValueError: if the path is empty or has an empty segment.
+    """
+    if not isinstance(path, str) or not path:
+        raise ValueError(f"Invalid field path `{path}`")
+    segments: List[Segment] = []
+    for segment in path.split("."):
+        if not segment:
+            raise ValueError(f"Invalid field path `{path}`")
+        segments.append(int(segment) if segment.isdigit() else segment)
+    return segments
+
+
+def _step(value: Any, segment: Segment) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, Mapping):
+        selected = value.get(segment)
+        if selected is None and isinstance(segment, int):
+            selected = value.get(str(segment))
+        return selected
+    if isinstance(segment, int):
+        if isinstance(value, Sequence):
+            return value[segment] if -len(value) <= segment < len(value) else None
+        return None
+    return getattr(value, segment, None)
+
+
+def _lookup(value: Any, segments: List[Segment]) -> Any:
+    """Select ``segments`` from any value; see the module docstring."""
+    for segment in segments:
+        value = _step(value, segment)
+    return value
+
+
+def _define(
+    template: str, name: str, path: str, scope: Dict[str, Any], **fields: str
+) -> Callable:
+    """Define function ``name`` from ``template``, selecting ``path``."""
+    segments = parse_path(path)
+    # Segments are str or int, so their repr is a literal.
+    subscripts = "".join(f"[{segment!r}]" for segment in segments)
+    source = template.format(subscripts=subscripts, **fields)
+    namespace = {"lookup": _lookup, "segments": segments, **scope}
+    exec(compile_source(source), namespace)
+    return namespace[name]
+
+
+def compile_path(path: str) -> Accessor:
+    """Compile a dotted path into an accessor.
+
+    Raises:
+        ValueError: if the path is invalid.
+    """
+    return _define(_ACCESSOR, "accessor", path, {})
+
+
+def validate_selection(selection: Selection) -> None:
+    """Check that ``selection`` is a valid path or projection.
+
+    Raises:
+        ValueError: if it is not.
+    """
+    if isinstance(selection, Mapping) and selection:
+        for name, path in selection.items():
+            if not isinstance(name, str):
+                raise ValueError(f"Invalid field name `{name}`")
+            parse_path(path)
+    elif isinstance(selection, str):
+        parse_path(selection)
+    else:
+        raise ValueError(f"Invalid field selection `{selection}`")
+
+
+def compile_selection(selection: Selection) -> Accessor:
+    """Compile a path or a projection into an accessor.
+
+    Raises:
+        ValueError: if the selection is neither, or has an invalid path.
+    """
+    if isinstance(selection, str):
+        return compile_path(selection)
+    if isinstance(selection, Mapping) and selection:
+        accessors = [(name, compile_path(path)) for name, path in selection.items()]
+        return lambda value: {name: get(value) for name, get in accessors}
+    raise ValueError(f"Invalid field selection `{selection}`")
+
+
+def compile_comparison(path: str, op: str, operand: Any) -> Callable[[Any], bool]:
+    """Compile a test of the field at ``path`` against ``operand``.
+
+    Raises:
+        ValueError: if the path or comparison is invalid.
+    """
+    if op not in COMPARISONS:
+        raise ValueError(f"Unknown comparison `{op}`")
+    if op in ("in", "not_in"):
+        # Membership tests hash the operand once; unhashable items
+        # (e.g. nested lists) keep it as a list.
+        try:
+            operand = frozenset(operand)
+        except TypeError:
+            operand = list(operand)
+    elif op == "exists":
+        operand = bool(operand)
+    return _define(
+        _COMPARISON,
+        "test",
+        path,
+        {"operand": operand, "contains": _contains},
+        comparison=COMPARISONS[op],
+    )
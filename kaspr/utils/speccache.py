@@ -0,0 +1,173 @@
+"""Cache of validated definition files.
+
+Loading a definition file parses its YAML and runs the result through the
+marshmallow schemas, which validate it and build the spec models. While a
+file is loaded inside :func:`recording`, the schemas report the validated
+arguments each model is built with (see :func:`record_model`). Those are
+written to a cache directory keyed by the hash of the file content, so an
+unchanged file is rebuilt from them on the next start without parsing or
+validating it again.
+"""
+
+import hashlib
+import marshal
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+import yaml
+from mode.utils.imports import symbol_by_name
+from kaspr import __version__
+from kaspr.utils.diskcache import write_cache_file
+
+__all__ = [
+    "SafeLoader",
+    "SpecCache",
+    "load_yaml",
+    "node_for",
+    "recording",
+    "record_model",
+    "rebuild",
+]
+
+#: YAML loader used for definition files, the libyaml one when available.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+#: Bumped when the layout of cached files changes.
+SPEC_CACHE_FORMAT = 1
+
+# A model is stored as ("module:qualname", {argument: value}).
+Node = Tuple[str, Dict[str, Any]]
+
+# Recorded models by id(model). The model is kept with its node so its
+# id cannot be reused by another object while recording.
+Recorded = Dict[int, Tuple[Any, Node]]
+
+_recording: ContextVar[Optional[Recorded]] = ContextVar(
+    "kaspr_spec_recording", default=None
+)
+_symbols: Dict[str, Callable[..., Any]] = {}
+
+
+class _Uncacheable(Exception):
+    """Raised for model arguments that cannot be stored."""
+
+
+def load_yaml(stream: Any) -> Any:
+    """Parse a YAML document with :data:`SafeLoader`."""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+@contextmanager
+def recording() -> Iterator[Recorded]:
+    """Record models built by the schemas in the current context.
+
+    The mapping yielded is keyed by ``id(model)`` and holds the models
+    themselves; see :func:`node_for`.
+    """
+    token = _recording.set({})
+    try:
+        yield _recording.get()
+    finally:
+        _recording.reset(token)
+
+
+def record_model(model: Any, data: Mapping[str, Any]) -> None:
+    """Record the validated arguments ``model`` was built with."""
+    nodes = _recording.get()
+    if nodes is None:
+        return
+    try:
+        arguments = {key: _encode(nodes, value) for key, value in data.items()}
+    except _Uncacheable:
+        # Models containing this one are not recorded either.
+        return
+    cls = type(model)
+    path = f"{cls.__module__}:{cls.__qualname__}"
+    nodes[id(model)] = (model, (path, arguments))
+
+
+def node_for(nodes: Recorded, model: Any) -> Optional[Node]:
+    """Return the recorded node of ``model``, if it could be recorded."""
+    recorded = nodes.get(id(model))
+    if recorded is None or recorded[0] is not model:
+        return None
+    return recorded[1]
+
+
+def _encode(nodes: Recorded, value: Any) -> Any:
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, list):
+        return [_encode(nodes, item) for item in value]
+    if isinstance(value, dict):
+        return {key: _encode(nodes, item) for key, item in value.items()}
+    node = node_for(nodes, value)
+    if node is None:
+        raise _Uncacheable(type(value).__name__)
+    return node
+
+
+def rebuild(node: Node, context: Mapping[str, Any]) -> Any:
+    """Build the models of a recorded ``node`` again.
+
+    ``context`` is passed to every model, as the schemas do.
+    """
+    return _decode(node, context)
+
+
+def _decode(value: Any, context: Mapping[str, Any]) -> Any:
+    if type(value) is tuple:
+        path, arguments = value
+        model = _symbols.get(path)
+        if model is None:
+            model = _symbols[path] = symbol_by_name(path)
+        return model(
+            **{key: _decode(item, context) for key, item in arguments.items()},
+            **context,
+        )
+    if type(value) is list:
+        return [_decode(item, context) for item in value]
+    if type(value) is dict:
+        return {key: _decode(item, context) for key, item in value.items()}
+    return value
+
+
+class SpecCache:
+    """Recorded definition files, stored in ``directory`` with marshal."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(content: bytes) -> str:
+        """Return the cache key of a definition file's content.
+
+        The kaspr version is part of the key, as schemas and models may
+        change between versions.
+        """
+        digest = hashlib.sha256(content)
+        digest.update(f"{SPEC_CACHE_FORMAT}:{__version__}".encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.spec"
+
+    def get(self, key: str) -> Optional[Node]:
+        """Return the recorded node for ``key``, or None."""
+        try:
+            data = self._path(key).read_bytes()
+            node = marshal.loads(data)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return node if type(node) is tuple and len(node) == 2 else None
+
+    def put(self, key: str, node: Node) -> None:
+        """Store the recorded node for ``key``."""
+        try:
+            data = marshal.dumps(node)
+        except ValueError:
+            # Holds a value marshal cannot write; loaded from source instead.
+            return
+        write_cache_file(self._path(key), data)
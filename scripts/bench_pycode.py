@@ -0,0 +1,68 @@
+"""Measure the per-event cost of calling a PyCode operator.
+
+A map operator is driven the way a processor drove it for each event:
+its scope is set with the event's context and the value is processed.
+With the entry point cached this is a function call; without it, every
+call executes the operator's source again.
+
+Usage::
+
+    python scripts/bench_pycode.py [--events N] [--runs N]
+
+To compare two revisions, run the script from a checkout of each, e.g.
+``git worktree add /tmp/kaspr-before <rev>`` and
+``PYTHONPATH=/tmp/kaspr-before python scripts/bench_pycode.py``.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+# The checkout this script is in, unless kaspr is found on PYTHONPATH first.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("KASPR_APP_NAME", "bench-pycode")
+
+SOURCE = """
+import json
+
+PREFIX = "event-"
+
+def transform(value):
+    return {"id": PREFIX + str(value)}
+"""
+
+
+async def run(events: int) -> float:
+    """Process ``events`` values and return the elapsed seconds."""
+    from kaspr.types.models.agent.operations import AgentProcessorMapOperator
+
+    operator = AgentProcessorMapOperator(python=SOURCE, entrypoint="transform")
+    init_scope = {"settings": {}}
+    start = time.perf_counter()
+    for value in range(events):
+        # Per event scope, as processors set it before caching.
+        operator.with_scope({**init_scope, "context": {"event": value}})
+        await operator.process(value)
+    return time.perf_counter() - start
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    asyncio.run(run(1000))  # warm up
+    best = min(asyncio.run(run(args.events)) for _ in range(max(1, args.runs)))
+    print(
+        f"map operator: {best / args.events * 1e6:.2f} us/event "
+        f"(best of {args.runs}, {args.events} events)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Measure the import time of kaspr modules against a budget.
+
+Each run imports the module in a fresh interpreter with ``-X importtime``,
+after one discarded run to write bytecode caches. The median of the runs
+is compared with the budget, and modules that should only be loaded on
+demand are checked not to be imported.
+
+Usage::
+
+    python scripts/importtime.py [module] [--runs N] [--budget-ms MS]
+
+Exits with status 1 if the budget is exceeded or a deferred module is
+imported.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+#: Import time budget by module, in milliseconds.
+BUDGETS = {
+    "kaspr": 50.0,
+    "kaspr.core.app": 700.0,
+}
+
+#: Modules that must not be imported by ``import <module>``.
+DEFERRED = {
+    "kaspr": [
+        "faust.app",
+        "kaspr.core.app",
+        "kaspr.scheduler.manager",
+        "kaspr.types.models",
+        "psutil",
+    ],
+    "kaspr.core.app": [
+        "kaspr.core.builder",
+        "kaspr.scheduler.manager",
+        "kaspr.types.models",
+        "kaspr.types.schemas",
+        "prometheus_client",
+        "psutil",
+    ],
+}
+
+# (self, cumulative) microseconds by module name.
+Timings = Dict[str, Tuple[int, int]]
+
+
+def measure(module: str) -> Timings:
+    """Import ``module`` in a new interpreter and return its timings."""
+    env = dict(os.environ)
+    env.setdefault("KASPR_APP_NAME", "importtime")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        timings[name.strip()] = (int(own), int(cumulative))
+    return timings
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="kaspr.core.app")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    module = args.module
+    budget = args.budget_ms if args.budget_ms is not None else BUDGETS.get(module)
+    measure(module)  # writes bytecode caches
+    runs = [measure(module) for _ in range(max(1, args.runs))]
+    totals = sorted(run[module][1] / 1000 for run in runs)
+    median = statistics.median(totals)
+    print(
+        f"import {module}: median {median:.1f} ms, "
+        f"min {totals[0]:.1f} ms, max {totals[-1]:.1f} ms ({len(runs)} runs)"
+    )
+
+    typical = min(runs, key=lambda run: abs(run[module][1] / 1000 - median))
+    print("slowest modules by self time:")
+    for name, (own, cumulative) in sorted(
+        typical.items(), key=lambda item: item[1][0], reverse=True
+    )[: args.top]:
+        print(f"  {own / 1000:8.1f} ms  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    loaded = [name for name in DEFERRED.get(module, []) if name in typical]
+    if loaded:
+        print(f"deferred modules imported: {', '.join(loaded)}")
+        failed = True
+    if budget is not None:
+        if median > budget:
+            print(f"over budget: {median:.1f} ms > {budget:.1f} ms")
+            failed = True
+        else:
+            print(f"within budget: {median:.1f} ms <= {budget:.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
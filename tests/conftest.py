@@ -0,0 +1,3 @@
+import os
+
+os.environ.setdefault("KASPR_APP_NAME", "kaspr-tests")
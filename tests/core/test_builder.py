@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+
+from kaspr import KasprApp
+from kaspr.core.builder import AppBuilder
+
+AGENT = """
+  - name: {name}
+    input:
+      channel:
+        name: {name}-in
+    processors:
+      pipeline: [op]
+      operations:
+        - name: op
+          map:
+            entrypoint: fn
+            python: |
+              def fn(value):
+                  return {result}
+"""
+
+
+def write(path, first, second):
+    path.write_text(
+        "agents:"
+        + AGENT.format(name="first", result=first)
+        + AGENT.format(name="second", result=second)
+    )
+
+
+def results(builder):
+    return [
+        agent.processors.operations[0].operator.func(None)
+        for agent in builder.agents
+    ]
+
+
+@pytest.fixture
+def definitions(tmp_path):
+    directory = tmp_path / "definitions"
+    directory.mkdir()
+    return directory / "app.yaml"
+
+
+@pytest.fixture
+def builder(tmp_path, definitions):
+    write(definitions, 1, 1)
+    app = KasprApp(
+        id="test-builder",
+        datadir=str(tmp_path / "data"),
+        definitions_dir=str(definitions.parent),
+        code_cache_enabled=False,
+        definitions_cache_enabled=False,
+    )
+    builder = AppBuilder(app)
+    builder.apps
+    return builder
+
+
+@pytest.mark.asyncio
+async def test_reload_applies_all_changes(builder, definitions):
+    write(definitions, 2, 3)
+    assert await builder.reload() is True
+    assert results(builder) == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_reload_applies_nothing_if_any_change_is_invalid(builder, definitions):
+    write(definitions, 2, "(")
+    assert await builder.reload() is False
+    assert results(builder) == [1, 1]
+
+
+TOPICS = """
+agents:
+  - name: orders
+    input:
+      declare: true
+      topic:
+        name: orders
+    output:
+      topics:
+        - name: invoices
+        - name: invoices
+        - name_selector:
+            entrypoint: fn
+            python: |
+              def fn(value):
+                  return value["topic"]
+    processors:
+      pipeline: [op]
+      operations:
+        - name: op
+          map:
+            entrypoint: fn
+            python: |
+              def fn(value):
+                  return value
+"""
+
+
+@pytest.fixture
+def topics_builder(tmp_path, definitions):
+    definitions.write_text(TOPICS)
+    app = KasprApp(
+        id="test-builder-topics",
+        datadir=str(tmp_path / "data"),
+        definitions_dir=str(definitions.parent),
+        code_cache_enabled=False,
+        definitions_cache_enabled=False,
+    )
+    return AppBuilder(app)
+
+
+def test_topics_to_declare_are_inputs_and_static_outputs(topics_builder):
+    topics = topics_builder.topics_to_declare()
+    assert [topic.get_topic_name() for topic in topics] == ["orders", "invoices"]
+
+
+@pytest.mark.asyncio
+async def test_topics_are_declared_in_one_gather(topics_builder):
+    app = topics_builder.app
+    started = []
+    release = asyncio.Event()
+
+    class Topic:
+        def __init__(self, name):
+            self.name = name
+
+        async def maybe_declare(self):
+            started.append(self.name)
+            await release.wait()
+
+    async def maybe_start():
+        pass
+
+    app.producer.maybe_start = maybe_start
+    declaring = asyncio.ensure_future(
+        app.declare_topics([Topic("a"), Topic("b"), Topic("c")])
+    )
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert started == ["a", "b", "c"]
+    release.set()
+    await declaring
+
+
+@pytest.mark.asyncio
+async def test_warm_up_fetches_static_output_metadata(topics_builder):
+    from aiokafka import AIOKafkaProducer
+
+    fetched = []
+
+    class Producer(AIOKafkaProducer):
+        async def partitions_for(self, topic):
+            fetched.append(topic)
+
+    app = topics_builder.app
+    app.producer._producer = None
+    await topics_builder.warm_up_metadata()
+    assert fetched == []
+
+    app.producer._producer = producer = Producer()
+    try:
+        await topics_builder.warm_up_metadata()
+    finally:
+        await producer.stop()
+    assert fetched == ["invoices"]
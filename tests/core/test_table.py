@@ -0,0 +1,56 @@
+import pytest
+
+from kaspr import KasprApp
+
+PARTITION = 0
+
+
+@pytest.fixture
+def table(tmp_path):
+    app = KasprApp(
+        id="test-table",
+        store="rocksdb://",
+        datadir=str(tmp_path),
+        Table="kaspr.core.table.KasprTable",
+    )
+    table = app.Table("values", partitions=1)
+    table.gets = []
+    # no changelog
+    table.on_key_set = lambda *args, **kwargs: None
+    table.on_key_del = lambda *args, **kwargs: None
+    table.on_key_get = lambda key, partition: table.gets.append(key)
+    table.update_for_partition(
+        {f"k{index:02}": {"v": index} for index in range(1, 10)},
+        partition=PARTITION,
+    )
+    return table
+
+
+def test_rocksdb_table_can_seek(table):
+    assert table.can_seek
+
+
+@pytest.mark.parametrize(
+    "start,first",
+    [
+        ("k05", 5),
+        # Not stored: iteration starts at the next key.
+        ("k055", 6),
+        # A prefix of every key.
+        ("k", 1),
+    ],
+)
+def test_keys_from_partition_seeks_to_start(table, start, first):
+    keys = list(table.keys_from_partition(start, PARTITION))
+    assert keys == [f"k{index:02}" for index in range(first, 10)]
+
+
+def test_keys_from_partition_past_last_key_is_empty(table):
+    assert list(table.keys_from_partition("k99", PARTITION)) == []
+
+
+def test_get_many_for_partition_keeps_order_with_missing_keys(table):
+    keys = ["k03", "missing", "k01", "k09"]
+    values = table.get_many_for_partition(keys, PARTITION)
+    assert values == [{"v": 3}, None, {"v": 1}, {"v": 9}]
+    assert table.gets == keys
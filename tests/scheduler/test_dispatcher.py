@@ -0,0 +1,219 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from kaspr import KasprApp
+from kaspr.types import TTLocation, TTMessage
+from kaspr.scheduler.dispatcher import Dispatcher
+
+
+class Checkpoints:
+    def __init__(self):
+        self.saved = None
+
+    def get(self, pt, default=None):
+        return self.saved if self.saved is not None else default
+
+    def update(self, pt, location):
+        self.saved = location
+
+
+class Topic:
+    def __init__(self, sends, fail_after=None):
+        self.sends = sends
+        self.fail_after = fail_after
+
+    async def send(self, key, value, headers, callback):
+        if self.fail_after is not None and len(self.sends) >= self.fail_after:
+            raise RuntimeError("send failed")
+        self.sends.append(callback)
+
+
+def ack(callback, exc=None, offset=1):
+    fut = asyncio.get_event_loop().create_future()
+    if exc is None:
+        fut.set_result(SimpleNamespace(offset=offset))
+    else:
+        fut.set_exception(exc)
+    callback(fut)
+
+
+def location(i):
+    return TTLocation(0, 1800000000 + i // 10, i % 10)
+
+
+def delivery(i, topics=3):
+    return TTMessage(
+        {"k": "k", "v": "v", "h": {"a": "1"}, "__kms": {"d": f"t{i % topics}"}},
+        location(i),
+    )
+
+
+@pytest.fixture()
+def app():
+    app = KasprApp(id="test-dispatcher")
+    app.flow_control.resume()
+    app.conf.scheduler_dispatcher_max_in_flight = 20
+    app.tables.wait_until_recovery_completed = lambda: asyncio.sleep(0)
+    return app
+
+
+def make_dispatcher(app, topic):
+    app.topic = lambda name: topic
+    monitor = SimpleNamespace(
+        on_message_delivered=lambda dispatcher: None,
+        on_dispatcher_resumed=lambda dispatcher: None,
+    )
+    dispatcher = Dispatcher(app=app, partition=0, monitor=monitor)
+    dispatcher.__dict__["checkpoints"] = Checkpoints()
+    dispatcher.crashes = []
+
+    async def crash(exc):
+        dispatcher.crashes.append(exc)
+
+    dispatcher.crash = crash
+    dispatcher.resume()
+    return dispatcher
+
+
+async def put(dispatcher, deliveries):
+    # lets deliver_messages subscribe to the channel first
+    await asyncio.sleep(0)
+    for item in deliveries:
+        dispatcher._pending_delivery_count += 1
+        await dispatcher.pending_deliveries.put(item)
+
+
+def test_ack_delivery_returns_contiguous_run():
+    dispatcher = Dispatcher(app=KasprApp(id="test-ack"), partition=0, monitor=None)
+    for i in range(4):
+        dispatcher.track_delivery(location(i))
+    assert dispatcher.ack_delivery(location(1)) is None
+    assert dispatcher.ack_delivery(location(3)) is None
+    assert dispatcher.ack_delivery(location(0)) == location(1)
+    assert dispatcher.ack_delivery(location(2)) == location(3)
+    assert not dispatcher.unacked
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_never_passes_unacked_delivery(app):
+    sends = []
+    dispatcher = make_dispatcher(app, Topic(sends))
+    task = asyncio.ensure_future(Dispatcher.deliver_messages.fun(dispatcher))
+    total = 500
+    producer = asyncio.ensure_future(
+        put(dispatcher, [delivery(i) for i in range(total)])
+    )
+    checkpoints = dispatcher.checkpoints
+    acked = 0
+    rng = random.Random(25)
+    try:
+        while acked < total:
+            await asyncio.sleep(0.001)
+            assert dispatcher._in_flight <= 20
+            rng.shuffle(sends)
+            count = len(sends) // 2 + 1 if sends else 0
+            for callback in sends[:count]:
+                ack(callback)
+                acked += 1
+                saved = checkpoints.saved
+                assert saved is None or all(
+                    unacked > saved for unacked in dispatcher.unacked
+                )
+            del sends[:count]
+    finally:
+        task.cancel()
+        producer.cancel()
+    assert checkpoints.saved == location(total - 1)
+    assert dispatcher._in_flight == 0
+    assert dispatcher._pending_delivery_count == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_send_releases_window_and_crashes(app):
+    sends = []
+    dispatcher = make_dispatcher(app, Topic(sends))
+    dispatcher.add_future = asyncio.ensure_future
+    task = asyncio.ensure_future(Dispatcher.deliver_messages.fun(dispatcher))
+    await put(dispatcher, [delivery(i, topics=1) for i in range(3)])
+    try:
+        while len(sends) < 3:
+            await asyncio.sleep(0.001)
+        ack(sends[0])
+        ack(sends[1], RuntimeError("broker down"))
+        ack(sends[2])
+        await asyncio.sleep(0)
+    finally:
+        task.cancel()
+    assert dispatcher._in_flight == 0
+    assert [str(exc) for exc in dispatcher.crashes] == ["broker down"]
+    # the failed delivery holds the checkpoint back
+    assert dispatcher.checkpoints.saved == location(0)
+    assert location(1) in dispatcher.unacked
+
+
+@pytest.mark.asyncio
+async def test_send_error_keeps_rest_of_batch_unacked(app):
+    sends = []
+    dispatcher = make_dispatcher(app, Topic(sends, fail_after=2))
+    dispatcher.add_future = asyncio.ensure_future
+    task = asyncio.ensure_future(Dispatcher.deliver_messages.fun(dispatcher))
+    await put(dispatcher, [delivery(i, topics=1) for i in range(5)])
+    await asyncio.wait_for(task, timeout=1)
+    assert dispatcher._in_flight == 2
+    assert len(dispatcher.crashes) == 1
+    for callback in sends:
+        ack(callback)
+    assert dispatcher._in_flight == 0
+    assert dispatcher.checkpoints.saved == location(1)
+    assert dispatcher.unacked == {location(i) for i in range(2, 5)}
+
+
+@pytest.mark.asyncio
+async def test_unconfirmed_delivery_does_not_advance_checkpoint(app):
+    sends = []
+    dispatcher = make_dispatcher(app, Topic(sends))
+    task = asyncio.ensure_future(Dispatcher.deliver_messages.fun(dispatcher))
+    await put(dispatcher, [delivery(i, topics=1) for i in range(2)])
+    try:
+        while len(sends) < 2:
+            await asyncio.sleep(0.001)
+        ack(sends[0], offset=None)
+        ack(sends[1])
+    finally:
+        task.cancel()
+    assert dispatcher.checkpoints.saved is None
+    assert not dispatcher.unacked
+    assert dispatcher._pending_delivery_count == 0
+
+
+@pytest.mark.asyncio
+async def test_restart_after_failed_delivery_advances_checkpoint_again(app):
+    sends = []
+    dispatcher = make_dispatcher(app, Topic(sends))
+    dispatcher.add_future = asyncio.ensure_future
+    task = asyncio.ensure_future(Dispatcher.deliver_messages.fun(dispatcher))
+    await put(dispatcher, [delivery(i, topics=1) for i in range(2)])
+    try:
+        while len(sends) < 2:
+            await asyncio.sleep(0.001)
+        ack(sends[0], RuntimeError("broker down"))
+        ack(sends[1])
+    finally:
+        task.cancel()
+    assert dispatcher.checkpoints.saved is None
+    # Restarted after the crash; the failed message is not due anymore,
+    # e.g. it was canceled meanwhile.
+    del sends[:]
+    task = asyncio.ensure_future(Dispatcher.deliver_messages.fun(dispatcher))
+    await put(dispatcher, [delivery(i, topics=1) for i in range(2, 4)])
+    try:
+        while len(sends) < 2:
+            await asyncio.sleep(0.001)
+        for callback in sends:
+            ack(callback)
+    finally:
+        task.cancel()
+    assert dispatcher.checkpoints.saved == location(3)
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+from kaspr import KasprApp
+from kaspr.types import TTLocation
+from kaspr.scheduler import manager
+from kaspr.scheduler.manager import MessageScheduler
+from kaspr.scheduler.utils import TimetableKeys, TimetableKeyCodec
+
+BASE = 1800000000
+PARTITION = 0
+COUNT = 50
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    app = KasprApp(
+        id="test-migration",
+        store="rocksdb://",
+        datadir=str(tmp_path),
+        Table="kaspr.core.table.KasprTable",
+    )
+    timetable = app.Table("timetable", partitions=1)
+    timetable.key_serializer = TimetableKeyCodec()
+    # no changelog
+    timetable.on_key_set = lambda *args, **kwargs: None
+    timetable.on_key_del = lambda *args, **kwargs: None
+    timetable.on_key_get = lambda *args, **kwargs: None
+    string = TimetableKeys("string")
+    for time_key in range(BASE, BASE + COUNT):
+        timetable.update_for_partition(
+            {
+                string.timekey(time_key): 1,
+                string.message(TTLocation(PARTITION, time_key, 0)): {"v": time_key},
+            },
+            partition=PARTITION,
+        )
+    warnings = []
+    return SimpleNamespace(
+        timetable=timetable,
+        timetable_keys=TimetableKeys("binary"),
+        log=SimpleNamespace(warning=warnings.append, info=lambda message: None),
+        warnings=warnings,
+    )
+
+
+def migrate(scheduler, aborted=lambda: False):
+    return MessageScheduler.migrate_timetable_keys(scheduler, PARTITION, aborted)
+
+
+@pytest.mark.asyncio
+async def test_migration_yields_and_resumes_after_abort(scheduler, monkeypatch):
+    monkeypatch.setattr(manager, "SCAN_BATCH_SIZE", 10)
+    assert await migrate(scheduler, aborted=lambda: True) is None
+    assert await migrate(scheduler) == 2 * COUNT - 9
+    assert await migrate(scheduler) == 0
+    assert scheduler.warnings == []
+    timetable = scheduler.timetable
+    keys = scheduler.timetable_keys
+    for time_key in range(BASE, BASE + COUNT):
+        location = TTLocation(PARTITION, time_key, 0)
+        assert timetable.get_for_partition(
+            keys.message(location), partition=PARTITION
+        ) == {"v": time_key}
+        assert timetable.get_for_partition(
+            keys.timekey(time_key), partition=PARTITION
+        ) == 1
+
+
+@pytest.mark.asyncio
+async def test_rewritten_key_left_by_an_interrupted_migration_is_not_reported(
+    scheduler,
+):
+    location = TTLocation(PARTITION, BASE, 0)
+    scheduler.timetable.update_for_partition(
+        {scheduler.timetable_keys.message(location): {"v": BASE}},
+        partition=PARTITION,
+    )
+    assert await migrate(scheduler) == 2 * COUNT
+    assert scheduler.warnings == []
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from kaspr import KasprApp
+from kaspr.types import TTLocation
+from kaspr.scheduler.occupancy import OccupancyIndex
+from kaspr.scheduler.utils import TimetableKeys, TimetableKeyCodec
+
+BASE = 1800000000
+PARTITION = 0
+
+
+@pytest.fixture(params=["string", "binary"])
+def occupancy(request, tmp_path):
+    app = KasprApp(
+        id="test-occupancy",
+        store="rocksdb://",
+        datadir=str(tmp_path),
+        Table="kaspr.core.table.KasprTable",
+    )
+    timetable = app.Table("timetable", partitions=1)
+    timetable.key_serializer = TimetableKeyCodec()
+    # no changelog
+    timetable.on_key_set = lambda *args, **kwargs: None
+    timetable.on_key_del = lambda *args, **kwargs: None
+    timetable.on_key_get = lambda *args, **kwargs: None
+    return OccupancyIndex(timetable, TimetableKeys(request.param))
+
+
+def schedule(occupancy, time_key):
+    """Write a TimeKey and its message without updating the index."""
+    keys = occupancy.keys
+    occupancy.timetable.update_for_partition(
+        {
+            keys.timekey(time_key): 1,
+            keys.message(TTLocation(PARTITION, time_key, 0)): {"v": 1},
+        },
+        partition=PARTITION,
+    )
+
+
+def walk(occupancy, start, until):
+    found = []
+    time_key = start
+    while True:
+        time_key = occupancy.next_occupied(time_key, until, PARTITION)
+        if time_key is None:
+            return found
+        found.append(time_key)
+        time_key += 1
+
+
+def test_next_occupied_matches_added_seconds(occupancy):
+    rng = random.Random(23)
+    occupied = set()
+    for _ in range(400):
+        time_key = BASE + rng.randrange(3 * 86400)
+        if rng.random() < 0.7:
+            occupancy.add(time_key, PARTITION)
+            occupied.add(time_key)
+        elif occupied:
+            time_key = rng.choice(sorted(occupied))
+            occupancy.discard(time_key, PARTITION)
+            occupied.discard(time_key)
+    ordered = sorted(occupied)
+    for _ in range(300):
+        start = BASE + rng.randrange(-100, 3 * 86400)
+        until = start + rng.randrange(86400)
+        expected = next((t for t in ordered if start <= t <= until), None)
+        assert occupancy.next_occupied(start, until, PARTITION) == expected
+    assert walk(occupancy, BASE, BASE + 3 * 86400) == ordered
+
+
+@pytest.mark.asyncio
+async def test_rebuild_indexes_timekeys_written_without_index(occupancy):
+    seconds = [BASE + 5, BASE + 61, BASE + 7200, BASE + 86400]
+    for time_key in seconds:
+        schedule(occupancy, time_key)
+    assert not occupancy.is_built(PARTITION)
+    assert await occupancy.rebuild(PARTITION) > 0
+    assert occupancy.is_built(PARTITION)
+    assert walk(occupancy, BASE, BASE + 2 * 86400) == seconds
+    # an index in line with its TimeKeys is left as is
+    assert await occupancy.rebuild(PARTITION) == 0
+
+
+@pytest.mark.asyncio
+async def test_rebuild_repairs_built_index(occupancy):
+    schedule(occupancy, BASE + 10)
+    await occupancy.rebuild(PARTITION)
+    # written by a release without the index
+    schedule(occupancy, BASE + 3600)
+    # indexed, but its TimeKey was removed without updating the index
+    occupancy.add(BASE + 7200, PARTITION)
+    assert occupancy.is_built(PARTITION)
+    assert await occupancy.rebuild(PARTITION) == 4
+    assert walk(occupancy, BASE, BASE + 86400) == [BASE + 10, BASE + 3600]
+    assert await occupancy.rebuild(PARTITION) == 0
+
+
+@pytest.mark.asyncio
+async def test_marker_of_other_version_is_not_trusted(occupancy):
+    schedule(occupancy, BASE)
+    await occupancy.rebuild(PARTITION)
+    occupancy.timetable.update_for_partition(
+        {occupancy.keys.occupancy_built(): True}, partition=PARTITION
+    )
+    assert not occupancy.is_built(PARTITION)
+    await occupancy.rebuild(PARTITION)
+    assert occupancy.is_built(PARTITION)
+
+
+@pytest.mark.asyncio
+async def test_aborted_rebuild_leaves_index_unusable(occupancy):
+    for second in range(2500):
+        schedule(occupancy, BASE + second)
+    assert await occupancy.rebuild(PARTITION, aborted=lambda: True) is None
+    assert not occupancy.is_built(PARTITION)
@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from kaspr.types.models.agent.operations import AgentProcessorMapOperator
+from kaspr.types.models.executors import EXECUTOR_THREAD, ThreadExecutor
+from kaspr.types.models.pipeline import Pipeline
+
+SOURCE = """
+import threading
+
+executed_in.append(threading.get_ident())
+
+def fn(value):
+    return value + 1
+"""
+
+
+def operation(python, scope=None, table_refs=None):
+    operator = AgentProcessorMapOperator(python=python, entrypoint="fn")
+    operator.with_scope(scope or {})
+    return SimpleNamespace(
+        name="op", operator=operator, table_refs=table_refs, max_concurrency=None
+    )
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield ThreadExecutor(pool)
+
+
+@pytest.mark.parametrize(
+    "python",
+    [
+        "async def fn(value):\n    return value",
+        "async def fn(value):\n    yield value",
+    ],
+)
+def test_async_entry_points_are_rejected_when_bound(executor, python):
+    with pytest.raises(ValueError, match="is async"):
+        executor.bind(operation(python))
+
+
+@pytest.mark.asyncio
+async def test_entry_point_is_resolved_on_the_loop(executor):
+    executed_in = []
+    op = operation(SOURCE, {"executed_in": executed_in})
+    call = executor.bind(op)
+    assert await call(1) == 2
+    # Resolved again after the scope is cleared, as after an error.
+    op.operator.clear_scope().with_scope({"executed_in": executed_in})
+    assert await call(2) == 3
+    assert executed_in == [threading.get_ident()] * 2
+
+
+def test_operations_with_tables_are_rejected_only_when_given_tables(executor):
+    op = operation("def fn(value):\n    return value", table_refs=["ref"])
+    op.executor = EXECUTOR_THREAD
+    with pytest.raises(ValueError, match="uses tables"):
+        executor.bind(op)
+    executors = {EXECUTOR_THREAD: executor}
+    with pytest.raises(ValueError, match="uses tables"):
+        Pipeline.compile([op], ["op"], executors=executors)
+    # Task pipelines do not pass tables to their operations.
+    assert Pipeline.compile([op], ["op"], with_tables=False, executors=executors)
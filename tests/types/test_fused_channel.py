@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from kaspr.exceptions import KasprProcessingError
+from kaspr.types.models.agent.operations import AgentProcessorMapOperator
+from kaspr.types.models.agent.processor import FusedChannel
+from kaspr.types.models.pipeline import Pipeline, PipelineStage
+
+
+class Output:
+    def __init__(self):
+        self.sent = []
+
+    async def deliver(self, value):
+        self.sent.append(value)
+        return []
+
+
+def fused_channel(python):
+    operator = AgentProcessorMapOperator(python=python, entrypoint="fn")
+    processors = SimpleNamespace(
+        app=SimpleNamespace(
+            conf=SimpleNamespace(
+                stream_buffer_maxsize=2, agent_output_max_in_flight=10
+            ),
+            monitor=SimpleNamespace(on_fused_value=lambda channel, agent: None),
+        ),
+        init_scope={},
+        compiled_pipeline=Pipeline(
+            [PipelineStage("op", operator.with_scope({}), {})]
+        ),
+        output=Output(),
+        errors=[],
+        log=SimpleNamespace(exception=lambda *args: None),
+    )
+    processors.on_error = processors.errors.append
+    return FusedChannel(processors, "joined", "agent")
+
+
+@pytest.mark.asyncio
+async def test_errors_are_isolated_from_the_sender():
+    channel = fused_channel("def fn(value):\n    return 10 // value")
+    await channel.start()
+    try:
+        for value in (1, 0, 2):
+            await channel.send(value=value)
+        for _ in range(10):
+            await asyncio.sleep(0)
+    finally:
+        await channel.stop()
+    assert channel.processors.output.sent == [10, 5]
+    assert [type(e) for e in channel.processors.errors] == [KasprProcessingError]
+
+
+@pytest.mark.asyncio
+async def test_sender_only_waits_for_a_full_queue():
+    channel = fused_channel("def fn(value):\n    return value")
+    # Not started: nothing takes values from the queue.
+    await channel.send(value=1)
+    await channel.send(value=2)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(channel.send(value=3), 0.01)
@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+from kaspr.types.models.agent.output import AgentOutputSpec, OutputWindow
+
+
+class Stream:
+    def __init__(self):
+        self.acked = []
+
+    async def ack(self, event):
+        self.acked.append(event)
+        return True
+
+
+async def settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def futures(count):
+    loop = asyncio.get_running_loop()
+    return [loop.create_future() for _ in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_events_are_acked_once_their_deliveries_complete():
+    stream = Stream()
+    window = OutputWindow(stream, 10)
+    first, second = futures(2)
+    await window.track(["a"], [first])
+    await window.track(["b"], [second])
+    second.set_result(None)
+    await settle()
+    assert stream.acked == ["b"]
+    first.set_result(None)
+    await window.flush()
+    assert stream.acked == ["b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_events_without_deliveries_are_acked_at_once():
+    stream = Stream()
+    await OutputWindow(stream, 10).track(["a"], [])
+    assert stream.acked == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_track_waits_while_the_window_is_full():
+    stream = Stream()
+    window = OutputWindow(stream, 2)
+    pending = futures(3)
+    await window.track(["a"], pending[:2])
+    track = asyncio.ensure_future(window.track(["b"], pending[2:]))
+    await asyncio.sleep(0)
+    assert not track.done()
+    pending[0].set_result(None)
+    await settle()
+    assert not track.done()
+    pending[1].set_result(None)
+    await asyncio.wait_for(track, 1)
+    assert stream.acked == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_cancels_the_reader_and_leaves_events_unacked():
+    stream = Stream()
+    (delivery,) = futures(1)
+    window = None
+
+    async def reader():
+        nonlocal window
+        window = OutputWindow(stream, 10, reader=asyncio.current_task())
+        await window.track(["a"], [delivery])
+        # Waits for an event that never comes.
+        await asyncio.Event().wait()
+
+    task = asyncio.ensure_future(reader())
+    await asyncio.sleep(0)
+    delivery.set_exception(LookupError("broker"))
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(task, 1)
+    assert stream.acked == []
+    with pytest.raises(LookupError):
+        window.raise_for_error()
+    with pytest.raises(LookupError):
+        await window.track(["b"], [])
+
+
+class Route:
+    """Output topic recording the values it is sent."""
+
+    def __init__(self, name, ack=False, predicate=None, release=None):
+        self.name = name
+        self.ack = ack
+        self.predicate_func = predicate
+        self.release = release
+        self.started = []
+        self.deliveries = []
+
+    async def deliver(self, value):
+        self.started.append(value)
+        if self.release is not None:
+            await self.release.wait()
+        delivery = asyncio.get_running_loop().create_future()
+        self.deliveries.append(delivery)
+        return delivery
+
+
+def output(*routes):
+    return AgentOutputSpec(topics_spec=list(routes))
+
+
+@pytest.mark.asyncio
+async def test_sends_to_several_topics_are_concurrent():
+    release = asyncio.Event()
+    first, second = Route("first", release=release), Route("second", release=release)
+    delivering = asyncio.ensure_future(output(first, second).deliver(1))
+    await settle()
+    assert first.started == second.started == [1]
+    release.set()
+    await delivering
+
+
+@pytest.mark.asyncio
+async def test_predicates_apply_per_route_and_acked_deliveries_are_returned():
+    even = Route("even", ack=True, predicate=lambda value: value % 2 == 0)
+    everything = Route("everything", ack=True)
+    unacked = Route("unacked")
+    spec = output(even, everything, unacked)
+
+    deliveries = await spec.deliver(1)
+    assert (even.started, everything.started, unacked.started) == ([], [1], [1])
+    assert deliveries == everything.deliveries
+
+    deliveries = await spec.deliver(2)
+    assert deliveries == [even.deliveries[0], everything.deliveries[1]]
+
+
+@pytest.mark.asyncio
+async def test_single_route_returns_its_delivery_only_if_acked():
+    acked, unacked = Route("acked", ack=True), Route("unacked")
+    assert await output(acked).deliver(1) == acked.deliveries
+    assert await output(unacked).deliver(1) == []
+
+
+def test_routes_resolve_predicate_and_ack_once():
+    first = Route("first", ack=None, predicate=bool)
+    second = Route("second", ack=True)
+    spec = output(first, second)
+    assert spec.routes == [(first, bool, False), (second, None, True)]
+    assert spec.routes is spec.routes
@@ -0,0 +1,297 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from kaspr.exceptions import KasprProcessingError
+from kaspr.types.models.agent.operations import (
+    AgentProcessorFilterBatchOperator,
+    AgentProcessorFilterOperator,
+    AgentProcessorMapBatchOperator,
+    AgentProcessorMapOperator,
+)
+from kaspr.types.models.pipeline import Pipeline, PipelineStage
+from kaspr.types.schemas.agent.operations import AgentProcessorFilterOperatorSchema
+from kaspr.utils.context import ProcessorContext
+
+
+def operator(cls, python):
+    return cls(python=python, entrypoint="fn").with_scope({})
+
+
+def map_op(python):
+    return operator(AgentProcessorMapOperator, python)
+
+
+def filter_op(python):
+    return operator(AgentProcessorFilterOperator, python)
+
+
+def operation(name, op):
+    return SimpleNamespace(name=name, operator=op, tables={}, executor=None)
+
+
+def pipeline(*operators):
+    return Pipeline(
+        PipelineStage(f"op{index}", op, {}) for index, op in enumerate(operators)
+    )
+
+
+FUTURE = """
+import asyncio
+
+def fn(value):
+    future = asyncio.get_event_loop().create_future()
+    future.set_result({result})
+    return future
+"""
+
+
+@pytest.mark.asyncio
+async def test_sync_operator_returning_future_is_awaited():
+    run = pipeline(
+        map_op(FUTURE.format(result="value * 10")),
+        filter_op(FUTURE.format(result="value > 10")),
+    )
+    assert await run.run(1) == []
+    assert await run.run(2) == [20]
+
+
+@pytest.mark.asyncio
+async def test_awaitable_emit_result_is_awaited():
+    acks = []
+
+    def emit(value):
+        future = asyncio.get_event_loop().create_future()
+        asyncio.get_event_loop().call_soon(future.set_result, value)
+        acks.append(future)
+        return future
+
+    await pipeline(map_op("def fn(value):\n    return value + 1")).stream(1, emit)
+    assert [ack.result() for ack in acks] == [2]
+
+
+@pytest.mark.asyncio
+async def test_stages_run_in_order_and_filters_skip():
+    run = pipeline(
+        map_op("def fn(value):\n    return value + 1"),
+        filter_op("def fn(value):\n    return value % 2 == 0"),
+        map_op("def fn(value):\n    return {'v': value}"),
+    )
+    assert await run.run(1) == [{"v": 2}]
+    assert await run.run(2) == []
+
+
+@pytest.mark.asyncio
+async def test_async_operators_are_awaited():
+    run = pipeline(
+        map_op("async def fn(value):\n    return value * 3"),
+        filter_op("async def fn(value):\n    return value > 3"),
+    )
+    assert await run.run(1) == []
+    assert await run.run(2) == [6]
+
+
+@pytest.mark.asyncio
+async def test_generators_fan_out_to_remaining_stages_in_order():
+    run = pipeline(
+        map_op("def fn(value):\n    yield from range(value)"),
+        filter_op("def fn(value):\n    return value != 1"),
+        map_op("async def fn(value):\n    for i in range(2):\n        yield (value, i)"),
+        map_op("def fn(value):\n    return list(value)"),
+    )
+    assert await run.run(3) == [[0, 0], [0, 1], [2, 0], [2, 1]]
+
+
+@pytest.mark.asyncio
+async def test_falsy_values_are_not_skipped():
+    run = pipeline(map_op("def fn(value):\n    return value"))
+    assert await run.run(0) == [0]
+    assert await run.run(None) == [None]
+
+
+@pytest.mark.asyncio
+async def test_operation_error_names_the_operation():
+    run = Pipeline.compile(
+        [
+            operation("ok", map_op("def fn(value):\n    return value")),
+            operation("broken", map_op("def fn(value):\n    return 1 / value")),
+        ],
+        ["ok", "broken"],
+    )
+    with pytest.raises(KasprProcessingError) as excinfo:
+        await run.run(0)
+    assert excinfo.value.operation == "broken"
+    assert isinstance(excinfo.value.cause, ZeroDivisionError)
+
+
+def test_compile_resolves_operations_by_name():
+    first = operation("first", map_op("def fn(value):\n    return value"))
+    second = operation("second", map_op("def fn(value):\n    return value"))
+    run = Pipeline.compile([first, second], ["second", "first", "second"])
+    assert [stage.name for stage in run.stages] == ["second", "first", "second"]
+    with pytest.raises(ValueError):
+        Pipeline.compile([first], ["missing"])
+
+
+def test_batch_operations_must_lead():
+    batch = operation(
+        "batch",
+        operator(AgentProcessorMapBatchOperator, "def fn(values):\n    return values"),
+    )
+    single = operation("single", map_op("def fn(value):\n    return value"))
+    assert Pipeline.compile([batch, single], ["batch", "single"]).batch_size == 1
+    with pytest.raises(ValueError):
+        Pipeline.compile([batch, single], ["single", "batch"])
+
+
+@pytest.mark.asyncio
+async def test_stream_emits_each_item_before_pulling_the_next():
+    trace = []
+    run = pipeline(
+        operator(
+            AgentProcessorMapOperator,
+            "def fn(value):\n"
+            "    for i in range(value):\n"
+            "        trace.append(('pull', i))\n"
+            "        yield i",
+        ).with_scope({"trace": trace}),
+        map_op("def fn(value):\n    return value * 10"),
+    )
+
+    async def emit(value):
+        await asyncio.sleep(0)
+        trace.append(("emit", value))
+
+    await run.stream(3, emit)
+    assert trace == [
+        ("pull", 0),
+        ("emit", 0),
+        ("pull", 1),
+        ("emit", 10),
+        ("pull", 2),
+        ("emit", 20),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_propagates_emit_errors_unchanged():
+    def emit(value):
+        raise LookupError(value)
+
+    with pytest.raises(LookupError):
+        await pipeline(map_op("def fn(value):\n    return value")).stream(1, emit)
+
+
+@pytest.mark.asyncio
+async def test_coalesced_batch_overlaps_calls_and_emits_in_order():
+    active = []
+    overlap = []
+
+    async def slow(value):
+        active.append(value)
+        overlap.append(len(active))
+        await asyncio.sleep(0.01 if value == 0 else 0)
+        active.remove(value)
+        return value * 10
+
+    stage = PipelineStage("slow", SimpleNamespace(is_batch=False), {}, slow)
+    run = Pipeline([stage], coalesced=True)
+    emitted = []
+    await run.stream_batch([0, 1, 2], [None] * 3, emitted.append)
+    assert max(overlap) == 3
+    assert emitted == [0, 10, 20]
+
+
+@pytest.mark.asyncio
+async def test_batch_stages_map_and_filter_before_per_value_stages():
+    seen = []
+    run = pipeline(
+        operator(
+            AgentProcessorMapBatchOperator,
+            "def fn(values):\n    return [value * 2 for value in values]",
+        ),
+        operator(
+            AgentProcessorFilterBatchOperator,
+            "def fn(values):\n    return [value > 2 for value in values]",
+        ),
+        map_op(
+            "def fn(value):\n"
+            "    seen.append(context['event'])\n"
+            "    return value + 1"
+        ).with_scope({"seen": seen, "context": ProcessorContext()}),
+    )
+    emitted = []
+    await run.stream_batch([1, 2, 3], ["e1", "e2", "e3"], emitted.append)
+    assert emitted == [5, 7]
+    assert seen == ["e2", "e3"]
+
+
+def test_filter_batch_keeping_every_value_returns_the_batch_unchanged():
+    op = operator(
+        AgentProcessorFilterBatchOperator,
+        "def fn(values):\n    return [True] * len(values)",
+    )
+    values, events = [1, 2], ["e1", "e2"]
+    result = op.call((values, events))
+    assert result[0] is values and result[1] is events
+
+
+def test_filter_batch_keeping_no_value_skips_the_batch():
+    op = operator(
+        AgentProcessorFilterBatchOperator,
+        "def fn(values):\n    return [False] * len(values)",
+    )
+    assert op.call(([1, 2], ["e1", "e2"])) is op.skip_value
+
+
+@pytest.mark.asyncio
+async def test_columnar_batch_columns_are_written_back_to_records():
+    run = pipeline(
+        AgentProcessorMapBatchOperator(
+            python="def fn(batch):\n"
+            "    batch['total'] = batch['price'] * batch['quantity']\n"
+            "    return batch",
+            entrypoint="fn",
+            columnar=True,
+        ).with_scope({}),
+        AgentProcessorFilterBatchOperator(
+            python="def fn(batch):\n    return batch['total'] > 5",
+            entrypoint="fn",
+            columnar=True,
+        ).with_scope({}),
+    )
+    records = [{"price": 2, "quantity": 2}, {"price": 3, "quantity": 3}]
+    emitted = []
+    await run.stream_batch(records, ["e1", "e2"], emitted.append)
+    assert emitted == [{"price": 3, "quantity": 3, "total": 9}]
+
+
+@pytest.mark.asyncio
+async def test_batch_result_of_wrong_size_is_an_operation_error():
+    run = pipeline(
+        operator(
+            AgentProcessorMapBatchOperator, "def fn(values):\n    return values[:1]"
+        )
+    )
+    with pytest.raises(KasprProcessingError) as excinfo:
+        await run.stream_batch([1, 2], ["e1", "e2"], lambda value: None)
+    assert isinstance(excinfo.value.cause, ValueError)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filter,kept",
+    [
+        ({"field": "amount", "op": "gt", "value": 5}, [10]),
+        ({"field": "amount", "value": 1}, [1]),
+        ({"field": "missing", "op": "exists", "value": False}, [1, 10]),
+        ({"field": "missing", "op": "lt", "value": 5}, []),
+    ],
+)
+async def test_field_filters_compare_without_code(filter, kept):
+    op = AgentProcessorFilterOperatorSchema().load(filter)
+    emitted = []
+    for amount in (1, 10):
+        await pipeline(op).stream({"amount": amount}, emitted.append)
+    assert [value["amount"] for value in emitted] == kept
@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from kaspr.exceptions import KasprProcessingError
+from kaspr.types.models.agent.operations import AgentProcessorMapOperator
+from kaspr.types.models.agent.output import OutputWindow
+from kaspr.types.models.agent.processor import AgentProcessorSpec
+from kaspr.types.models.pipeline import Pipeline, PipelineStage
+
+
+class Event:
+    def __init__(self, key):
+        self.message = SimpleNamespace(key=key)
+
+
+class Stream:
+    """Yields ``values``, then waits for more that never come."""
+
+    def __init__(self, values):
+        self.values = values
+        self.current_event = None
+        self.acked = []
+
+    async def _iterate(self):
+        for value in self.values:
+            self.current_event = Event(value)
+            yield value
+        await asyncio.Event().wait()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def ack(self, event):
+        self.acked.append(event.message.key)
+
+
+@pytest.mark.asyncio
+async def test_lane_error_is_raised_without_waiting_for_the_next_event():
+    operator = AgentProcessorMapOperator(
+        python="def fn(value):\n    return 1 // value", entrypoint="fn"
+    ).with_scope({})
+    processors = SimpleNamespace(
+        compiled_pipeline=Pipeline([PipelineStage("op", operator, {})])
+    )
+    stream = Stream([1, 0])
+    lanes = AgentProcessorSpec._process_lanes(
+        processors, stream, None, OutputWindow(stream, 10), 2
+    )
+    with pytest.raises(KasprProcessingError):
+        await asyncio.wait_for(lanes, 1)
+    assert stream.acked == [1]
+
+
+class AckedStream(Stream):
+    """Stream recording whether faust's automatic acks were turned off."""
+
+    def __init__(self, values):
+        super().__init__(values)
+        self.noacked = False
+
+    async def _iterate(self):
+        for value in self.values:
+            self.current_event = Event(value)
+            yield value
+
+    def noack(self):
+        self.noacked = True
+        return self
+
+
+class Output:
+    def __init__(self, ack):
+        self.routes = [(None, None, ack)]
+        self.sent = []
+
+    async def deliver(self, value):
+        self.sent.append(value)
+        if not self.routes[0][2]:
+            return []
+        delivery = asyncio.get_running_loop().create_future()
+        delivery.set_result(None)
+        return [delivery]
+
+
+def agent_processor(output, kind="map"):
+    from kaspr import KasprApp
+    from kaspr.types.schemas.agent.processor import AgentProcessorSpecSchema
+
+    spec = AgentProcessorSpecSchema().load(
+        {
+            "pipeline": ["op"],
+            "operations": [
+                {
+                    "name": "op",
+                    kind: {"entrypoint": "fn", "python": "def fn(v):\n    return v"},
+                }
+            ],
+        }
+    )
+    spec.app = KasprApp(id="test-processor")
+    spec.input = SimpleNamespace(buffer_spec=None)
+    spec.output = output
+    return spec.processor
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ack", [False, True])
+async def test_only_agents_with_acked_outputs_ack_through_the_window(ack):
+    stream = AckedStream([1, 2])
+    output = Output(ack)
+    await agent_processor(output)(stream)
+    assert output.sent == [1, 2]
+    assert stream.noacked is ack
+    assert stream.acked == ([1, 2] if ack else [])
+
+
+@pytest.mark.asyncio
+async def test_batch_operations_without_take_are_rejected():
+    stream = AckedStream([1])
+    with pytest.raises(ValueError, match="define 'take'"):
+        await agent_processor(None, kind="map_batch")(stream)
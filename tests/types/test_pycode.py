@@ -0,0 +1,84 @@
+import pytest
+
+from kaspr.types.code import (
+    FUNC_ASYNC_GENERATOR,
+    FUNC_COROUTINE,
+    FUNC_GENERATOR,
+    FUNC_SYNC,
+)
+from kaspr.types.models.pycode import PyCode
+
+SOURCE = """
+calls.append("exec")
+
+def fn(value):
+    return value + offset
+"""
+
+
+def test_entrypoint_is_resolved_once():
+    calls = []
+    code = PyCode(python=SOURCE, entrypoint="fn").with_scope(
+        {"calls": calls, "offset": 1}
+    )
+    assert code.func(1) == 2
+    assert code.func(2) == 3
+    assert calls == ["exec"]
+
+
+def test_scope_set_after_execution_is_seen_by_function():
+    calls = []
+    code = PyCode(python=SOURCE, entrypoint="fn").with_scope(
+        {"calls": calls, "offset": 1}
+    )
+    func = code.func
+    code.with_scope({"offset": 10})
+    assert func(1) == 11
+    assert code.func is func
+    assert calls == ["exec"]
+
+
+def test_clear_scope_executes_source_again():
+    calls = []
+    code = PyCode(python=SOURCE, entrypoint="fn").with_scope(
+        {"calls": calls, "offset": 1}
+    )
+    code.func
+    code.clear_scope()
+    code.with_scope({"calls": calls, "offset": 5})
+    assert code.func(1) == 6
+    assert calls == ["exec", "exec"]
+
+
+
+@pytest.mark.parametrize(
+    "python,kind",
+    [
+        ("def fn(value):\n    return value", FUNC_SYNC),
+        ("def fn(value):\n    yield value", FUNC_GENERATOR),
+        ("async def fn(value):\n    return value", FUNC_COROUTINE),
+        ("async def fn(value):\n    yield value", FUNC_ASYNC_GENERATOR),
+    ],
+)
+def test_func_kind_does_not_execute_source(python, kind):
+    calls = []
+    code = PyCode(python='calls.append("exec")\n' + python, entrypoint="fn")
+    assert code.func_kind == kind
+    code.with_scope({"calls": calls})
+    code.func
+    assert calls == ["exec"]
+
+
+def test_source_executed_before_scope_is_executed_again_in_scope():
+    python = (
+        "factor = globals().get('scale', 1)\n"
+        "def fn(value):\n"
+        "    return value * factor\n"
+        "fn = fn\n"
+    )
+    code = PyCode(python=python, entrypoint="fn")
+    # Not classified from the source as ``fn`` is bound twice, so the
+    # source is executed without a scope.
+    assert code.func_kind == FUNC_SYNC
+    code.with_scope({"scale": 3})
+    assert code.func(2) == 6
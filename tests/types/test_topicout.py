@@ -0,0 +1,56 @@
+import pytest
+from marshmallow import ValidationError
+
+from kaspr.types.schemas.topicout import TopicOutSpecSchema
+
+ORDER = {"id": "o-1", "customer": {"id": 7}, "region": 2, "trace": "t-1"}
+
+
+def topic_out(**fields):
+    return TopicOutSpecSchema().load({"name": "orders", **fields})
+
+
+def test_field_selectors_pick_key_value_partition_and_headers():
+    spec = topic_out(
+        key_field="id",
+        value_field={"order": "id", "customer": "customer.id"},
+        partition_field="region",
+        headers_field={"trace": "trace"},
+    )
+    assert spec.get_key(ORDER) == "o-1"
+    assert spec.get_value(ORDER) == {"order": "o-1", "customer": 7}
+    assert spec.get_partition(ORDER) == 2
+    assert spec.get_headers(ORDER) == {"trace": "t-1"}
+
+
+def test_missing_fields_select_none():
+    spec = topic_out(
+        key_field="missing",
+        value_field={"customer": "customer.name"},
+        partition_field="customer.region",
+        headers_field={"trace": "nope"},
+    )
+    assert spec.get_key(ORDER) is None
+    assert spec.get_value(ORDER) == {"customer": None}
+    assert spec.get_partition(ORDER) is None
+    assert spec.get_headers(ORDER) == {"trace": None}
+
+
+def test_value_is_sent_unchanged_without_a_selector():
+    assert topic_out().get_value(ORDER) is ORDER
+
+
+@pytest.mark.parametrize("kind", ["key", "value", "partition", "headers"])
+def test_selector_and_field_cannot_both_be_set(kind):
+    with pytest.raises(ValueError, match="Only one of"):
+        topic_out(
+            **{
+                f"{kind}_field": "id",
+                f"{kind}_selector": {"entrypoint": "fn", "python": "def fn(v): ..."},
+            }
+        )
+
+
+def test_invalid_field_path_is_rejected():
+    with pytest.raises(ValidationError):
+        topic_out(key_field="customer..id")
@@ -0,0 +1,65 @@
+import pytest
+
+from kaspr.utils import codecache
+from kaspr.utils.codecache import compile_source
+
+SOURCE = "def fn(value):\n    return value + 1\n"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    codecache.clear_code_cache()
+    codecache.set_code_cache_dir(None)
+    yield
+    codecache.clear_code_cache()
+    codecache.set_code_cache_dir(None)
+
+
+def counts():
+    stats = codecache.stats
+    return stats.hits, stats.disk_hits, stats.misses
+
+
+def delta(before):
+    return tuple(after - start for after, start in zip(counts(), before))
+
+
+def test_identical_source_reuses_code_object():
+    before = counts()
+    code = compile_source(SOURCE)
+    assert compile_source(SOURCE) is code
+    assert delta(before) == (1, 0, 1)
+
+
+def test_changed_source_is_compiled_again():
+    before = counts()
+    code = compile_source(SOURCE)
+    changed = compile_source(SOURCE.replace("+ 1", "+ 2"))
+    assert changed is not code
+    assert delta(before) == (0, 0, 2)
+    scope = {}
+    exec(changed, scope)
+    assert scope["fn"](1) == 3
+
+
+def test_compiled_code_is_loaded_from_cache_directory(tmp_path):
+    codecache.set_code_cache_dir(tmp_path)
+    code = compile_source(SOURCE)
+    codecache.clear_code_cache()
+    before = counts()
+    loaded = compile_source(SOURCE)
+    assert delta(before) == (0, 1, 0)
+    assert loaded.co_code == code.co_code
+
+
+def test_unreadable_cache_file_is_compiled_again(tmp_path):
+    codecache.set_code_cache_dir(tmp_path)
+    compile_source(SOURCE)
+    codecache.clear_code_cache()
+    for path in tmp_path.iterdir():
+        path.write_bytes(b"stale bytecode")
+    before = counts()
+    scope = {}
+    exec(compile_source(SOURCE), scope)
+    assert delta(before) == (0, 0, 1)
+    assert scope["fn"](1) == 2
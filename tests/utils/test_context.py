@@ -0,0 +1,21 @@
+import pytest
+
+from kaspr.utils.context import ProcessorContext, set_current_event
+
+
+def test_agent_context_reads_current_event():
+    context = ProcessorContext(app="app")
+    set_current_event("event-1")
+    assert context["event"] == "event-1"
+    assert dict(context) == {"app": "app", "event": "event-1"}
+    set_current_event(None)
+
+
+def test_context_without_event_has_no_event_item():
+    context = ProcessorContext(app="app", with_event=False)
+    set_current_event("event-1")
+    with pytest.raises(KeyError):
+        context["event"]
+    assert "event" not in context
+    assert dict(context) == {"app": "app"}
+    set_current_event(None)
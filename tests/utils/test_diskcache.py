@@ -0,0 +1,12 @@
+from kaspr.utils.diskcache import write_cache_file
+
+
+def test_writes_file_without_leaving_temporary_files(tmp_path):
+    path = tmp_path / "entry"
+    assert write_cache_file(path, b"data") is True
+    assert path.read_bytes() == b"data"
+    assert [p.name for p in tmp_path.iterdir()] == ["entry"]
+
+
+def test_unwritable_location_is_not_an_error(tmp_path):
+    assert write_cache_file(tmp_path / "missing" / "entry", b"data") is False
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+
+from kaspr.utils.selectors import (
+    compile_comparison,
+    compile_path,
+    compile_selection,
+    validate_selection,
+)
+
+ORDER = {"customer": {"id": 7, "tags": ["vip"]}, "total": 12.5, "items": [{"sku": "a"}]}
+
+
+@pytest.mark.parametrize(
+    "path,selected",
+    [
+        ("total", 12.5),
+        ("customer.id", 7),
+        ("items.0.sku", "a"),
+        ("customer.missing", None),
+        ("missing.id", None),
+        ("items.5.sku", None),
+    ],
+)
+def test_paths_select_nested_fields_or_none(path, selected):
+    assert compile_path(path)(ORDER) == selected
+
+
+def test_paths_read_attributes_of_other_objects():
+    value = SimpleNamespace(customer=SimpleNamespace(id=7))
+    assert compile_path("customer.id")(value) == 7
+    assert compile_path("customer.name")(value) is None
+
+
+def test_projection_selects_a_dict():
+    select = compile_selection({"id": "customer.id", "missing": "nope"})
+    assert select(ORDER) == {"id": 7, "missing": None}
+
+
+@pytest.mark.parametrize("selection", ["", "a..b", {}, {"id": ""}, 1])
+def test_invalid_selections_are_rejected(selection):
+    with pytest.raises(ValueError):
+        validate_selection(selection)
+    with pytest.raises(ValueError):
+        compile_selection(selection)
+
+
+@pytest.mark.parametrize(
+    "op,operand,present,missing",
+    [
+        ("eq", 7, True, False),
+        ("ne", 7, False, True),
+        ("gt", 6, True, False),
+        ("gte", 7, True, False),
+        ("lt", 8, True, False),
+        ("lte", 6, False, False),
+        ("in", [6, 7], True, False),
+        ("not_in", [6, 7], False, True),
+        ("exists", True, True, False),
+        ("exists", False, False, True),
+    ],
+)
+def test_comparisons(op, operand, present, missing):
+    test = compile_comparison("customer.id", op, operand)
+    assert test(ORDER) is present
+    assert test({"customer": {}}) is missing
+
+
+def test_membership_with_unhashable_values():
+    assert compile_comparison("customer.tags", "in", [["vip"]])(ORDER) is True
+    assert compile_comparison("customer.tags", "in", [1, 2])(ORDER) is False
+
+
+def test_unknown_comparison_is_rejected():
+    with pytest.raises(ValueError):
+        compile_comparison("customer.id", "like", 7)
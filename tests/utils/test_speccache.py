@@ -0,0 +1,78 @@
+from kaspr import KasprApp
+from kaspr.types.schemas import AppSpecSchema
+from kaspr.utils import speccache
+from kaspr.utils.speccache import SpecCache
+
+DEFINITION = b"""
+agents:
+  - name: double
+    input:
+      channel:
+        name: double-in
+    processors:
+      pipeline: [op]
+      operations:
+        - name: op
+          map:
+            entrypoint: fn
+            python: |
+              def fn(value):
+                  return value * 2
+"""
+
+
+class Model:
+    pass
+
+
+class Other:
+    pass
+
+
+def load(app, content):
+    with speccache.recording() as nodes:
+        spec = AppSpecSchema(context={"app": app}).load(speccache.load_yaml(content))
+    return spec, speccache.node_for(nodes, spec)
+
+
+def double(spec):
+    return spec.agents_spec[0].processors.operations[0].operator.func(21)
+
+
+def test_recorded_ids_are_not_reused_while_recording():
+    with speccache.recording() as nodes:
+        for number in range(100):
+            speccache.record_model(Model(), {"number": number})
+        others = [Other() for _ in range(100)]
+        assert [speccache.node_for(nodes, other) for other in others] == [None] * 100
+    assert len(nodes) == 100
+
+
+def test_rebuilds_recorded_definition():
+    app = KasprApp(id="test-speccache")
+    spec, node = load(app, DEFINITION)
+    assert node is not None
+    rebuilt = speccache.rebuild(node, {"app": app})
+    assert double(rebuilt) == double(spec) == 42
+
+
+def test_cache_hit_miss_and_invalidation(tmp_path):
+    app = KasprApp(id="test-speccache")
+    cache = SpecCache(tmp_path)
+    key = cache.key(DEFINITION)
+    assert cache.get(key) is None
+
+    _, node = load(app, DEFINITION)
+    cache.put(key, node)
+    assert double(speccache.rebuild(cache.get(key), {"app": app})) == 42
+
+    changed = DEFINITION.replace(b"value * 2", b"value * 3")
+    assert cache.key(changed) != key
+    assert cache.get(cache.key(changed)) is None
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = SpecCache(tmp_path)
+    key = cache.key(DEFINITION)
+    (tmp_path / f"{key}.spec").write_bytes(b"not marshal")
+    assert cache.get(key) is None